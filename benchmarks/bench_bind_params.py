@@ -0,0 +1,149 @@
+"""
+Benchmark the compiled-regex bind param rewriter against the previous
+character-by-character scanner.
+
+    python benchmarks/bench_bind_params.py
+"""
+import timeit
+
+from results.psyco import compile_query, reformat_bind_params
+
+_IDENT_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789_")
+
+
+def scanner_reformat_bind_params(query, rewrite=True):
+    """The previous character-by-character implementation, for comparison."""
+    result = []
+    i = 0
+    n = len(query)
+
+    while i < n:
+        c = query[i]
+
+        # Single-quoted string literal: '...' with '' escape for internal quotes
+        if c == "'":
+            j = i + 1
+            while j < n:
+                if query[j] == "'":
+                    if j + 1 < n and query[j + 1] == "'":
+                        j += 2
+                    else:
+                        j += 1
+                        break
+                else:
+                    j += 1
+            result.append(query[i:j])
+            i = j
+
+        # Double-quoted identifier: "..." with "" escape
+        elif c == '"':
+            j = i + 1
+            while j < n:
+                if query[j] == '"':
+                    if j + 1 < n and query[j + 1] == '"':
+                        j += 2
+                    else:
+                        j += 1
+                        break
+                else:
+                    j += 1
+            result.append(query[i:j])
+            i = j
+
+        # Dollar-quoted string: $tag$...$tag$
+        elif c == "$":
+            j = i + 1
+            while j < n and query[j] != "$":
+                j += 1
+            if j < n:
+                tag = query[i : j + 1]
+                close = query.find(tag, j + 1)
+                if close != -1:
+                    result.append(query[i : close + len(tag)])
+                    i = close + len(tag)
+                else:
+                    result.append(c)
+                    i += 1
+            else:
+                result.append(c)
+                i += 1
+
+        # Potential bind parameter: :identifier
+        # Skip if preceded by : (cast) or a digit (array slice like [1:3])
+        elif c == ":":
+            prev = query[i - 1] if i > 0 else None
+            next_c = query[i + 1] if i + 1 < n else None
+            is_cast = prev == ":"
+            is_array_slice = prev is not None and prev.isdigit()
+            # Identifiers must start with a letter or underscore, not a digit
+            starts_valid_ident = next_c is not None and (
+                next_c.isalpha() or next_c == "_"
+            )
+            if not is_cast and not is_array_slice and starts_valid_ident:
+                j = i + 1
+                while j < n and query[j] in _IDENT_CHARS:
+                    j += 1
+                if rewrite:
+                    varname = query[i + 1 : j]
+                    result.append(f"%({varname})s")
+                else:
+                    result.append(query[i:j])
+                i = j
+            else:
+                result.append(c)
+                i += 1
+
+        else:
+            result.append(c)
+            i += 1
+
+    return "".join(result)
+
+
+def generated_sql(rows):
+    """Something like inplace_cte output: a big values list of params,
+    casts and literals, plus a function body in dollar quotes."""
+    values = ",\n".join(
+        f"(:id_{i}, :name_{i}::text, 'it''s: {i}', \"Col:{i}\", arr[1:{i}])"
+        for i in range(rows)
+    )
+    body = "$body$ select :not_a_param; $body$"
+    return f"with data(a, b, c, d, e) as (values {values}) select {body}, * from data"
+
+
+def migration_sql(statements):
+    """Something like a generated migration script: mostly DDL text, with
+    casts and defaults but few params."""
+    return "\n".join(
+        f"alter table \"public\".\"t{i}\" add column \"c{i}\" text "
+        f"default 'none'::text not null; -- :{i} {'x' * 40}"
+        for i in range(statements)
+    )
+
+
+QUERIES = {
+    "small": "select * from t where a = :a and b::text = :b and c = 'x:y'",
+    "medium (10KB)": generated_sql(100),
+    "large (1MB)": generated_sql(10000),
+    "migration (1MB)": migration_sql(8000),
+}
+
+
+def main():
+    for label, query in QUERIES.items():
+        assert reformat_bind_params(query) == scanner_reformat_bind_params(query)
+
+        number = max(1, 200000 // len(query))
+
+        old = timeit.timeit(lambda: scanner_reformat_bind_params(query), number=number)
+        new = timeit.timeit(lambda: reformat_bind_params(query), number=number)
+
+        print(
+            f"{label:>16}: scanner {old / number * 1000:9.3f}ms  "
+            f"regex {new / number * 1000:9.3f}ms  ({old / new:.1f}x), "
+            f"{len(compile_query(query).param_names)} params"
+        )
+
+
+if __name__ == "__main__":
+    main()
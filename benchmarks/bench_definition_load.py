@@ -0,0 +1,115 @@
+"""
+Benchmark loading a saved SchemaDefinition and building an inspector from it
+(with its dependency closures): the binary format (plain and gzipped)
+against JSON and, on the smallest size only as it's so slow, YAML.
+
+    python benchmarks/bench_definition_load.py
+
+Each schema has a table of 10 columns per view, and the views select from
+their table.
+"""
+import time
+
+from results.schemainspect import PostgreSQL, SchemaDefinition
+
+
+def column(name):
+    return {
+        "name": name,
+        "dbtype": "text",
+        "dbtypestr": "text",
+        "not_null": False,
+        "default": None,
+        "is_enum": False,
+        "enum_name": None,
+        "enum_schema": None,
+        "collation": None,
+        "is_identity": False,
+        "is_identity_always": False,
+        "is_generated": False,
+        "is_inherited": False,
+        "comment": None,
+    }
+
+
+def selectable(name, relationtype, definition=None, dependent_on=()):
+    return {
+        "name": name,
+        "schema": "public",
+        "relationtype": relationtype,
+        "definition": definition,
+        "columns": {f"c{j}": column(f"c{j}") for j in range(10)},
+        "comment": None,
+        "parent_table": None,
+        "partition_def": None,
+        "rowsecurity": False,
+        "forcerowsecurity": False,
+        "persistence": "p",
+        "options": None,
+        "dependent_on": list(dependent_on),
+    }
+
+
+def definition(count):
+    return SchemaDefinition(
+        pg_version=16,
+        schemas={'"public"': {"schema": "public"}},
+        tables={
+            f'"public"."t{i:06d}"': selectable(f"t{i:06d}", "r")
+            for i in range(count)
+        },
+        views={
+            f'"public"."v{i:06d}"': selectable(
+                f"v{i:06d}",
+                "v",
+                f" SELECT * FROM t{i:06d};",
+                [f'"public"."t{i:06d}"'],
+            )
+            for i in range(count)
+        },
+    )
+
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return time.perf_counter() - start, result
+
+
+def load(parse):
+    """Time to parse and build an inspector, with every closure."""
+    defn = parse()
+    inspector = PostgreSQL.from_definition(defn)
+    inspector.dependency_closure.bitsets("dependent_on")
+    inspector.dependency_closure.bitsets("dependents")
+    return defn
+
+
+def main():
+    for count in (1000, 10000, 50000):
+        defn = definition(count)
+
+        formats = {
+            "json": (defn.to_json(), SchemaDefinition.from_json),
+            "binary": (defn.to_binary(), SchemaDefinition.from_binary),
+            "gzipped": (
+                defn.to_binary(compression="gzip"),
+                SchemaDefinition.from_binary,
+            ),
+        }
+
+        if count == 1000:
+            formats["yaml"] = (defn.to_yaml(), SchemaDefinition.from_yaml)
+
+        line = f"{count:>6} tables and views:"
+
+        for name, (data, parse) in formats.items():
+            elapsed, loaded = timed(lambda: load(lambda: parse(data)))
+            assert loaded == defn
+            line += f"  {name} {len(data) / 1e6:5.1f}MB {elapsed * 1000:7.1f}ms"
+
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
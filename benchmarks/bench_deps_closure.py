@@ -0,0 +1,96 @@
+"""
+Benchmark load_deps_all (the transitive closure of dependencies) on a chain
+of views, each selecting from the one before, against the previous
+recursive implementation.
+
+    python benchmarks/bench_deps_closure.py
+
+The recursive version recurses once per link, so it's only run on chains
+short enough to fit under the recursion limit.
+"""
+import sys
+import time
+from collections import OrderedDict as od
+
+from results.schemainspect.pg.obj import PROPS, InspectedSelectable, PostgreSQL
+
+
+def view_chain(length):
+    """An inspector holding a table and length views, each depending on the
+    one before."""
+    inspector = PostgreSQL.__new__(PostgreSQL)
+
+    for prop in PROPS.split():
+        setattr(inspector, prop, od())
+
+    previous = None
+
+    for i in range(length + 1):
+        x = InspectedSelectable(
+            name=f"v{i:05d}" if i else "t",
+            schema="public",
+            columns=od(),
+            relationtype="v" if i else "r",
+        )
+
+        if previous:
+            x.dependent_on.append(previous.signature)
+            previous.dependents.append(x.signature)
+
+        inspector.selectables[x.signature] = x
+        previous = x
+
+    return inspector
+
+
+def recursive_load_deps_all(self):
+    """The previous implementation, for comparison."""
+
+    def get_related_for_item(item, att):
+        related = [self.get_dependency_by_signature(_) for _ in getattr(item, att)]
+        return [item.signature] + [
+            _ for d in related if d is not None for _ in get_related_for_item(d, att)
+        ]
+
+    for k, x in self.selectables.items():
+        d_all = get_related_for_item(x, "dependent_on")[1:]
+        d_all.sort()
+        x.dependent_on_all = d_all
+        d_all = get_related_for_item(x, "dependents")[1:]
+        d_all.sort()
+        x.dependents_all = d_all
+
+
+def timed(f):
+    start = time.perf_counter()
+    f()
+    return time.perf_counter() - start
+
+
+def main():
+    sys.setrecursionlimit(10000)
+
+    for length in (100, 1000, 10000):
+        inspector = view_chain(length)
+        first = inspector.selectables['"public"."t"']
+        last = inspector.selectables['"public"."v{:05d}"'.format(length)]
+
+        def load_deps_all():
+            # closures are built on first use, so include the longest ones
+            inspector.load_deps_all()
+            return last.dependent_on_all, first.dependents_all
+
+        closure = timed(load_deps_all)
+        assert len(last.dependent_on_all) == len(first.dependents_all) == length
+
+        line = f"{length:>6} views: closure {closure * 1000:8.1f}ms"
+
+        if length <= 1000:
+            recursive = timed(lambda: recursive_load_deps_all(view_chain(length)))
+            line += f"  (recursive {recursive * 1000:9.1f}ms)"
+
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark differences() between two separately built copies of the same
+tables, against the previous version, which compared each table field by
+field, twice.
+
+    python benchmarks/bench_differences.py
+
+differences() compares each table once, still field by field. Once both
+sides' digests have been worked out (as for PostgreSQL.digest), only the
+digests are compared.
+"""
+import time
+from collections import OrderedDict as od
+
+from results.dbdiff.util import differences
+from results.schemainspect.inspected import ColumnInfo
+from results.schemainspect.pg.obj import InspectedSelectable
+
+
+def tables(count, columns=30):
+    return od(
+        (
+            f'"public"."t{i:06d}"',
+            InspectedSelectable(
+                name=f"t{i:06d}",
+                schema="public",
+                relationtype="r",
+                columns=od(
+                    (
+                        f"c{j}",
+                        ColumnInfo(
+                            name=f"c{j}",
+                            dbtype="text",
+                            dbtypestr="text",
+                            pytype=str,
+                            default=f"'default {j}'::text",
+                            not_null=bool(j % 2),
+                        ),
+                    )
+                    for j in range(columns)
+                ),
+            ),
+        )
+        for i in range(count)
+    )
+
+
+def previous_eq(x, y):
+    """The previous __eq__ of tables and of their columns."""
+    if isinstance(x, ColumnInfo):
+        return x.digest_fields() == y.digest_fields()
+    return (
+        type(x) is type(y)
+        and x.digest_fields()[:3] == y.digest_fields()[:3]
+        and dict(x.columns).keys() == dict(y.columns).keys()
+        and all(previous_eq(c, y.columns[k]) for k, c in x.columns.items())
+        and x.digest_fields()[4:] == y.digest_fields()[4:]
+    )
+
+
+def previous_differences(a, b):
+    """The previous differences(), for comparison."""
+    keys_common = sorted(set(a) & set(b))
+    modified = od((k, b[k]) for k in keys_common if not previous_eq(a[k], b[k]))
+    unmodified = od((k, b[k]) for k in keys_common if previous_eq(a[k], b[k]))
+    return modified, unmodified
+
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return time.perf_counter() - start, result
+
+
+def main():
+    for count in (1000, 10000, 50000):
+        a, b = tables(count), tables(count)
+        b.popitem()
+
+        previous, previous_diff = timed(lambda: previous_differences(a, b))
+        first, diff = timed(lambda: differences(a, b))
+        digesting, _ = timed(
+            lambda: [t.digest for side in (a, b) for t in side.values()]
+        )
+        again, _ = timed(lambda: differences(a, b))
+
+        assert list(diff[3]) == list(previous_diff[1])
+        assert len(diff[1]) == 1 and not diff[2]
+
+        print(
+            f"{count:>6} tables: previous {previous * 1000:8.1f}ms, "
+            f"now {first * 1000:8.1f}ms, digesting {digesting * 1000:8.1f}ms, "
+            f"then by digest {again * 1000:7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
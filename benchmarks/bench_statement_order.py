@@ -0,0 +1,106 @@
+"""
+Benchmark dependency-ordered statement generation (statements_from_differences
+with dependency_ordering=True) on views and functions that each depend on
+the next, against the previous fixpoint loop.
+
+    python benchmarks/bench_statement_order.py
+
+In sorted order every object comes before what it depends on, the worst
+case for the fixpoint loop: each pass over everything creates only one.
+So the previous version is only run on the smaller sizes.
+"""
+import time
+from collections import OrderedDict as od
+
+from results.dbdiff.changes import statements_from_differences
+
+
+class Selectable:
+    def __init__(self, k):
+        self.k = k
+        self.dependent_on = []
+        self.dependents = []
+
+    @property
+    def create_statement(self):
+        return f"create {self.k};"
+
+    @property
+    def drop_statement(self):
+        return f"drop {self.k};"
+
+
+def chain(length):
+    """Alternating views and functions, each depending on the next."""
+    objects = od(
+        (k, Selectable(k))
+        for k in (
+            f'"public"."{"v" if i % 2 else "f"}{i:06d}"' for i in range(length)
+        )
+    )
+    keys = list(objects)
+
+    for k, next_k in zip(keys, keys[1:]):
+        objects[k].dependent_on.append(next_k)
+        objects[next_k].dependents.append(k)
+
+    return objects
+
+
+def fixpoint_creations(added):
+    """The previous fixpoint loop, creations only, for comparison."""
+    statements = []
+    pending_creations = set(added)
+
+    while pending_creations:
+        before = set(pending_creations)
+
+        for k, v in added.items():
+            if not set(v.dependent_on) & pending_creations:
+                if k in pending_creations:
+                    statements.append(v.create_statement)
+                    pending_creations.remove(k)
+
+        if pending_creations == before:
+            raise ValueError("cannot resolve dependencies")
+
+    return statements
+
+
+def timed(f):
+    start = time.perf_counter()
+    result = f()
+    return time.perf_counter() - start, result
+
+
+def main():
+    for length in (1000, 5000, 10000, 50000):
+        added = chain(length)
+
+        creations, statements = timed(
+            lambda: statements_from_differences(
+                added, od(), od(), dependency_ordering=True
+            )
+        )
+        drops, _ = timed(
+            lambda: statements_from_differences(
+                od(), added, od(), dependency_ordering=True, old=added
+            )
+        )
+        assert statements[0] == f"create {list(added)[-1]};"
+
+        line = (
+            f"{length:>6} objects: creations {creations * 1000:8.1f}ms, "
+            f"drops {drops * 1000:8.1f}ms"
+        )
+
+        if length <= 5000:
+            previous, previous_statements = timed(lambda: fixpoint_creations(added))
+            assert previous_statements == list(statements)
+            line += f"  (fixpoint creations {previous * 1000:9.1f}ms)"
+
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
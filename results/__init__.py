@@ -1,4 +1,5 @@
 from . import command  # noqa
+from .asyncdb import adb  # noqa
 from .database import db  # noqa
 from .loading import rows_from_text
 from .psyco import quoted_identifier
@@ -9,6 +10,7 @@ from .urls import URL, url
 
 __all__ = [
     "command",
+    "adb",
     "db",
     "rows_from_text",
     "quoted_identifier",
@@ -0,0 +1,341 @@
+import asyncio
+import getpass
+from contextlib import asynccontextmanager
+from inspect import isasyncgenfunction
+from pathlib import Path
+
+from psycopg_pool import AsyncConnectionPool
+
+from .columnar import columnar_rows
+from .database import (
+    TotalCount,
+    column_info_from_description,
+    known_keyset_indexes,
+    missing_paging_index,
+    paging_index_key,
+    pool_stats,
+    prepared_query,
+    rewritten_query,
+)
+from .paging import (
+    COUNT_QUERY,
+    ESTIMATED_COUNT_QUERY,
+    KEYSET_ATTNUMS,
+    KEYSET_INDEXES,
+    counted_rows,
+    index_matches,
+    plan_rows,
+)
+from .rows import Rows
+from .urls import URL
+
+ASYNC_POOL_MIN_SIZE = 1
+ASYNC_POOL_MAX_SIZE = 1024
+
+
+async def async_connection_check(conn):
+    async with conn.cursor() as curs:
+        await curs.execute("SELECT 1")
+
+
+class AsyncTransaction:
+    """The asyncio counterpart of Transaction: the same q() (colon bind
+    params, paging, Rows results), awaited."""
+
+    async def ex(self, *args, **kwargs):
+        await self.c.execute(*args, **kwargs)
+
+    async def execute(self, *args, **kwargs) -> Rows:
+        await self.c.execute(*args, **kwargs)
+
+        if self.c.description is None:
+            return None
+
+        fetched = await self.c.fetchall()
+
+        rows = Rows(fetched)
+        rows.column_info = column_info_from_description(self.c.description)
+
+        return rows
+
+    @property
+    def db_version(self) -> int:
+        return self.c.connection.pgconn.server_version // 10000
+
+    async def q(
+        self,
+        query,
+        params=None,
+        *,
+        paging=None,
+        columnar=False,
+        fail_on_empty=False,
+        colon_bind_params=True,
+        prepare=None,
+        **kwargs,
+    ):
+        if not query.strip():
+            if fail_on_empty:
+                raise ValueError("Error: Empty query.")
+            else:
+                return None
+
+        _params = {}
+
+        if params:
+            _params.update(params)
+
+        if kwargs:
+            _params.update(kwargs)
+
+        if paging and paging.get("require_index"):
+            await self.require_paging_index(
+                rewritten_query(query, bool(_params) and colon_bind_params),
+                paging,
+            )
+
+        counting = TotalCount(
+            query, _params, paging, self.c, colon_bind_params
+        )
+        paging = counting.paging
+
+        query, _params = prepared_query(
+            query, _params, paging=paging, colon_bind_params=colon_bind_params
+        )
+
+        if prepare is None:
+            rows = await self.execute(query, _params)
+        else:
+            rows = await self.execute(query, _params, prepare=prepare)
+
+        if paging:
+            if counting.needed:
+                counting.counted(
+                    await self.paging_total_count(
+                        counting.query, counting.params, paging, rows
+                    )
+                )
+
+            rows = counting.paged_rows(rows)
+
+        if columnar and rows is not None:
+            return columnar_rows(rows, self.c.description)
+
+        return rows
+
+    async def keyset_index_exists(self, table, columns, descending):
+        """As Transaction.keyset_index_exists."""
+        await self.c.execute(KEYSET_ATTNUMS, dict(table=table, columns=list(columns)))
+        attnums = dict(await self.c.fetchall())
+
+        if len(attnums) != len(columns):
+            return False
+
+        attnums = [attnums[c] for c in columns]
+
+        await self.c.execute(KEYSET_INDEXES, dict(table=table))
+
+        return any(
+            index_matches(keys, options, attnums, descending)
+            for keys, options in await self.c.fetchall()
+        )
+
+    async def require_paging_index(self, query, paging):
+        """As Transaction.require_paging_index."""
+        key = paging_index_key(query, paging, self.c.connection.info)
+
+        if key in known_keyset_indexes:
+            return
+
+        *_, table, columns, descending = key
+
+        if await self.keyset_index_exists(table, columns, descending):
+            known_keyset_indexes.add(key)
+        else:
+            raise ValueError(missing_paging_index(table, columns))
+
+    async def paging_total_count(self, query, params, paging, rows):
+        """As Transaction.paging_total_count."""
+        if paging["count"] == "estimate":
+            explained = await self.execute(
+                ESTIMATED_COUNT_QUERY.format(q=query), params
+            )
+            return plan_rows(explained[0][0]), True
+
+        total = counted_rows(rows)
+
+        if total is None:
+            if paging.get("bookmark") is None:
+                total = 0
+            else:
+                counted = await self.execute(COUNT_QUERY.format(q=query), params)
+                total = counted[0][0]
+
+        return total, False
+
+    async def q_from_file(self, path, *args, **kwargs):
+        query = Path(path).expanduser().resolve().read_text()
+        return await self.q(query, *args, **kwargs)
+
+    async def pages(self, *args, paging: dict, **kwargs):
+        bookmark = None
+
+        while True:
+            paging["bookmark"] = bookmark
+            page = await self.q(*args, paging=paging, **kwargs)
+
+            if not page:
+                break
+
+            yield page
+
+            if page.paging.has_next:
+                bookmark = page.paging.next
+            else:
+                break
+
+    async def notify(self, channel, payload):
+        await self.q(
+            """select pg_notify(:channel, :payload)""",
+            dict(channel=channel, payload=payload),
+        )
+
+
+def adb(url=None, **pool_kwargs):
+    return AsyncDatabase(url, **pool_kwargs)
+
+
+class AsyncDatabase:
+    """An asyncio database, backed by a psycopg AsyncConnectionPool.
+
+    The pool is opened on first use, within the running event loop, and
+    belongs to that loop; close it with `await db.close()` (or use the
+    database as an async context manager).
+    """
+
+    def __init__(self, url=None, **pool_kwargs):
+        if url is None:
+            url = getpass.getuser()
+
+        _url = URL(url)
+
+        if not _url.scheme or _url.scheme == "postgres":
+            _url.scheme = "postgresql"
+
+        self.URL = _url
+        self.url = str(_url)
+
+        self.pool_kwargs = dict(
+            min_size=ASYNC_POOL_MIN_SIZE,
+            max_size=ASYNC_POOL_MAX_SIZE,
+            check=async_connection_check,
+        )
+        self.pool_kwargs.update(pool_kwargs)
+
+        self.pool = None
+        self._opening = None
+
+    async def open(self):
+        """Open the connection pool, waiting for its first connections.
+
+        Concurrent callers all wait on the same opening, so only one pool is
+        ever created.
+        """
+        if self._opening is None:
+            self._opening = asyncio.ensure_future(self._open_pool())
+
+        try:
+            self.pool = await self._opening
+        except Exception:
+            self._opening = None
+            raise
+
+        return self.pool
+
+    async def _open_pool(self):
+        failed = asyncio.get_running_loop().create_future()
+
+        def reconnect_failed(pool):
+            if not failed.done():
+                failed.set_result(None)
+
+        pool = AsyncConnectionPool(
+            self.url,
+            open=False,
+            reconnect_timeout=0,
+            reconnect_failed=reconnect_failed,
+            **self.pool_kwargs,
+        )
+
+        # like the sync pool, fail as soon as the first connection attempt
+        # fails, rather than waiting for the pool's timeout
+        opening = asyncio.ensure_future(pool.open(wait=True))
+
+        # however opening fails, the pool is closed, stopping its workers
+        try:
+            await asyncio.wait([opening, failed], return_when=asyncio.FIRST_COMPLETED)
+
+            if not opening.done():
+                opening.cancel()
+                raise ValueError("Connection failed")
+
+            opening.result()
+        except BaseException:
+            await pool.close()
+            raise
+
+        return pool
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+
+        self.pool = None
+        self._opening = None
+
+    def pool_stats(self):
+        """Connection pool statistics, or None if the pool isn't open."""
+        if self.pool is None:
+            return None
+
+        return pool_stats(self.pool)
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    @asynccontextmanager
+    async def t(self):
+        pool = await self.open()
+
+        async with pool.connection() as conn:
+            async with conn.cursor() as curs:
+                t = AsyncTransaction()
+                t.c = curs
+                yield t
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        if isasyncgenfunction(getattr(AsyncTransaction, name, None)):
+            # such as pages(): yielded from, within the one transaction
+            async def generator(*args, **kwargs):
+                async with self.t() as t:
+                    async for item in getattr(t, name)(*args, **kwargs):
+                        yield item
+
+            return generator
+
+        async def method(*args, **kwargs):
+            async with self.t() as t:
+                m = getattr(t, name)
+                return await m(*args, **kwargs)
+
+        return method
+
+    def __repr__(self):
+        return f"adb(url={self.url})"
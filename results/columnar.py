@@ -0,0 +1,223 @@
+from array import array
+from itertools import compress
+
+# Fixed-width storage for columns of these postgres types, as long as the
+# column contains no nulls. Everything else is kept as a plain list.
+NUMPY_DTYPES = {
+    "bool": "bool",
+    "int2": "int16",
+    "int4": "int32",
+    "int8": "int64",
+    "oid": "uint32",
+    "float4": "float32",
+    "float8": "float64",
+}
+
+ARRAY_TYPECODES = {
+    "int2": "h",
+    "int4": "i",
+    "int8": "q",
+    "oid": "I",
+    "float4": "f",
+    "float8": "d",
+}
+
+
+def numpy_or_none():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def packed_column(values, type_name, np=None):
+    """Pack a column of values into a numpy array or array.array if the type
+    allows it, otherwise return them as a list."""
+    values = list(values)
+
+    if None in values:
+        return values
+
+    if np is not None:
+        dtype = NUMPY_DTYPES.get(type_name)
+
+        if dtype:
+            return np.array(values, dtype=dtype)
+        return values
+
+    typecode = ARRAY_TYPECODES.get(type_name)
+
+    if typecode:
+        return array(typecode, values)
+    return values
+
+
+def columnar_rows(rows, description):
+    """rows (with the cursor description of the query they're from) as
+    Columns, keeping their paging. Raises ValueError if columns share a name,
+    such as select a.id, b.id: each column is found by its name."""
+    names = [c.name for c in description]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+
+    if duplicates:
+        raise ValueError(
+            "columnar results need unique column names (alias duplicates): "
+            + ", ".join(duplicates)
+        )
+
+    columns = rows.to_columns()
+    columns.paging = rows.paging
+    return columns
+
+
+class Columns:
+    """Column-oriented query results.
+
+    Each column is stored once, contiguously (as a numpy array when numpy is
+    installed and the column type allows it, an array.array otherwise), so
+    column access is O(1) and filters and aggregates run over whole columns.
+    """
+
+    def __init__(self, columns, column_info):
+        self.columns = columns
+        self.column_info = column_info
+        self.paging = None
+
+    @classmethod
+    def from_rows(cls, rows, use_numpy=None):
+        """Create a Columns object from a Rows object.
+
+        With use_numpy=None, numpy is used if it's installed.
+        """
+        if use_numpy is False:
+            np = None
+        else:
+            np = numpy_or_none()
+
+            if use_numpy and np is None:
+                raise ImportError("numpy is required for use_numpy=True")
+
+        names = list(rows.column_info)
+
+        # column_info is keyed by name, so holds each duplicate name once
+        if rows and len(rows[0]) != len(names):
+            raise ValueError(
+                "columnar results need unique column names (alias duplicates)"
+            )
+
+        if rows:
+            transposed = zip(*rows)
+        else:
+            transposed = ([] for _ in names)
+
+        columns = {
+            name: packed_column(values, rows.column_info[name], np)
+            for name, values in zip(names, transposed)
+        }
+        return cls(columns, dict(rows.column_info))
+
+    def __len__(self):
+        if not self.columns:
+            return 0
+        return len(next(iter(self.columns.values())))
+
+    def __getitem__(self, x):
+        if isinstance(x, int):
+            return tuple(c[x] for c in self.columns.values())
+
+        try:
+            return self.columns[x]
+        except KeyError:
+            raise ValueError(f"no such column: {x}")
+
+    def __iter__(self):
+        return zip(*self.columns.values())
+
+    def keys(self):
+        return list(self.column_info)
+
+    def filter(self, mask):
+        """Return a new Columns with only the rows where mask is true.
+
+        mask is a sequence of booleans, one per row: typically the result
+        of a vectorized comparison such as `cols["n"] > 5` on a numpy column.
+        """
+        if not hasattr(mask, "dtype"):
+            mask = list(mask)
+
+        if len(mask) != len(self):
+            raise ValueError("mask length must match number of rows")
+
+        columns = {}
+
+        for name, c in self.columns.items():
+            if hasattr(c, "dtype"):
+                columns[name] = c[mask]
+            elif isinstance(c, array):
+                columns[name] = array(c.typecode, compress(c, mask))
+            else:
+                columns[name] = list(compress(c, mask))
+
+        return Columns(columns, dict(self.column_info))
+
+    def where(self, name, predicate):
+        """Filter rows by applying predicate to each value of one column."""
+        return self.filter([predicate(v) for v in self[name]])
+
+    def _present(self, name):
+        c = self[name]
+        if hasattr(c, "dtype") or isinstance(c, array):
+            return c
+        return [v for v in c if v is not None]
+
+    def count(self, name):
+        """Number of non-null values in a column."""
+        return len(self._present(name))
+
+    def sum(self, name):
+        c = self._present(name)
+        if hasattr(c, "dtype"):
+            return c.sum().item()
+        return sum(c)
+
+    def mean(self, name):
+        c = self._present(name)
+        if not len(c):
+            return None
+        if hasattr(c, "dtype"):
+            return c.mean().item()
+        return sum(c) / len(c)
+
+    def min(self, name):
+        c = self._present(name)
+        if not len(c):
+            return None
+        if hasattr(c, "dtype"):
+            return c.min().item()
+        return min(c)
+
+    def max(self, name):
+        c = self._present(name)
+        if not len(c):
+            return None
+        if hasattr(c, "dtype"):
+            return c.max().item()
+        return max(c)
+
+    def to_rows(self):
+        from .rows import Rows
+
+        columns = [
+            c.tolist() if hasattr(c, "tolist") else c for c in self.columns.values()
+        ]
+
+        rows = Rows(zip(*columns))
+        rows.column_info = dict(self.column_info)
+        return rows
+
+    def __str__(self):
+        return str(self.to_rows())
+
+    def __repr__(self):
+        return str(self)
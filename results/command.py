@@ -12,6 +12,26 @@ def cli():
     pass
 
 
+def load_schema(arg):
+    """A definition file (binary, .yaml or .json) if arg is one, otherwise a
+    database."""
+    import os
+
+    from results.schemainspect import SchemaDefinition
+    from results.schemainspect.binary import is_binary
+
+    if os.path.isfile(arg):
+        data = open(arg, "rb").read()
+        if is_binary(data):
+            return SchemaDefinition.from_binary(data)
+        text = data.decode("utf-8")
+        if arg.endswith(".json"):
+            return SchemaDefinition.from_json(text)
+        else:
+            return SchemaDefinition.from_yaml(text)
+    return results.db(arg)
+
+
 def init_commands(cli):
     @cli.command(
         help=(
@@ -58,11 +78,15 @@ def init_commands(cli):
             raise SystemExit(1)
 
     @cli.command(help="`diff` two schemas, a -> b. Each argument can be a DB URL or a definition file (.yaml/.json).")
-    @click.option("--schema", help="Restrict output to single schema", default=None)
+    @click.option(
+        "--schema",
+        help="Restrict output to this schema, or glob like 'tenant_*' (repeatable)",
+        multiple=True,
+    )
     @click.option(
         "--exclude-schema",
-        help="Restrict output to statements for all schemas except the specified schema",
-        default=None,
+        help="Restrict output to all schemas except this one, or glob (repeatable)",
+        multiple=True,
     )
     @click.option(
         "--create-extensions-only",
@@ -80,23 +104,19 @@ def init_commands(cli):
         default=False,
         help="Also output privilege differences (ie. grant/revoke statements)",
     )
+    @click.option(
+        "--snapshot-dir",
+        default=None,
+        help="Save inspected schemas here, and reuse them while unchanged",
+    )
     @click.argument("a", type=str, nargs=1)
     @click.argument("b", type=str, nargs=1)
     def dbdiff(a, b, **kwargs):
-        from results.schemainspect import SchemaDefinition
+        kwargs["schema"] = list(kwargs["schema"]) or None
+        kwargs["exclude_schema"] = list(kwargs["exclude_schema"]) or None
 
-        def load(arg):
-            import os
-            if os.path.isfile(arg):
-                text = open(arg).read()
-                if arg.endswith(".json"):
-                    return SchemaDefinition.from_json(text)
-                else:
-                    return SchemaDefinition.from_yaml(text)
-            return results.db(arg)
-
-        source_a = load(a)
-        source_b = load(b)
+        source_a = load_schema(a)
+        source_b = load_schema(b)
 
         schemadiff_sql = source_a.schemadiff_as_sql(source_b, **kwargs)
 
@@ -104,5 +124,59 @@ def init_commands(cli):
             print(schemadiff_sql)
             sys.exit(2)
 
+    @cli.command(
+        help="Print a digest of a schema (a DB URL or a definition file), which changes whenever the schema does."
+    )
+    @click.option(
+        "--since",
+        default=None,
+        help="Exit with status 2 if the digest differs from this one",
+    )
+    @click.argument("a", type=str, nargs=1)
+    def digest(a, since):
+        from results.schemainspect import PostgreSQL, SchemaDefinition
+
+        source = load_schema(a)
+
+        if isinstance(source, SchemaDefinition):
+            inspected = PostgreSQL.from_definition(source)
+        else:
+            inspected = source.inspect()
+
+        print(inspected.digest)
+
+        if since is not None and since != inspected.digest:
+            sys.exit(2)
+
+    @cli.command(
+        help="Save a schema (a DB URL or a definition file) as a definition file: JSON or YAML for .json/.yaml, otherwise the compact binary format."
+    )
+    @click.option(
+        "--compression",
+        type=click.Choice(["gzip", "zstd"]),
+        default=None,
+        help="Compress the binary format (zstd requires zstandard)",
+    )
+    @click.argument("a", type=str, nargs=1)
+    @click.argument("output", type=str, nargs=1)
+    def dump(a, output, compression):
+        from results.schemainspect import SchemaDefinition
+
+        source = load_schema(a)
+
+        if not isinstance(source, SchemaDefinition):
+            # closures already worked out by inspecting, for to_binary()
+            source = source.inspect().as_definition(closures=True)
+
+        if output.endswith(".json"):
+            data = source.to_json().encode("utf-8")
+        elif output.endswith((".yaml", ".yml")):
+            data = source.to_yaml().encode("utf-8")
+        else:
+            data = source.to_binary(compression=compression)
+
+        with open(output, "wb") as f:
+            f.write(data)
+
 
 init_commands(cli)
@@ -1,98 +1,425 @@
 import atexit
 import getpass
+import os
 from contextlib import contextmanager
+from functools import lru_cache
 from inspect import currentframe
 from pathlib import Path
-from threading import get_ident
-import multiprocessing
+from threading import Event, Lock
 
 from psycopg import connect as pgconnect
 from psycopg_pool import ConnectionPool
 
 from .constants import type_codes
+from .columnar import columnar_rows
 from .createdrop import DatabaseCreateDrop
+from .exporting import Exporting
 from .inserting import Inserting
 from .notify import ListenNotify
-from .paging import get_paged_query, get_paged_rows
+from .parallel import ParallelPages
+from .paging import (
+    COUNT_METHODS,
+    COUNT_QUERY,
+    COUNT_TTL,
+    ESTIMATED_COUNT_QUERY,
+    KEYSET_ATTNUMS,
+    KEYSET_INDEXES,
+    cache_count,
+    cached_count,
+    count_key,
+    counted_rows,
+    get_paged_query,
+    get_paged_rows,
+    index_matches,
+    keyset_plan,
+    parse_order_by,
+    plan_rows,
+    reversed_order_by,
+)
 from .psyco import reformat_bind_params
-from .rows import Rows
+from .rows import Rows, rando
 from .schemas import Schemas
 from .urls import URL
 
 conns = {}
 
+# pools inherited from a parent process: never used or closed, since the
+# connections belong to the parent, but kept referenced so that garbage
+# collection doesn't close them either
+abandoned_pools = []
+
+pools_lock = Lock()
+
+# a lock per pool key, held while that pool is being created
+pool_creation_locks = {}
+
+STREAM_BATCH_SIZE = 1000
+
+# (database, table, columns, directions) combinations known to have an index
+# suitable for keyset paging
+known_keyset_indexes = set()
+
+# how many distinct query texts to keep rewritten (see rewritten_query)
+QUERY_CACHE_SIZE = 512
+
+POOL_DEFAULTS = dict(
+    min_size=1,
+    max_size=1024,
+    max_lifetime=60 * 60.0,
+    max_idle=10 * 60.0,
+    timeout=30.0,
+    reconnect_timeout=0,
+    check="always",
+    prepare_threshold=5,
+)
+
+CHECK_POLICIES = ("always", "never")
+
 
 def pool_shutdown():
     for pool in conns.values():
-        pool.close()
+        if pool.pid == os.getpid():
+            pool.close()
 
 
 def close_pool(db_url):
-    """Close and remove the connection pool for a specific database URL.
+    """Close and remove the connection pool(s) for a specific database URL.
 
     This should be called before dropping a database to prevent
     "server closed the connection unexpectedly" errors.
     """
-    if db_url in conns:
-        pool = conns[db_url]
-        pool.close()
-        del conns[db_url]
+    for key in [k for k in conns if k[0] == db_url]:
+        pool = conns.pop(key)
+
+        if pool.pid == os.getpid():
+            pool.close()
+        else:
+            abandoned_pools.append(pool)
 
 
 atexit.register(pool_shutdown)
 
 
 def connection_check(conn):
-    with conn.cursor() as curs:
-        curs.execute("SELECT 1")
+    # run outside of a transaction, so the connection is handed out idle
+    autocommit = conn.autocommit
+    conn.autocommit = True
 
+    try:
+        with conn.cursor() as curs:
+            curs.execute("SELECT 1")
+    finally:
+        conn.autocommit = autocommit
 
-def reconnect_failed(connection_pool, **kwargs):
-    connection_pool.queue.put("failed")
 
+def pool_check(policy):
+    """The checkout check function for a check policy: "always" runs a
+    SELECT 1 on every checkout, "never" skips the extra round trip and relies
+    on max_lifetime/max_idle to retire connections. A callable is used as-is.
+    """
+    if callable(policy):
+        return policy
 
-@contextmanager
-def pooled_connection(db_url):
-    if db_url not in conns:
-
-        def configure_check(connection, **kwargs):
-            pool.queue.put("ok")
-
-        pool = ConnectionPool(
-            db_url,
-            min_size=1,
-            max_size=1024,
-            open=False,
-            configure=configure_check,
-            check=connection_check,
-            reconnect_timeout=0,
-            reconnect_failed=reconnect_failed,
-        )
+    if policy not in CHECK_POLICIES:
+        raise ValueError(f"check must be one of {CHECK_POLICIES} or a callable")
 
-        queue = multiprocessing.Queue()
+    return connection_check if policy == "always" else None
 
-        pool.queue = queue
 
-        pool.open()
+def validated_pool_options(**options):
+    unknown = set(options) - set(POOL_DEFAULTS)
 
-        conns[db_url] = pool
-        result = pool.queue.get()
+    if unknown:
+        raise ValueError(f"unknown pool options: {', '.join(sorted(unknown))}")
 
-        if result != "ok":
-            raise ValueError("Connection failed")
+    return {**POOL_DEFAULTS, **options}
 
-    else:
-        pool = conns[db_url]
+
+def pool_key(db_url, options):
+    return (db_url, tuple(sorted(options.items())))
+
+
+def create_pool(db_url, options):
+    ready = Event()
+
+    def configure_check(connection, **kwargs):
+        ready.set()
+
+    def reconnect_failed(connection_pool, **kwargs):
+        connection_pool.failed = True
+        ready.set()
+
+    options = dict(options)
+    check = pool_check(options.pop("check"))
+    connection_kwargs = dict(prepare_threshold=options.pop("prepare_threshold"))
+
+    pool = ConnectionPool(
+        db_url,
+        open=False,
+        configure=configure_check,
+        check=check,
+        reconnect_failed=reconnect_failed,
+        kwargs=connection_kwargs,
+        **options,
+    )
+
+    pool.failed = False
+    pool.pid = os.getpid()
+
+    pool.open()
+
+    # with min_size=0 no connection is made until the first checkout
+    if options["min_size"]:
+        ready.wait()
+
+    if pool.failed:
+        pool.close()
+        raise ValueError("Connection failed")
+
+    return pool
+
+
+def get_pool(db_url, create=True, **options):
+    """Return the connection pool for db_url with the given options,
+    creating it if necessary.
+
+    Pools are per-process: a pool inherited across a fork is abandoned
+    (never closed, since its connections belong to the parent) and a new
+    one created.
+    """
+    options = validated_pool_options(**options)
+    key = pool_key(db_url, options)
+
+    pool = current_pool(key)
+
+    if pool is None and create:
+        # only one thread creates each pool, any others wait for it
+        with pools_lock:
+            creating = pool_creation_locks.setdefault(key, Lock())
+
+        with creating:
+            pool = current_pool(key)
+
+            if pool is None:
+                pool = conns[key] = create_pool(db_url, options)
+
+    return pool
+
+
+def current_pool(key):
+    pool = conns.get(key)
+
+    if pool is not None and pool.pid != os.getpid():
+        abandoned = conns.pop(key, None)
+
+        if abandoned is not None:
+            abandoned_pools.append(abandoned)
+
+        pool = None
+
+    return pool
+
+
+@contextmanager
+def pooled_connection(db_url, **options):
+    pool = get_pool(db_url, **options)
 
     with pool.connection() as conn:
         yield conn
 
 
+def pool_stats(pool):
+    """Statistics for a pool, from psycopg_pool's get_stats(), plus:
+
+    - connections_in_use: connections currently checked out
+    - requests_wait_ms_avg: average time spent waiting for a connection
+    """
+    stats = dict(pool.get_stats())
+
+    stats["connections_in_use"] = stats.get("pool_size", 0) - stats.get(
+        "pool_available", 0
+    )
+
+    waited = stats.get("requests_num", 0)
+
+    if waited:
+        stats["requests_wait_ms_avg"] = stats.get("requests_wait_ms", 0) / waited
+    else:
+        stats["requests_wait_ms_avg"] = 0.0
+
+    return stats
+
+
 def put_conn(conn, db_url):
-    tid = get_ident()
+    pool = get_pool(db_url)
+    pool.putconn(conn)
+
+
+def column_info_from_description(description):
+    return {c.name: type_codes.get(c.type_code, "unknown") for c in description}
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def rewritten_query(query, colon_bind_params=True):
+    """Escape a query for psycopg and rewrite its :colon bind params.
+
+    Cached, since the same query text is typically run over and over."""
+    query = query.replace("%", "%" + "%")
+
+    if colon_bind_params:
+        query = reformat_bind_params(query)
+
+    return query
+
+
+def prepared_query(query, params, paging=None, colon_bind_params=True):
+    """Escape a query for psycopg, rewrite its :colon bind params and wrap it
+    for paging if required. Returns the query and the (updated) params."""
+    query = rewritten_query(query, bool(params) and colon_bind_params)
+
+    if paging:
+        query, params = get_paged_query(query, params, **paging)
+
+    return query, params
+
+
+def paging_index_key(query, paging, info):
+    """The index that paging on query requires (paging=dict(require_index=
+    True)), as (host, port, dbname, table, columns, descending), for the
+    database described by info. Raises ValueError if no index could do, as
+    the order columns aren't plain columns of a single table."""
+    cols = parse_order_by(paging["order_by"])
+
+    if paging.get("backwards"):
+        cols = reversed_order_by(cols)
+
+    plan = keyset_plan(query, tuple(c[0] for c in cols))
+
+    if plan is None or plan.table is None:
+        raise ValueError(
+            "Paging requires an index, but the order columns aren't plain "
+            "columns of a single table."
+        )
+
+    columns = tuple(plan.columns)
+    descending = tuple(d for _, d in cols)
+
+    return (info.host, info.port, info.dbname, plan.table, columns, descending)
+
+
+def missing_paging_index(table, columns):
+    return f"No index on {table} ({', '.join(columns)}) matches the paging order."
+
+
+class TotalCount:
+    """The total count asked for by a paged query (paging=dict(count=...)),
+    for Transaction.q and AsyncTransaction.q.
+
+    A fresh enough cached total is used if there is one, and then .paging
+    no longer asks for it. Otherwise it's .needed: count it, and pass it to
+    counted() to be cached.
+    """
+
+    def __init__(self, query, params, paging, curs, colon_bind_params=True):
+        self.paging = paging
+        self.method = paging.get("count") if paging else None
+        self.total = None
+
+        if not self.method:
+            return
+
+        if self.method not in COUNT_METHODS:
+            raise ValueError(f"count must be one of: {COUNT_METHODS}")
 
-    pool = conns[db_url]
-    pool.putconn(conn, tid)
+        self.query = rewritten_query(query, bool(params) and colon_bind_params)
+        self.params = dict(params)
+        self.key = count_key(curs.connection.info, self.query, self.params)
+        total = cached_count(self.key)
+
+        # an exact total will do for an estimate, but not vice versa
+        if total is not None and not (self.method == "exact" and total[1]):
+            self.total = total
+            self.paging = dict(paging, count=None)
+
+    @property
+    def needed(self):
+        return bool(self.method) and self.total is None
+
+    def counted(self, total):
+        self.total = total
+        ttl = self.paging.get("count_ttl")
+        cache_count(self.key, *total, ttl=COUNT_TTL if ttl is None else ttl)
+
+    def paged_rows(self, rows):
+        """rows as a page, with the total count if one was asked for."""
+        rows = get_paged_rows(rows, self.paging)
+
+        if self.method:
+            rows.paging.total_count, rows.paging.total_estimated = self.total
+
+        return rows
+
+
+def fetched_rows(curs):
+    """Fetch the results of the last query run on a cursor as Rows (or None
+    if it returned no results)."""
+    if curs.description is None:
+        return None
+
+    rows = Rows(curs.fetchall())
+    rows.column_info = column_info_from_description(curs.description)
+
+    return rows
+
+
+class Pipeline:
+    """Queries sent together in libpq pipeline mode.
+
+    Each q() is sent straight away without waiting for its results, and all
+    of the results are collected at the end of the with block, into
+    .results (in order: Rows, or None for statements that return nothing).
+    So any number of independent queries cost a single round trip.
+
+    As each query's results aren't available until the end, queries can't
+    depend on the results of earlier ones.
+    """
+
+    def __init__(self, t):
+        self.t = t
+        self.cursors = []
+        self.results = None
+
+    def q(self, query, params=None, *, colon_bind_params=True, **kwargs):
+        _params = {}
+
+        if params:
+            _params.update(params)
+
+        if kwargs:
+            _params.update(kwargs)
+
+        query, _params = prepared_query(
+            query, _params, colon_bind_params=colon_bind_params
+        )
+
+        curs = self.t.c.connection.cursor()
+        self.cursors.append(curs)
+        curs.execute(query, _params)
+
+    def __enter__(self):
+        self.pipeline = self.t.c.connection.pipeline()
+        self.pipeline.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            self.pipeline.__exit__(*exc_info)
+
+            if exc_info[0] is None:
+                self.results = [fetched_rows(c) for c in self.cursors]
+        finally:
+            for c in self.cursors:
+                c.close()
 
 
 def get_inspected(t, **kwargs):
@@ -101,7 +428,7 @@ def get_inspected(t, **kwargs):
     return get_inspector(t.c, **kwargs)
 
 
-class Transaction(Inserting):
+class Transaction(Inserting, Exporting):
     def __init__(self):
         self._back = 0
 
@@ -114,21 +441,33 @@ class Transaction(Inserting):
     def execute(self, *args, **kwargs) -> Rows:
         self.c.execute(*args, **kwargs)
 
-        if self.c.description is None:
-            return None
+        return fetched_rows(self.c)
 
-        fetched = self.c.fetchall()
-        descr = list(self.c.description)
+    def pipeline(self):
+        """Send queries in a single round trip (see Pipeline):
 
-        rows = Rows(fetched)
+            with t.pipeline() as p:
+                p.q("select ...")
+                p.q("update ...", x=1)
 
-        rows.paging = None
+            p.results
+        """
+        return Pipeline(self)
 
-        column_info = {c.name: type_codes.get(c.type_code, "unknown") for c in descr}
+    def batch(self, queries):
+        """Run a list of queries in a single round trip, returning their
+        results in order.
 
-        rows.column_info = column_info
+        Each query is a string, or a (query, params) tuple.
+        """
+        with self.pipeline() as p:
+            for query in queries:
+                if isinstance(query, str):
+                    p.q(query)
+                else:
+                    p.q(*query)
 
-        return rows
+        return p.results
 
     def executemany(self, *args, **kwargs) -> Rows:
         self.c.executemany(*args, **kwargs, returning=True)
@@ -153,12 +492,52 @@ class Transaction(Inserting):
 
         rows.paging = None
 
-        column_info = {c.name: type_codes.get(c.type_code, "unknown") for c in descr}
-
-        rows.column_info = column_info
+        rows.column_info = column_info_from_description(descr)
 
         return rows
 
+    def execute_stream(
+        self, *args, batch_size=STREAM_BATCH_SIZE, by_row=False, empty=False
+    ):
+        """Execute a query on a named (server-side) cursor, yielding results
+        as they're fetched rather than all at once.
+
+        Yields Rows batches of up to batch_size rows (each with the usual
+        column_info), or individual rows if by_row is set. With empty set,
+        a query returning no rows still yields one (empty) batch, for its
+        column_info.
+        """
+        conn = self.c.connection
+        name = f"results_stream_{rando()}"
+
+        # outside a transaction block, the cursor must be declared WITH HOLD
+        with conn.cursor(name=name, withhold=conn.autocommit) as curs:
+            curs.itersize = batch_size
+            curs.execute(*args)
+
+            column_info = column_info_from_description(curs.description)
+            yielded = False
+
+            while True:
+                fetched = curs.fetchmany(batch_size)
+
+                if not fetched:
+                    break
+
+                if by_row:
+                    yield from fetched
+                else:
+                    rows = Rows(fetched)
+                    rows.column_info = column_info
+                    yield rows
+
+                yielded = True
+
+            if empty and not by_row and not yielded:
+                rows = Rows()
+                rows.column_info = column_info
+                yield rows
+
     @property
     def db_version(self) -> int:
         return self.c.connection.pgconn.server_version // 10000
@@ -198,6 +577,78 @@ class Transaction(Inserting):
     def all_pages(self, *args, paging: dict, **kwargs):
         return list(self.pages(*args, paging=paging, **kwargs))
 
+    def keyset_index_exists(self, table, columns, descending):
+        """Whether table has a btree index that can return rows ordered by
+        columns (in the given directions), for keyset paging."""
+        self.c.execute(KEYSET_ATTNUMS, dict(table=table, columns=list(columns)))
+        attnums = dict(self.c.fetchall())
+
+        if len(attnums) != len(columns):
+            return False
+
+        attnums = [attnums[c] for c in columns]
+
+        self.c.execute(KEYSET_INDEXES, dict(table=table))
+
+        return any(
+            index_matches(keys, options, attnums, descending)
+            for keys, options in self.c.fetchall()
+        )
+
+    def require_paging_index(self, query, paging):
+        """Raise ValueError unless the order columns of paging are plain
+        columns of a single table, backed by a matching index (see
+        keyset_index_exists), so that deep pages cost the same as the
+        first."""
+        key = paging_index_key(query, paging, self.c.connection.info)
+
+        # indexes found are remembered; missing ones are checked every time
+        if key in known_keyset_indexes:
+            return
+
+        *_, table, columns, descending = key
+
+        if self.keyset_index_exists(table, columns, descending):
+            known_keyset_indexes.add(key)
+        else:
+            raise ValueError(missing_paging_index(table, columns))
+
+    def paging_total_count(self, query, params, paging, rows):
+        """The total number of rows of a paged query (before paging), and
+        whether that's only an estimate.
+
+        With count="exact", the total comes from the count column added to
+        the page itself (see COUNTED_QUERY), which is removed from rows.
+        With count="estimate", it's the planner's row estimate, from EXPLAIN.
+        """
+        if paging["count"] == "estimate":
+            explained = self.execute(ESTIMATED_COUNT_QUERY.format(q=query), params)
+            return plan_rows(explained[0][0]), True
+
+        total = counted_rows(rows)
+
+        if total is None:
+            if paging.get("bookmark") is None:
+                total = 0
+            else:
+                # past the last page, so there's no row to take it from
+                total = self.execute(COUNT_QUERY.format(q=query), params)[0][0]
+
+        return total, False
+
+    def stream(
+        self,
+        query,
+        params=None,
+        *,
+        batch_size=STREAM_BATCH_SIZE,
+        by_row=False,
+        empty=False,
+        **kwargs,
+    ):
+        stream = dict(batch_size=batch_size, by_row=by_row, empty=empty)
+        return self.q(query, params, stream=stream, **kwargs)
+
     def q(
         self,
         query,
@@ -205,18 +656,36 @@ class Transaction(Inserting):
         *,
         context=False,
         paging=None,
+        stream=None,
+        columnar=False,
         fail_on_empty=False,
         colon_bind_params=True,
+        prepare=None,
         **kwargs,
     ):
+        """Run a query, returning its results as Rows.
+
+        prepare=True prepares the statement server-side (per connection)
+        straight away; prepare=False never does. By default, psycopg
+        prepares queries once they've been run prepare_threshold times.
+
+        Paged queries can also count the total number of rows, with
+        paging=dict(..., count="exact") or count="estimate" (see
+        paging_total_count). Totals are cached per query and params for
+        count_ttl seconds, so paging through doesn't recount every page.
+        """
+        if paging and stream:
+            raise ValueError("Cannot both page and stream a query.")
+
+        if columnar and stream:
+            raise ValueError("Cannot both stream a query and get columnar results.")
+
         if not query.strip():
             if fail_on_empty:
                 raise ValueError("Error: Empty query.")
             else:
                 return None
 
-        query = query.replace("%", "%" + "%")
-
         if context:
             frame = currentframe()
 
@@ -238,16 +707,42 @@ class Transaction(Inserting):
             if kwargs:
                 _params.update(kwargs)
 
-            if _params and colon_bind_params:
-                query = reformat_bind_params(query)
+            if paging and paging.get("require_index"):
+                self.require_paging_index(
+                    rewritten_query(query, bool(_params) and colon_bind_params),
+                    paging,
+                )
 
-            if paging:
-                query, _params = get_paged_query(query, _params, **paging)
+            counting = TotalCount(
+                query, _params, paging, self.c, colon_bind_params
+            )
+            paging = counting.paging
+
+            query, _params = prepared_query(
+                query, _params, paging=paging, colon_bind_params=colon_bind_params
+            )
 
-            rows = self.execute(query, _params)
+            if stream:
+                stream_options = stream if isinstance(stream, dict) else {}
+                return self.execute_stream(query, _params, **stream_options)
+
+            if prepare is None:
+                rows = self.execute(query, _params)
+            else:
+                rows = self.execute(query, _params, prepare=prepare)
 
             if paging:
-                rows = get_paged_rows(rows, paging)
+                if counting.needed:
+                    counting.counted(
+                        self.paging_total_count(
+                            counting.query, counting.params, paging, rows
+                        )
+                    )
+
+                rows = counting.paged_rows(rows)
+
+            if columnar and rows is not None:
+                return columnar_rows(rows, self.c.description)
 
             return rows
         finally:
@@ -293,20 +788,30 @@ def autocommit_connection(db_url):
 
 
 @contextmanager
-def transaction(db_url):  # , cursor_factory=DictCursor):
-    with pooled_connection(db_url) as conn:
+def transaction(db_url, **pool_options):  # , cursor_factory=DictCursor):
+    with pooled_connection(db_url, **pool_options) as conn:
         with conn.cursor() as curs:
             t = Transaction()
             t.c = curs
             yield t
 
 
-def db(url=None):
-    return Database(url)
+def db(url=None, **pool_options):
+    return Database(url, **pool_options)
 
 
-class Database(DatabaseCreateDrop, Schemas, ListenNotify):
-    def __init__(self, url=None):
+class Database(DatabaseCreateDrop, Schemas, ListenNotify, ParallelPages):
+    def __init__(self, url=None, **pool_options):
+        """pool_options configure this database's connection pool:
+        min_size, max_size, max_lifetime, max_idle (seconds), timeout (to
+        wait for a connection), reconnect_timeout, check ("always",
+        "never" or a callable) and prepare_threshold (how many times a
+        query is run on a connection before it's automatically prepared
+        server-side: 0 to prepare everything, None to disable prepared
+        statements entirely, as needed behind pgbouncer in transaction
+        mode). Databases with the
+        same url and options share a pool.
+        """
         if url is None:
             url = getpass.getuser()
 
@@ -318,6 +823,9 @@ class Database(DatabaseCreateDrop, Schemas, ListenNotify):
         self.URL = _url
         self.url = str(_url)
 
+        validated_pool_options(**pool_options)
+        self.pool_options = pool_options
+
     @property
     def url_object(self):
         return URL(self.url)
@@ -330,7 +838,7 @@ class Database(DatabaseCreateDrop, Schemas, ListenNotify):
 
         if is_self and allow_self is False:
             raise ValueError("sibling must not be the same database")
-        return db(str(sibling_url))
+        return db(str(sibling_url), **self.pool_options)
 
     @property
     def name(self):
@@ -338,9 +846,26 @@ class Database(DatabaseCreateDrop, Schemas, ListenNotify):
 
     @contextmanager
     def t(self):
-        with transaction(self.url) as t:
+        with transaction(self.url, **self.pool_options) as t:
             yield t
 
+    def pool_stats(self):
+        """Connection pool statistics (see pool_stats), or None if this
+        database's pool hasn't been created yet."""
+        pool = get_pool(self.url, create=False, **self.pool_options)
+
+        if pool is None:
+            return None
+
+        return pool_stats(pool)
+
+    def inspect(self, **kwargs):
+        """Inspect this database's schema (see get_inspector: with
+        workers=n, the catalog queries run on n connections at once)."""
+        from results.schemainspect import get_inspector
+
+        return get_inspector(self, **kwargs)
+
     @contextmanager
     def t_autocommit(self):
         with autocommit_transaction(self.url) as t:
@@ -355,8 +880,24 @@ class Database(DatabaseCreateDrop, Schemas, ListenNotify):
         with self.t_autocommit() as t:
             t.q(*args, **kwargs)
 
+    def stream(self, *args, **kwargs):
+        """Stream query results in batches from a server-side cursor.
+
+        The transaction (and its pooled connection) is held open until the
+        returned generator is exhausted or closed.
+        """
+        return self._streamed("stream", *args, **kwargs)
+
+    def _streamed(self, name, *args, **kwargs):
+        with self.t() as t:
+            t._back = 1
+            yield from getattr(t, name)(*args, **kwargs)
+
     def __getattr__(self, name):
         def method(*args, **kwargs):
+            if kwargs.get("stream"):
+                return self._streamed(name, *args, **kwargs)
+
             with self.t() as t:
                 t._back = 1
                 m = getattr(t, name)
@@ -1,3 +1,5 @@
+import bisect
+import heapq
 from collections import OrderedDict as od
 from functools import partial
 
@@ -116,81 +118,104 @@ def statements_from_differences(
         for k, v in modified.items():
             statements += v.alter_statements(old[k])
 
-    def has_remaining_dependents(v, pending_drops):
-        if not dependency_ordering:
-            return False
+    # Each place a drop or creation can happen, in the order they're
+    # considered: removed drops, then added creations, then modified items.
+    slots = []
+
+    if drops:
+        slots += [("drop", k, v) for k, v in removed.items()]
+        # When drops_only=True, also process modified items
+        if drops_only:
+            slots += [("drop", k, v) for k, v in modified.items()]
+    if creations:
+        slots += [("create", k, v) for k, v in added.items()]
+        # When creations_only=True, also process modified items. Replaceable
+        # ones (views, functions) use CREATE OR REPLACE instead
+        if creations_only:
+            slots += [
+                (
+                    "replace"
+                    if k in replaceable and k not in pending_creations
+                    else "create",
+                    k,
+                    v,
+                )
+                for k, v in modified.items()
+            ]
+    if modifications:
+        for k, v in modified.items():
+            if drops:
+                slots.append(("drop", k, v))
+            if creations:
+                slots.append(("create", k, v))
+
+    def pending(action, k):
+        if action == "drop":
+            return k in pending_drops
+        return action == "replace" or k in pending_creations
+
+    # each drop/creation/replacement, with the positions of its slots
+    events = {}
 
-        return bool(set(v.dependents) & pending_drops)
+    for position, (action, k, v) in enumerate(slots):
+        if pending(action, k):
+            events.setdefault((action, k), (v, []))[1].append(position)
+
+    # how many drops (of dependents) or creations (of dependencies) each
+    # event is waiting on, and which events wait on each
+    blocking = {}
+    waiting = {}
+
+    for event, (v, _) in events.items():
+        action, k = event
 
-    def has_uncreated_dependencies(v, pending_creations):
         if not dependency_ordering:
-            return False
+            blockers = []
+        elif action == "drop":
+            blockers = [("drop", d) for d in set(v.dependents) & pending_drops]
+        else:
+            blockers = [("create", d) for d in set(v.dependent_on) & pending_creations]
+
+        blocking[event] = len(blockers)
+
+        for blocker in blockers:
+            waiting.setdefault(blocker, []).append(event)
+
+    # Kahn's algorithm, over events ordered by (round, position): as if
+    # sweeping through the slots over and over, and making each change at
+    # the first of its slots reached once nothing blocks it
+    ready = [(0, events[e][1][0], e) for e, count in blocking.items() if not count]
+    heapq.heapify(ready)
+    done = 0
+
+    while ready:
+        sweep, position, event = heapq.heappop(ready)
+        action, k = event
+        v = events[event][0]
+        done += 1
+
+        if action == "drop":
+            statements.append(old[k].drop_statement)
+        elif hasattr(v, "safer_create_statements"):
+            statements += v.safer_create_statements
+        else:
+            statements.append(v.create_statement)
 
-        return bool(set(v.dependent_on) & pending_creations)
+        for unblocked in waiting.get(event, []):
+            blocking[unblocked] -= 1
 
-    while True:
-        before = pending_drops | pending_creations
-        if drops:
-            for k, v in removed.items():
-                if not has_remaining_dependents(v, pending_drops):
-                    if k in pending_drops:
-                        statements.append(old[k].drop_statement)
-                        pending_drops.remove(k)
-            # When drops_only=True, also process modified items
-            if drops_only:
-                for k, v in modified.items():
-                    if not has_remaining_dependents(v, pending_drops):
-                        if k in pending_drops:
-                            statements.append(old[k].drop_statement)
-                            pending_drops.remove(k)
-        if creations:
-            for k, v in added.items():
-                if not has_uncreated_dependencies(v, pending_creations):
-                    if k in pending_creations:
-                        if hasattr(v, "safer_create_statements"):
-                            statements += v.safer_create_statements
-                        else:
-                            statements.append(v.create_statement)
-                        pending_creations.remove(k)
-            # When creations_only=True, also process modified items
-            if creations_only:
-                for k, v in modified.items():
-                    if not has_uncreated_dependencies(v, pending_creations):
-                        if k in pending_creations:
-                            if hasattr(v, "safer_create_statements"):
-                                statements += v.safer_create_statements
-                            else:
-                                statements.append(v.create_statement)
-                            pending_creations.remove(k)
-                        # Handle replaceable modified items (views, functions) - they use CREATE OR REPLACE
-                        elif k in replaceable:
-                            if hasattr(v, "safer_create_statements"):
-                                statements += v.safer_create_statements
-                            else:
-                                statements.append(v.create_statement)
-        if modifications:
-            for k, v in modified.items():
-                if drops:
-                    if not has_remaining_dependents(v, pending_drops):
-                        if k in pending_drops:
-                            statements.append(old[k].drop_statement)
-                            pending_drops.remove(k)
-                if creations:
-                    if not has_uncreated_dependencies(v, pending_creations):
-                        if k in pending_creations:
-                            if hasattr(v, "safer_create_statements"):
-                                statements += v.safer_create_statements
-                            else:
-                                statements.append(v.create_statement)
-                            pending_creations.remove(k)
-        after = pending_drops | pending_creations
-        if not after:
-            break
-
-        elif (
-            after == before
-        ):  # this should never happen because there shouldn't be circular dependencies
-            raise ValueError("cannot resolve dependencies")  # pragma: no cover
+            if not blocking[unblocked]:
+                positions = events[unblocked][1]
+                i = bisect.bisect_right(positions, position)
+
+                if i < len(positions):
+                    heapq.heappush(ready, (sweep, positions[i], unblocked))
+                else:
+                    heapq.heappush(ready, (sweep + 1, positions[0], unblocked))
+
+    if done < len(events):
+        # this should never happen because there shouldn't be circular dependencies
+        raise ValueError("cannot resolve dependencies")  # pragma: no cover
 
     return statements
 
@@ -496,6 +521,42 @@ def get_selectable_differences(
     )
 
 
+def cached_selectable_differences(
+    differences_cache,
+    selectables_from,
+    selectables_target,
+    enums_from,
+    enums_target,
+    add_dependents_for_modified=True,
+):
+    """get_selectable_differences, remembered in differences_cache (if not
+    None), a dict only ever used with these same selectables and enums."""
+    if differences_cache is None:
+        return get_selectable_differences(
+            selectables_from,
+            selectables_target,
+            enums_from,
+            enums_target,
+            add_dependents_for_modified,
+        )
+
+    try:
+        return differences_cache[add_dependents_for_modified]
+    except KeyError:
+        pass
+
+    diff = differences_cache[add_dependents_for_modified] = (
+        get_selectable_differences(
+            selectables_from,
+            selectables_target,
+            enums_from,
+            enums_target,
+            add_dependents_for_modified,
+        )
+    )
+    return diff
+
+
 def get_trigger_changes(
     triggers_from,
     triggers_target,
@@ -504,6 +565,7 @@ def get_trigger_changes(
     enums_from,
     enums_target,
     add_dependents_for_modified=True,
+    differences_cache=None,
     **kwargs,
 ):
     (
@@ -516,7 +578,8 @@ def get_trigger_changes(
         _,
         modified_other,
         replaceable,
-    ) = get_selectable_differences(
+    ) = cached_selectable_differences(
+        differences_cache,
         selectables_from,
         selectables_target,
         enums_from,
@@ -542,6 +605,40 @@ def get_trigger_changes(
     )
 
 
+def non_composite_types(d):
+    return {k: v for k, v in d.items() if getattr(v, "relationtype", None) != "c"}
+
+
+def selectable_comment_statements(added_other, modified_other, selectables_from):
+    statements = Statements()
+
+    # Add COMMENT statements for created/modified non-table selectables
+    # Note: comment_alter_statements(other) generates statements to transform FROM self TO other
+    # So we call old.comment_alter_statements(new) to go from old to new
+    for k, v in added_other.items():
+        if v.comment:
+            # For added items, just generate the comment directly
+            object_type_map = {
+                "r": "TABLE",
+                "p": "TABLE",
+                "v": "VIEW",
+                "m": "MATERIALIZED VIEW",
+                "c": "TYPE",
+                "f": "FUNCTION",
+            }
+            object_type = object_type_map.get(v.relationtype, "TABLE")
+            escaped_comment = v.comment.replace("'", "''")
+            statements.append(
+                f"COMMENT ON {object_type} {v.quoted_full_name} IS '{escaped_comment}';"
+            )
+    for k, v in modified_other.items():
+        if k in selectables_from:
+            old_obj = selectables_from[k]
+            statements += old_obj.comment_alter_statements(v)
+
+    return statements
+
+
 def get_selectable_changes(
     selectables_from,
     selectables_target,
@@ -555,6 +652,7 @@ def get_selectable_changes(
     drops_only=False,
     creations_only=False,
     modifications_only=False,
+    differences_cache=None,
 ):
     (
         tables_from,
@@ -566,7 +664,8 @@ def get_selectable_changes(
         removed_other,
         modified_other,
         replaceable,
-    ) = get_selectable_differences(
+    ) = cached_selectable_differences(
+        differences_cache,
         selectables_from,
         selectables_target,
         enums_from,
@@ -578,9 +677,6 @@ def get_selectable_changes(
     def functions(d):
         return {k: v for k, v in d.items() if v.relationtype == "f"}
 
-    def non_composite_types(d):
-        return {k: v for k, v in d.items() if getattr(v, "relationtype", None) != "c"}
-
     # Filter out composite types since they are handled separately by the types() method
     added_other = non_composite_types(added_other)
     removed_other = non_composite_types(removed_other)
@@ -623,39 +719,115 @@ def get_selectable_changes(
                 old=selectables_from,
             )
 
-            # Add COMMENT statements for created/modified non-table selectables
-            # Note: comment_alter_statements(other) generates statements to transform FROM self TO other
-            # So we call old.comment_alter_statements(new) to go from old to new
-            for k, v in added_other.items():
-                if v.comment:
-                    # For added items, just generate the comment directly
-                    object_type_map = {
-                        "r": "TABLE",
-                        "p": "TABLE",
-                        "v": "VIEW",
-                        "m": "MATERIALIZED VIEW",
-                        "c": "TYPE",
-                        "f": "FUNCTION",
-                    }
-                    object_type = object_type_map.get(v.relationtype, "TABLE")
-                    escaped_comment = v.comment.replace("'", "''")
-                    statements.append(
-                        f"COMMENT ON {object_type} {v.quoted_full_name} IS '{escaped_comment}';"
-                    )
-            for k, v in modified_other.items():
-                if k in selectables_from:
-                    old_obj = selectables_from[k]
-                    statements += old_obj.comment_alter_statements(v)
+            statements += selectable_comment_statements(
+                added_other, modified_other, selectables_from
+            )
 
     return statements
 
 
+SELECTABLE_KINDS = {
+    "functions": lambda v: getattr(v, "relationtype", None) == "f",
+    "non_function_non_tables": lambda v: (
+        getattr(v, "relationtype", None) not in ("f", "r", "p")
+    ),
+}
+
+
 class Changes(object):
+    """The changes from i_from to i_target, by category.
+
+    The sorted (and partitioned) selectables, and the differences between
+    them, are worked out once and shared by every category that uses them,
+    until i_from or i_target is replaced. (So the inspected schemas shouldn't
+    be modified in place in between.)
+    """
+
     def __init__(self, i_from, i_target, ignore_extension_versions=False):
         self.i_from = i_from
         self.i_target = i_target
         self.ignore_extension_versions = ignore_extension_versions
 
+    @property
+    def i_from(self):
+        return self._i_from
+
+    @i_from.setter
+    def i_from(self, i_from):
+        self._i_from = i_from
+        self.cached = {}
+
+    @property
+    def i_target(self):
+        return self._i_target
+
+    @i_target.setter
+    def i_target(self, i_target):
+        self._i_target = i_target
+        self.cached = {}
+
+    def cached_value(self, key, compute):
+        try:
+            return self.cached[key]
+        except KeyError:
+            value = self.cached[key] = compute()
+            return value
+
+    def sorted_items(self, att):
+        """(from, target) dicts of att (selectables, triggers...), sorted."""
+        return self.cached_value(
+            ("sorted", att),
+            lambda: (
+                od(sorted(getattr(self.i_from, att).items())),
+                od(sorted(getattr(self.i_target, att).items())),
+            ),
+        )
+
+    def partitioned_selectables(self, kind=None):
+        """Sorted (from, target) selectables of one kind: "functions",
+        "non_function_non_tables", or all of them (None)."""
+        if kind is None:
+            return self.sorted_items("selectables")
+
+        keep = SELECTABLE_KINDS[kind]
+
+        def partitioned():
+            a, b = self.sorted_items("selectables")
+            return (
+                od((k, v) for k, v in a.items() if keep(v)),
+                od((k, v) for k, v in b.items() if keep(v)),
+            )
+
+        return self.cached_value(("selectables", kind), partitioned)
+
+    def selectable_differences(self, kind=None):
+        """get_selectable_differences for selectables of one kind (as for
+        partitioned_selectables), shared with selectable_changes."""
+        a, b = self.partitioned_selectables(kind)
+
+        return cached_selectable_differences(
+            self.cached.setdefault(("differences", kind), {}),
+            a,
+            b,
+            self.i_from.enums,
+            self.i_target.enums,
+        )
+
+    def selectable_changes(self, kind=None, **kwargs):
+        a, b = self.partitioned_selectables(kind)
+
+        return partial(
+            get_selectable_changes,
+            a,
+            b,
+            self.i_from.enums,
+            self.i_target.enums,
+            self.i_from.sequences,
+            self.i_target.sequences,
+            differences_cache=self.cached.setdefault(("differences", kind), {}),
+            **kwargs,
+        )
+
     @property
     def extensions(self):
         if self.ignore_extension_versions:
@@ -682,106 +854,46 @@ class Changes(object):
 
     @property
     def selectables(self):
-        return partial(
-            get_selectable_changes,
-            od(sorted(self.i_from.selectables.items())),
-            od(sorted(self.i_target.selectables.items())),
-            self.i_from.enums,
-            self.i_target.enums,
-            self.i_from.sequences,
-            self.i_target.sequences,
-        )
+        return self.selectable_changes()
 
     @property
     def tables_only_selectables(self):
-        return partial(
-            get_selectable_changes,
-            od(sorted(self.i_from.selectables.items())),
-            od(sorted(self.i_target.selectables.items())),
-            self.i_from.enums,
-            self.i_target.enums,
-            self.i_from.sequences,
-            self.i_target.sequences,
-            tables_only=True,
-        )
+        return self.selectable_changes(tables_only=True)
 
     @property
     def non_table_selectable_drops(self):
-        return partial(
-            get_selectable_changes,
-            od(sorted(self.i_from.selectables.items())),
-            od(sorted(self.i_target.selectables.items())),
-            self.i_from.enums,
-            self.i_target.enums,
-            self.i_from.sequences,
-            self.i_target.sequences,
-            drops_only=True,
-            non_tables_only=True,
-        )
+        return self.selectable_changes(drops_only=True, non_tables_only=True)
 
     @property
     def non_table_selectable_creations(self):
-        return partial(
-            get_selectable_changes,
-            od(sorted(self.i_from.selectables.items())),
-            od(sorted(self.i_target.selectables.items())),
-            self.i_from.enums,
-            self.i_target.enums,
-            self.i_from.sequences,
-            self.i_target.sequences,
-            creations_only=True,
-            non_tables_only=True,
-        )
-
-    def _selectables_filtered(self, fn_filter):
-        """Helper: return (from, target) selectables dicts filtered by fn_filter."""
-        return (
-            od((k, v) for k, v in sorted(self.i_from.selectables.items()) if fn_filter(v)),
-            od((k, v) for k, v in sorted(self.i_target.selectables.items()) if fn_filter(v)),
-        )
+        return self.selectable_changes(creations_only=True, non_tables_only=True)
 
     @property
     def function_drops(self):
         """Drop changes for functions only (relationtype == 'f')."""
-        a, b = self._selectables_filtered(lambda v: getattr(v, "relationtype", None) == "f")
-        return partial(
-            get_selectable_changes, a, b,
-            self.i_from.enums, self.i_target.enums,
-            self.i_from.sequences, self.i_target.sequences,
-            drops_only=True, non_tables_only=True,
+        return self.selectable_changes(
+            "functions", drops_only=True, non_tables_only=True
         )
 
     @property
     def function_creations(self):
         """Create/replace changes for functions only (relationtype == 'f')."""
-        a, b = self._selectables_filtered(lambda v: getattr(v, "relationtype", None) == "f")
-        return partial(
-            get_selectable_changes, a, b,
-            self.i_from.enums, self.i_target.enums,
-            self.i_from.sequences, self.i_target.sequences,
-            creations_only=True, non_tables_only=True,
+        return self.selectable_changes(
+            "functions", creations_only=True, non_tables_only=True
         )
 
     @property
     def non_function_non_table_selectable_drops(self):
         """Drop changes for views/matviews/composite types (not functions, not tables)."""
-        a, b = self._selectables_filtered(lambda v: getattr(v, "relationtype", None) not in ("f", "r", "p"))
-        return partial(
-            get_selectable_changes, a, b,
-            self.i_from.enums, self.i_target.enums,
-            self.i_from.sequences, self.i_target.sequences,
-            drops_only=True, non_tables_only=True,
+        return self.selectable_changes(
+            "non_function_non_tables", drops_only=True, non_tables_only=True
         )
 
     @property
     def non_function_non_table_selectable_creations(self):
         """Create changes for views/matviews/composite types (not functions, not tables)."""
-        a, b = self._selectables_filtered(lambda v: getattr(v, "relationtype", None) not in ("f", "r", "p"))
-        return partial(
-            get_selectable_changes, a, b,
-            self.i_from.enums, self.i_target.enums,
-            self.i_from.sequences, self.i_target.sequences,
-            creations_only=True, non_tables_only=True,
+        return self.selectable_changes(
+            "non_function_non_tables", creations_only=True, non_tables_only=True
         )
 
     @property
@@ -804,12 +916,11 @@ class Changes(object):
     def triggers(self):
         return partial(
             get_trigger_changes,
-            od(sorted(self.i_from.triggers.items())),
-            od(sorted(self.i_target.triggers.items())),
-            od(sorted(self.i_from.selectables.items())),
-            od(sorted(self.i_target.selectables.items())),
+            *self.sorted_items("triggers"),
+            *self.sorted_items("selectables"),
             self.i_from.enums,
             self.i_target.enums,
+            differences_cache=self.cached.setdefault(("differences", None), {}),
         )
 
     @property
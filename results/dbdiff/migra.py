@@ -1,9 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from results.schemainspect import PostgreSQL, SchemaDefinition, get_inspector
 
 from .changes import Changes
 from .statements import Statements
 
 
+def is_database(x):
+    # as opposed to a cursor or transaction, which can't be shared between
+    # threads
+    return hasattr(x, "url") and hasattr(x, "URL")
+
+
 class Migration:
     """
     The main class of migra
@@ -16,13 +24,19 @@ class Migration:
         schema=None,
         exclude_schema=None,
         ignore_extension_versions=False,
+        snapshot_dir=None,
+        parallel=True,
     ):
+        """With parallel=True, when both x_from and x_target are databases
+        they're inspected at the same time, each on its own thread (and
+        connection)."""
         self.statements = Statements()
         self.changes = Changes(None, None)
         if schema and exclude_schema:
             raise ValueError("You cannot have both a schema and excluded schema")
         self.schema = schema
         self.exclude_schema = exclude_schema
+        self.snapshot_dir = snapshot_dir
 
         def to_inspector(x):
             if isinstance(x, PostgreSQL):
@@ -31,11 +45,22 @@ class Migration:
                 return PostgreSQL.from_definition(x)
             if isinstance(x, dict):
                 return PostgreSQL.from_definition(SchemaDefinition.from_dict(x))
-            insp = get_inspector(x, schema=schema, exclude_schema=exclude_schema)
+            insp = get_inspector(
+                x,
+                schema=schema,
+                exclude_schema=exclude_schema,
+                snapshot_dir=snapshot_dir,
+            )
             return insp
 
-        self.changes.i_from = to_inspector(x_from)
-        self.changes.i_target = to_inspector(x_target)
+        if parallel and is_database(x_from) and is_database(x_target):
+            with ThreadPoolExecutor(2) as executor:
+                i_from, i_target = executor.map(to_inspector, (x_from, x_target))
+        else:
+            i_from, i_target = to_inspector(x_from), to_inspector(x_target)
+
+        self.changes.i_from = i_from
+        self.changes.i_target = i_target
 
         if not isinstance(x_from, (PostgreSQL, SchemaDefinition, dict)) and x_from:
             self.s_from = x_from
@@ -46,12 +71,18 @@ class Migration:
 
     def inspect_from(self):
         self.changes.i_from = get_inspector(
-            self.s_from, schema=self.schema, exclude_schema=self.exclude_schema
+            self.s_from,
+            schema=self.schema,
+            exclude_schema=self.exclude_schema,
+            snapshot_dir=self.snapshot_dir,
         )
 
     def inspect_target(self):
         self.changes.i_target = get_inspector(
-            self.s_target, schema=self.schema, exclude_schema=self.exclude_schema
+            self.s_target,
+            schema=self.schema,
+            exclude_schema=self.exclude_schema,
+            snapshot_dir=self.snapshot_dir,
         )
 
     def clear(self):
@@ -119,18 +150,38 @@ class Migration:
         self.add(self.changes.collations(drops_only=True))
         self.add(self.changes.schemas(drops_only=True))
 
-    def add_all_changes_ordered(self, privileges=False):
+    def add_all_changes_ordered(self, privileges=False, by_object=False):
         """
         Like add_all_changes() but uses full dependency-aware toposort ordering
         across all object categories instead of a hardcoded sequence.
 
         The output is guaranteed to be correctly ordered for any schema as long as
         there are no genuine circular dependencies (which Postgres itself disallows).
+
+        With by_object=True, the statements for each table, view, function etc.
+        are ordered by the dependencies between those objects (see
+        statement_graph()).
         """
-        from .ordered import ordered_changes
+        from .ordered import ordered_changes, statement_graph
+
+        if by_object:
+            self.add(statement_graph(self.changes, privileges=privileges).statements())
+            return
+
         for stmt in ordered_changes(self.changes, privileges=privileges):
             self.add(stmt)
 
+    def statement_graph(self, privileges=False):
+        """
+        The changes as a StatementGraph, whose batches() are lists of groups
+        of statements that are independent of each other, so each group in a
+        batch could be run in a separate session at the same time (after the
+        graph's setup statements, and once the batches before are done).
+        """
+        from .ordered import statement_graph
+
+        return statement_graph(self.changes, privileges=privileges)
+
     @property
     def sql(self):
         return self.statements.sql
@@ -12,89 +12,111 @@ Key correctness rules encoded here:
 - The overall create ordering: schemas → extensions → collations → enums →
   types → functions → tables → views/matviews → constraints/indexes → triggers
 - The overall drop ordering is the reverse
+
+statement_graph() goes further, down to the statements for each table, view,
+function, index, constraint and trigger, ordered by what those objects depend
+on, so that it can tell which groups of statements are independent of each
+other (and could be run at the same time, in separate sessions).
 """
 from __future__ import annotations
 
+import heapq
+from itertools import product
 from graphlib import TopologicalSorter
 from typing import TYPE_CHECKING
 
+from ..schemainspect.misc import quoted_identifier
+from .changes import (
+    get_table_changes,
+    non_composite_types,
+    selectable_comment_statements,
+    statements_from_differences,
+)
 from .statements import Statements
+from .util import differences
 
 if TYPE_CHECKING:
     from .changes import Changes
 
 
-def ordered_changes(changes: Changes, privileges: bool = False) -> list[Statements]:
-    """
-    Return a list of Statements in dependency-correct order.
-    The caller does: for s in ordered_changes(...): migration.add(s)
-    """
-    nodes: dict[str, Statements] = {}
-    deps: dict[str, set[str]] = {}
-
-    def add_node(node_id: str, stmts, prerequisites: set | None = None):
-        nodes[node_id] = stmts if isinstance(stmts, Statements) else Statements(stmts)
-        deps[node_id] = set(prerequisites or [])
+# Each category of statements: (id, Changes attribute, keyword arguments)
+CATEGORIES = [
+    ("schemas:create", "schemas", dict(creations_only=True)),
+    ("schemas:drop",   "schemas", dict(drops_only=True)),
 
-    # ------------------------------------------------------------------
-    # Gather all diff statement groups
-    # ------------------------------------------------------------------
+    ("extensions:create", "extensions", dict(creations_only=True, modifications=False)),
+    ("extensions:modify", "extensions", dict(modifications_only=True, modifications=True)),
+    ("extensions:drop",   "extensions", dict(drops_only=True, modifications=False)),
 
-    add_node("schemas:create",   changes.schemas(creations_only=True))
-    add_node("schemas:drop",     changes.schemas(drops_only=True))
+    ("collations:create", "collations", dict(creations_only=True)),
+    ("collations:drop",   "collations", dict(drops_only=True)),
 
-    add_node("extensions:create", changes.extensions(creations_only=True, modifications=False))
-    add_node("extensions:modify", changes.extensions(modifications_only=True, modifications=True))
-    add_node("extensions:drop",   changes.extensions(drops_only=True, modifications=False))
+    ("enums:create", "enums", dict(creations_only=True, modifications=False)),
+    ("enums:modify", "enums", dict(modifications=True)),
+    ("enums:drop",   "enums", dict(drops_only=True, modifications=False)),
 
-    add_node("collations:create", changes.collations(creations_only=True))
-    add_node("collations:drop",   changes.collations(drops_only=True))
+    ("types:create", "types", dict(creations_only=True)),
+    ("types:modify", "types", dict(modifications_only=True)),
+    ("types:drop",   "types", dict(drops_only=True)),
 
-    add_node("enums:create", changes.enums(creations_only=True, modifications=False))
-    add_node("enums:modify", changes.enums(modifications=True))
-    add_node("enums:drop",   changes.enums(drops_only=True, modifications=False))
-
-    add_node("types:create", changes.types(creations_only=True))
-    add_node("types:modify", changes.types(modifications_only=True))
-    add_node("types:drop",   changes.types(drops_only=True))
-
-    add_node("sequences:create", changes.sequences(creations_only=True))
-    add_node("sequences:drop",   changes.sequences(drops_only=True))
+    ("sequences:create", "sequences", dict(creations_only=True)),
+    ("sequences:drop",   "sequences", dict(drops_only=True)),
 
     # Functions split out from other non-table selectables so they can be
     # ordered: functions before tables (column defaults), but views after tables.
-    add_node("functions:drop",   changes.function_drops())
-    add_node("functions:create", changes.function_creations())
+    ("functions:drop",   "function_drops", {}),
+    ("functions:create", "function_creations", {}),
 
     # Views, matviews, composite types (everything non-table, non-function)
-    add_node("views:drop",   changes.non_function_non_table_selectable_drops())
-    add_node("views:create", changes.non_function_non_table_selectable_creations())
+    ("views:drop",   "non_function_non_table_selectable_drops", {}),
+    ("views:create", "non_function_non_table_selectable_creations", {}),
 
-    add_node("triggers:drop",   changes.triggers(drops_only=True))
-    add_node("triggers:create", changes.triggers(creations_only=True))
+    ("triggers:drop",   "triggers", dict(drops_only=True)),
+    ("triggers:create", "triggers", dict(creations_only=True)),
 
-    add_node("rlspolicies:drop",   changes.rlspolicies(drops_only=True))
-    add_node("rlspolicies:create", changes.rlspolicies(creations_only=True))
+    ("rlspolicies:drop",   "rlspolicies", dict(drops_only=True)),
+    ("rlspolicies:create", "rlspolicies", dict(creations_only=True)),
 
-    add_node("pk_constraints:drop",      changes.pk_constraints(drops_only=True))
-    add_node("pk_constraints:create",    changes.pk_constraints(creations_only=True))
-    add_node("non_pk_constraints:drop",  changes.non_pk_constraints(drops_only=True))
-    add_node("non_pk_constraints:create",changes.non_pk_constraints(creations_only=True))
+    ("pk_constraints:drop",       "pk_constraints", dict(drops_only=True)),
+    ("pk_constraints:create",     "pk_constraints", dict(creations_only=True)),
+    ("non_pk_constraints:drop",   "non_pk_constraints", dict(drops_only=True)),
+    ("non_pk_constraints:create", "non_pk_constraints", dict(creations_only=True)),
 
-    add_node("mv_indexes:drop",      changes.mv_indexes(drops_only=True))
-    add_node("mv_indexes:create",    changes.mv_indexes(creations_only=True))
-    add_node("non_mv_indexes:drop",  changes.non_mv_indexes(drops_only=True))
-    add_node("non_mv_indexes:create",changes.non_mv_indexes(creations_only=True))
+    ("mv_indexes:drop",       "mv_indexes", dict(drops_only=True)),
+    ("mv_indexes:create",     "mv_indexes", dict(creations_only=True)),
+    ("non_mv_indexes:drop",   "non_mv_indexes", dict(drops_only=True)),
+    ("non_mv_indexes:create", "non_mv_indexes", dict(creations_only=True)),
 
-    add_node("tables", changes.tables_only_selectables())
+    ("tables", "tables_only_selectables", {}),
+]
 
-    if privileges:
-        add_node("privileges:drop",   changes.privileges(drops_only=True))
-        add_node("privileges:create", changes.privileges(creations_only=True))
+PRIVILEGE_CATEGORIES = [
+    ("privileges:drop",   "privileges", dict(drops_only=True)),
+    ("privileges:create", "privileges", dict(creations_only=True)),
+]
+
+
+def categories(privileges: bool = False) -> list[tuple[str, str, dict]]:
+    return CATEGORIES + (PRIVILEGE_CATEGORIES if privileges else [])
+
+
+CATEGORY_CHANGES = {
+    node_id: (att, kwargs) for node_id, att, kwargs in CATEGORIES + PRIVILEGE_CATEGORIES
+}
+
+
+def category_changes(changes: Changes, category: str) -> Statements:
+    att, kwargs = CATEGORY_CHANGES[category]
+    return Statements(getattr(changes, att)(**kwargs))
+
+
+def category_dependencies(privileges: bool = False) -> dict[str, set[str]]:
+    """
+    The categories each category of statements must come after.
+    """
+    nodes = [node_id for node_id, _, _ in categories(privileges)]
+    deps: dict[str, set[str]] = {n: set() for n in nodes}
 
-    # ------------------------------------------------------------------
-    # Dependency edges
-    # ------------------------------------------------------------------
 
     # Everything needs schemas to exist first; schemas drop last
     for n in list(nodes):
@@ -167,9 +189,14 @@ def ordered_changes(changes: Changes, privileges: bool = False) -> list[Statemen
               "views:create", "triggers:create", "rlspolicies:create"):
         deps[n].add("tables")
 
-    # pk before non-pk (FK may reference PK index)
+    # pk before non-pk (FK may reference PK index), and dropped after
     deps["non_pk_constraints:create"].add("pk_constraints:create")
-    deps["non_pk_constraints:drop"].add("pk_constraints:drop")
+    deps["pk_constraints:drop"].add("non_pk_constraints:drop")
+
+    # Constraints using an index come after it, and are dropped before it
+    for n in ("pk_constraints", "non_pk_constraints"):
+        deps[f"{n}:create"].add("non_mv_indexes:create")
+        deps["non_mv_indexes:drop"].add(f"{n}:drop")
 
     # Views after functions (views can call functions)
     deps["views:create"].add("functions:create")
@@ -194,12 +221,481 @@ def ordered_changes(changes: Changes, privileges: bool = False) -> list[Statemen
         deps["privileges:create"].add("views:create")
         deps["privileges:create"].add("functions:create")
 
+    return deps
+
+
+def ordered_changes(changes: Changes, privileges: bool = False) -> list[Statements]:
+    """
+    Return a list of Statements in dependency-correct order.
+    The caller does: for s in ordered_changes(...): migration.add(s)
+    """
+    deps = category_dependencies(privileges)
+
     # ------------------------------------------------------------------
     # Toposort and return non-empty groups in order
     # ------------------------------------------------------------------
     ts = TopologicalSorter(deps)
     result = []
     for node_id in ts.static_order():
-        if node_id in nodes and nodes[node_id]:
-            result.append(nodes[node_id])
+        stmts = category_changes(changes, node_id)
+        if stmts:
+            result.append(stmts)
+    return result
+
+
+class StatementGraph:
+    """
+    Groups of statements (each for one object, or a whole category of
+    objects), with the groups each must come after.
+    """
+
+    def __init__(self):
+        # statements every session running groups of the graph starts with
+        self.setup = Statements()
+        self.labels: list[str] = []
+        self.groups: list[Statements] = []
+        self.prerequisites: list[set[int]] = []
+
+    def add(self, label: str, statements=(), after=()) -> int:
+        self.labels.append(label)
+        self.groups.append(Statements(statements))
+        self.prerequisites.append(set(after))
+        return len(self.groups) - 1
+
+    def order(self) -> list[int]:
+        """
+        Every group, after its prerequisites, otherwise in the order added.
+        """
+        blockers = [len(p) for p in self.prerequisites]
+        unblocks: list[list[int]] = [[] for _ in self.groups]
+
+        for n, prerequisites in enumerate(self.prerequisites):
+            for p in prerequisites:
+                unblocks[p].append(n)
+
+        ready = [n for n, count in enumerate(blockers) if not count]
+        heapq.heapify(ready)
+        order = []
+
+        while ready:
+            n = heapq.heappop(ready)
+            order.append(n)
+
+            for u in unblocks[n]:
+                blockers[u] -= 1
+
+                if not blockers[u]:
+                    heapq.heappush(ready, u)
+
+        if len(order) != len(self.groups):
+            raise ValueError("cannot resolve dependencies")
+
+        return order
+
+    def batches(self) -> list[list[Statements]]:
+        """
+        The non-empty groups, in batches: the groups in a batch are
+        independent of each other, and need only the batches before it.
+        """
+        ready_after: dict[int, int] = {}
+        batches: list[list[Statements]] = []
+
+        for n in self.order():
+            batch = max((ready_after[p] for p in self.prerequisites[n]), default=0)
+
+            if self.groups[n]:
+                if batch == len(batches):
+                    batches.append([])
+
+                batches[batch].append(self.groups[n])
+                batch += 1
+
+            ready_after[n] = batch
+
+        return batches
+
+    def statements(self) -> Statements:
+        statements = Statements(self.setup)
+
+        for batch in self.batches():
+            for group in batch:
+                statements += group
+
+        return statements
+
+
+# Categories split into a group of statements per object. The others stay
+# one group each.
+OBJECT_CATEGORIES = {
+    "tables",
+    "functions:drop",
+    "functions:create",
+    "views:drop",
+    "views:create",
+    "triggers:drop",
+    "triggers:create",
+    "pk_constraints:drop",
+    "pk_constraints:create",
+    "non_pk_constraints:drop",
+    "non_pk_constraints:create",
+    "mv_indexes:drop",
+    "mv_indexes:create",
+    "non_mv_indexes:drop",
+    "non_mv_indexes:create",
+}
+
+# Category dependencies narrowed down to the related objects: an object's
+# group comes after the groups of the objects it needs, and before the
+# groups of objects it must be gone ahead of.
+#
+# Creations need only the related objects from that category, but may need
+# anything that category needed (such as a function an index expression
+# calls), so still come after those categories. Drops need the related
+# objects gone, and anything that category needed dropped first.
+RELATED_CREATIONS = {
+    ("tables", "functions:create"),
+    ("views:create", "tables"),
+    ("views:create", "functions:create"),
+    ("triggers:create", "tables"),
+    ("triggers:create", "functions:create"),
+    ("triggers:create", "views:create"),
+    ("pk_constraints:create", "tables"),
+    ("pk_constraints:create", "non_mv_indexes:create"),
+    ("non_pk_constraints:create", "tables"),
+    ("non_pk_constraints:create", "non_mv_indexes:create"),
+    ("mv_indexes:create", "tables"),
+    ("mv_indexes:create", "views:create"),
+    ("non_mv_indexes:create", "tables"),
+}
+
+RELATED_DROPS = {
+    ("tables", "views:drop"),
+    ("tables", "triggers:drop"),
+    ("tables", "pk_constraints:drop"),
+    ("tables", "non_pk_constraints:drop"),
+    ("tables", "non_mv_indexes:drop"),
+    ("functions:drop", "tables"),
+    ("functions:drop", "views:drop"),
+    ("functions:drop", "triggers:drop"),
+    ("non_mv_indexes:drop", "pk_constraints:drop"),
+    ("non_mv_indexes:drop", "non_pk_constraints:drop"),
+}
+
+# Recreating an object comes after dropping it
+RECREATIONS = {
+    ("functions:create", "functions:drop"),
+    ("views:create", "views:drop"),
+    ("triggers:create", "triggers:drop"),
+    ("pk_constraints:create", "pk_constraints:drop"),
+    ("non_pk_constraints:create", "non_pk_constraints:drop"),
+    ("mv_indexes:create", "mv_indexes:drop"),
+    ("non_mv_indexes:create", "non_mv_indexes:drop"),
+}
+
+# Categories whose objects can depend on each other
+RELATED_WITHIN = {
+    "tables",
+    "functions:drop",
+    "functions:create",
+    "views:drop",
+    "views:create",
+}
+
+
+class ObjectChange:
+    """The statements for one object, and the keys of the objects it needs
+    (which include its own, if dropped first), or must be gone ahead of."""
+
+    def __init__(self, key, statements, needs=(), blocks=()):
+        self.key = key
+        self.statements = statements
+        self.needs = set(needs)
+        self.blocks = set(blocks)
+
+
+def only(d, k):
+    return {k: d[k]} if k in d else {}
+
+
+def enums_modified(changes: Changes) -> bool:
+    """Whether any enums are modified, in which case the tables using them
+    are altered together (so the tables can't be split up)."""
+    _, _, modified, _ = differences(changes.i_from.enums, changes.i_target.enums)
+    return bool(modified)
+
+
+def table_changes(changes: Changes) -> list[ObjectChange]:
+    """The statements for each table, and each sequence's ownership."""
+    (
+        tables_from,
+        tables_target,
+        added,
+        removed,
+        modified,
+        *_,
+    ) = changes.selectable_differences()
+    result = []
+
+    for k in [*removed, *added, *modified]:
+        old, new = tables_from.get(k), tables_target.get(k)
+        statements = get_table_changes(
+            only(tables_from, k), only(tables_target, k), {}, {}, {}, {}
+        )
+
+        # another table is only gone ahead of tables it inherits from if dropped
+        blocks = [
+            d
+            for d in (old.dependent_on if old else [])
+            if new is None or not (d in tables_from or d in tables_target)
+        ]
+        needs = [k, *(new.dependent_on if new else [])]
+        result.append(ObjectChange(k, statements, needs, blocks))
+
+    sequences_from = changes.i_from.sequences
+    sequences_target = changes.i_target.sequences
+    created, _, modified, _ = differences(sequences_from, sequences_target)
+
+    for k in [*created, *modified]:
+        statements = get_table_changes(
+            {}, {}, {}, {}, only(sequences_from, k), only(sequences_target, k)
+        )
+
+        if statements:
+            table = sequences_target[k].quoted_full_table_name
+            result.append(ObjectChange(k, statements, needs=[table]))
+
+    return result
+
+
+def non_table_changes(changes: Changes, kind: str, drops: bool) -> list[ObjectChange]:
+    """The statements dropping, or creating, each function or view etc."""
+    selectables_from, _ = changes.partitioned_selectables(kind)
+    *_, added, removed, modified, replaceable = changes.selectable_differences(kind)
+
+    added = non_composite_types(added)
+    removed = non_composite_types(removed)
+    modified = non_composite_types(modified)
+    result = []
+
+    if drops:
+        for k in [*removed, *modified]:
+            statements = statements_from_differences(
+                {},
+                only(removed, k),
+                only(modified, k),
+                replaceable=replaceable,
+                drops_only=True,
+                old=selectables_from,
+            )
+
+            if statements:
+                blocks = selectables_from[k].dependent_on
+                result.append(ObjectChange(k, statements, blocks=blocks))
+    else:
+        for k in [*added, *modified]:
+            statements = statements_from_differences(
+                only(added, k),
+                {},
+                only(modified, k),
+                replaceable=replaceable,
+                creations_only=True,
+                old=selectables_from,
+            )
+            statements += selectable_comment_statements(
+                only(added, k), only(modified, k), selectables_from
+            )
+
+            if statements:
+                needs = [k, *(added.get(k) or modified[k]).dependent_on]
+                result.append(ObjectChange(k, statements, needs))
+
+    return result
+
+
+def related_keys(x) -> list[str]:
+    """The table (or view etc.) of an index, constraint or trigger, and the
+    function of a trigger, the index a constraint uses, or the table a
+    foreign key references."""
+    if hasattr(x, "proc_name"):
+        function = quoted_identifier(x.proc_name, x.proc_schema) + "()"
+        return [x.quoted_full_selectable_name, function]
+
+    related = [x.quoted_full_table_name]
+
+    if getattr(x, "index", None):
+        related.append(quoted_identifier(x.index.name, x.index.schema))
+
+    if getattr(x, "quoted_full_foreign_table_name", None):
+        related.append(x.quoted_full_foreign_table_name)
+
+    return related
+
+
+def table_related_changes(changes: Changes, category: str) -> list[ObjectChange]:
+    """The statements for each index, constraint or trigger."""
+    att, kwargs = CATEGORY_CHANGES[category]
+    changes_of = getattr(changes, att)
+    things_from, things_target, *args = changes_of.args
+    result = []
+
+    for k in [*things_from, *(k for k in things_target if k not in things_from)]:
+        statements = changes_of.func(
+            only(things_from, k),
+            only(things_target, k),
+            *args,
+            **changes_of.keywords,
+            **kwargs,
+        )
+
+        if statements:
+            if kwargs.get("drops_only"):
+                blocks = related_keys(things_from[k])
+                result.append(ObjectChange(k, statements, blocks=blocks))
+            else:
+                needs = [k, *related_keys(things_target[k])]
+                result.append(ObjectChange(k, statements, needs))
+
     return result
+
+
+def object_changes(changes: Changes, category: str) -> list[ObjectChange] | None:
+    if category == "tables":
+        return table_changes(changes)
+    if category in ("functions:drop", "functions:create"):
+        return non_table_changes(
+            changes, "functions", drops=category == "functions:drop"
+        )
+    if category in ("views:drop", "views:create"):
+        return non_table_changes(
+            changes, "non_function_non_tables", drops=category == "views:drop"
+        )
+    if category in OBJECT_CATEGORIES:
+        return table_related_changes(changes, category)
+
+    return None
+
+
+def statement_graph(changes: Changes, privileges: bool = False) -> StatementGraph:
+    """
+    Like ordered_changes(), but with the statements for each table, view,
+    function, index, constraint and trigger in a group of their own, ordered
+    by the dependencies between those objects (foreign keys, trigger
+    functions, functions used in column defaults and views...) where the
+    categories allow it, so that the graph's batches() say which groups of
+    statements are independent of each other.
+
+    Raises ValueError if the groups can't be ordered.
+    """
+    deps = category_dependencies(privileges)
+    graph = StatementGraph()
+
+    members: dict[str, list[int]] = {}
+    objects: dict[str, dict[str, int]] = {}
+    related: dict[int, ObjectChange] = {}
+
+    for category in TopologicalSorter(deps).static_order():
+        split = object_changes(changes, category)
+
+        if split is None or (category == "tables" and enums_modified(changes)):
+            n = graph.add(category, category_changes(changes, category))
+            members[category] = [n]
+
+            if split is not None:
+                # one group, standing in for every object it changes
+                objects[category] = {x.key: n for x in split}
+                related[n] = ObjectChange(
+                    None,
+                    [],
+                    needs=set().union(*(x.needs for x in split)),
+                    blocks=set().union(*(x.blocks for x in split)),
+                )
+            continue
+
+        members[category] = []
+        objects[category] = {}
+
+        for x in split:
+            n = graph.add(f"{category} {x.key}", x.statements)
+            members[category].append(n)
+            objects[category][x.key] = n
+            related[n] = x
+
+    if any(graph.groups[n] for n in members["functions:create"]):
+        graph.setup.append("set check_function_bodies = off;")
+
+    done: dict[str, int] = {}
+
+    def after_all(category):
+        if len(members[category]) == 1:
+            return members[category][0]
+
+        if category not in done:
+            done[category] = graph.add(f"{category} done", after=members[category])
+
+        return done[category]
+
+    def relate(a, b):
+        for n in members[a]:
+            x = related[n]
+
+            for k in x.needs:
+                m = objects[b].get(k)
+
+                if m is not None and m != n:
+                    graph.prerequisites[n].add(m)
+
+        for m in members[b]:
+            for k in related[m].blocks:
+                n = objects[a].get(k)
+
+                if n is not None and m != n:
+                    graph.prerequisites[n].add(m)
+
+    for a in members:
+        for b in deps[a]:
+            if (a, b) in RELATED_CREATIONS:
+                relate(a, b)
+                inherited = deps[b] - deps[a] - {a}
+            elif (a, b) in RELATED_DROPS:
+                relate(a, b)
+                inherited = deps[b] - deps[a] - {a}
+                inherited = {c for c in inherited if c.endswith(":drop")}
+            else:
+                inherited = {b}
+
+            for c in inherited:
+                for n in members[a]:
+                    graph.prerequisites[n].add(after_all(c))
+
+        for _a, b in RECREATIONS:
+            if _a == a:
+                relate(a, b)
+
+        if a in RELATED_WITHIN:
+            relate(a, a)
+
+    # foreign keys can reference unique constraints created alongside them,
+    # and those can't be dropped until the foreign keys are
+    for category, things in (
+        ("non_pk_constraints:create", changes.i_target.constraints),
+        ("non_pk_constraints:drop", changes.i_from.constraints),
+    ):
+        unique: dict[str, list[int]] = {}
+        foreign_keys: dict[str, list[int]] = {}
+
+        for n in members[category]:
+            x = things[related[n].key]
+
+            if x.is_fk:
+                foreign_keys.setdefault(x.quoted_full_foreign_table_name, []).append(n)
+            else:
+                unique.setdefault(x.quoted_full_table_name, []).append(n)
+
+        for table, constraints in unique.items():
+            for n, m in product(constraints, foreign_keys.get(table, [])):
+                if category.endswith(":create"):
+                    graph.prerequisites[m].add(n)
+                else:
+                    graph.prerequisites[n].add(m)
+
+    return graph
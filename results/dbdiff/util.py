@@ -9,6 +9,14 @@ def differences(a, b):
     keys_common = set(a_keys) & set(b_keys)
     added = od((k, b[k]) for k in sorted(keys_added))
     removed = od((k, a[k]) for k in sorted(keys_removed))
-    modified = od((k, b[k]) for k in sorted(keys_common) if a[k] != b[k])
-    unmodified = od((k, b[k]) for k in sorted(keys_common) if a[k] == b[k])
+    modified = od()
+    unmodified = od()
+
+    # compared once each (for inspected objects, by digest)
+    for k in sorted(keys_common):
+        if a[k] == b[k]:
+            unmodified[k] = b[k]
+        else:
+            modified[k] = b[k]
+
     return added, removed, modified, unmodified
@@ -0,0 +1,203 @@
+import csv
+import json
+from pathlib import Path
+
+EXPORT_FORMATS = ("parquet", "arrow", "csv")
+
+
+# pg type name -> name of the pyarrow type factory (called with no arguments)
+ARROW_TYPES = {
+    "bool": "bool_",
+    "int2": "int16",
+    "int4": "int32",
+    "int8": "int64",
+    "oid": "uint32",
+    "float4": "float32",
+    "float8": "float64",
+    "text": "string",
+    "varchar": "string",
+    "bpchar": "string",
+    "name": "string",
+    "char": "string",
+    "bytea": "binary",
+    "date": "date32",
+}
+
+
+def arrow_type(pa, type_name):
+    """Return the pyarrow type for a pg type name, and a function for
+    converting python values to fit it (or None if they already fit).
+
+    Types without an obvious arrow equivalent (numeric, uuid, json, ranges,
+    arrays...) are exported losslessly as strings.
+    """
+    if type_name == "timestamp":
+        return pa.timestamp("us"), None
+    if type_name == "timestamptz":
+        return pa.timestamp("us", tz="UTC"), None
+    if type_name == "time":
+        return pa.time64("us"), None
+
+    factory = ARROW_TYPES.get(type_name)
+
+    if factory:
+        return getattr(pa, factory)(), None
+
+    if type_name in ("json", "jsonb"):
+        return pa.string(), json.dumps
+
+    return pa.string(), str
+
+
+def arrow_schema(column_info):
+    import pyarrow as pa
+
+    return pa.schema(
+        [pa.field(name, arrow_type(pa, t)[0]) for name, t in column_info.items()]
+    )
+
+
+def check_unique_names(rows):
+    """Raise ValueError if rows have more values than column_info has
+    names, as when columns share a name (select a.id, b.id): column_info is
+    keyed by name, so holds each duplicate name once."""
+    if rows and len(rows[0]) != len(rows.column_info):
+        raise ValueError(
+            "exported results need unique column names (alias duplicates)"
+        )
+
+
+def rows_to_arrow(rows, schema=None):
+    """Convert a Rows object to a pyarrow Table, column by column, with a
+    schema derived from its column_info."""
+    import pyarrow as pa
+
+    check_unique_names(rows)
+
+    schema = schema or arrow_schema(rows.column_info)
+
+    if rows:
+        transposed = list(zip(*rows))
+    else:
+        transposed = [() for _ in rows.column_info]
+
+    arrays = []
+
+    for values, type_name in zip(transposed, rows.column_info.values()):
+        _type, convert = arrow_type(pa, type_name)
+
+        if convert:
+            values = [None if v is None else convert(v) for v in values]
+
+        arrays.append(pa.array(values, type=_type))
+
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class ArrowWriter:
+    def __init__(self, path, format):
+        self.path = path
+        self.format = format
+        self.writer = None
+        self.schema = None
+
+    def write(self, rows):
+        if self.writer is None:
+            self.open(rows.column_info)
+
+        if rows:
+            self.writer.write_table(rows_to_arrow(rows, schema=self.schema))
+
+    def open(self, column_info):
+        self.schema = arrow_schema(column_info)
+
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        else:
+            import pyarrow as pa
+
+            self.writer = pa.ipc.new_file(self.path, self.schema)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class CSVWriter:
+    def __init__(self, path):
+        self.f = open(path, "w", newline="")
+        self.writer = csv.writer(self.f)
+        self.json_columns = None
+
+    def write(self, rows):
+        check_unique_names(rows)
+
+        if self.json_columns is None:
+            self.open(rows.column_info)
+
+        if self.json_columns:
+            rows = (
+                [
+                    json.dumps(v) if i in self.json_columns and v is not None else v
+                    for i, v in enumerate(row)
+                ]
+                for row in rows
+            )
+
+        self.writer.writerows(rows)
+
+    def open(self, column_info):
+        self.writer.writerow(list(column_info))
+        self.json_columns = {
+            i for i, t in enumerate(column_info.values()) if t in ("json", "jsonb")
+        }
+
+    def close(self):
+        self.f.close()
+
+
+class Exporting:
+    def export(
+        self, query, path, params=None, *, format=None, batch_size=None, **kwargs
+    ):
+        """Export the results of a query to a parquet, arrow (IPC file) or
+        csv file, batch by batch from a server-side cursor, so the full
+        result is never held in memory.
+
+        If format isn't given, it's taken from the file extension.
+        Returns the number of rows written.
+        """
+        path = Path(path).expanduser()
+
+        format = format or path.suffix.lstrip(".").lower()
+
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"unsupported export format: {format}")
+
+        if format == "csv":
+            writer = CSVWriter(path)
+        else:
+            writer = ArrowWriter(path, format)
+
+        stream_options = {}
+
+        if batch_size:
+            stream_options["batch_size"] = batch_size
+
+        count = 0
+
+        try:
+            # with no rows, an empty batch still gives the file its columns
+            batches = self.stream(
+                query, params, empty=True, **stream_options, **kwargs
+            )
+
+            for batch in batches:
+                writer.write(batch)
+                count += len(batch)
+        finally:
+            writer.close()
+
+        return count
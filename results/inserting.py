@@ -1,7 +1,15 @@
+import datetime
+import math
+import sys
+import uuid
 from collections.abc import Mapping
+from contextlib import nullcontext
+from decimal import Decimal
+from itertools import chain
 from string import ascii_lowercase, digits
 
-from .rows import Rows
+from .constants import type_codes
+from .rows import Rows, rando
 from .syntax import quoted_identifier as qi
 
 INSERT = """
@@ -40,6 +48,154 @@ INSERT_UPSERT_DO_NOTHING = """
 """
 
 
+COPY = """
+    copy {table} {colspec}from stdin{options}
+"""
+
+
+STAGING_CREATE = """
+    create temporary table {staging}
+    on commit drop as
+        select {colspec} from {table}
+    with no data
+"""
+
+
+STAGING_ORDINAL = """
+    alter table {staging} add column {ordinal} bigserial
+"""
+
+
+STAGING_DROP = """
+    drop table if exists {staging}
+"""
+
+
+# rows with a null key never conflict, so each is kept (by being distinct
+# on its ordinal too), as they would be upserted one at a time
+INSERT_FROM_STAGING = """
+    insert into
+        {table} ({colspec})
+    select distinct on ({upsertkeyspec}, {nullkey})
+        {selectspec}
+    from
+        {staging}
+    {window}
+    order by
+        {upsertkeyspec}, {nullkey}, {ordinal} {direction}
+"""
+
+
+STAGING_NULL_KEY = "case when {nullkeys} then {ordinal} end"
+
+
+# upserted one at a time, rows sharing a key would insert the first row,
+# then update only the updated columns from each later one: so columns
+# that aren't updated come from the first row of the key
+STAGING_FIRST_VALUE = "first_value({column}) over first_row as {column}"
+
+STAGING_FIRST_ROW = """
+    window first_row as (partition by {upsertkeyspec}, {nullkey} order by {ordinal})
+"""
+
+
+STAGING_ORDINAL_COLUMN = "__results_ordinal"
+
+
+COLUMN_TYPES = """
+    select
+        a.attname as name,
+        a.atttypid as oid
+    from
+        pg_attribute a
+    where
+        a.attrelid = %(table)s::regclass
+        and a.attnum > 0
+        and not a.attisdropped
+    order by
+        a.attnum
+"""
+
+
+# Inserts of more rows than this (without returning) go through COPY instead
+COPY_THRESHOLD = 1000
+
+
+# Postgres types we're happy to COPY in binary format, and the python values
+# that binary-dump cleanly to each. Anything else falls back to text format,
+# which leaves parsing to the server exactly like an ordinary bound parameter.
+# Binary values are dumped by the column's type, not checked by the server,
+# so they must also be in range for it (see fits_binary).
+BINARY_COPY_PYTYPES = {
+    "bool": (bool,),
+    "int2": (int,),
+    "int4": (int,),
+    "int8": (int,),
+    "float4": (float, int),
+    "float8": (float, int),
+    "numeric": (Decimal, int),
+    "text": (str,),
+    "varchar": (str,),
+    "bytea": (bytes,),
+    "uuid": (uuid.UUID,),
+    "date": (datetime.date,),
+    "timestamp": (datetime.datetime,),
+    "timestamptz": (datetime.datetime,),
+}
+
+INT_BITS = {"int2": 16, "int4": 32, "int8": 64}
+
+FLOAT_MAX = {"float4": 3.4028234663852886e38, "float8": sys.float_info.max}
+
+
+def fits_binary(type_name, value):
+    """Whether (non-null) value binary-dumps as itself for type_name: the
+    right python type, and in range."""
+    pytypes = BINARY_COPY_PYTYPES.get(type_name)
+
+    if pytypes is None:
+        return False
+
+    # bool is a subclass of int, and datetime a subclass of date
+    if isinstance(value, bool) and bool not in pytypes:
+        return False
+
+    if type_name == "date" and isinstance(value, datetime.datetime):
+        return False
+
+    if not isinstance(value, pytypes):
+        return False
+
+    if type_name in INT_BITS:
+        limit = 1 << (INT_BITS[type_name] - 1)
+        return -limit <= value < limit
+
+    if type_name in FLOAT_MAX:
+        # inf and nan are fine; finite values mustn't overflow to inf
+        if isinstance(value, float) and not math.isfinite(value):
+            return True
+        return abs(value) <= FLOAT_MAX[type_name]
+
+    if type_name == "timestamp":
+        return value.tzinfo is None
+
+    if type_name == "timestamptz":
+        return value.tzinfo is not None
+
+    return True
+
+
+def can_copy_binary(type_names, row):
+    for type_name, value in zip(type_names, row):
+        if type_name not in BINARY_COPY_PYTYPES:
+            return False
+
+        if value is not None and not fits_binary(type_name, value):
+            return False
+
+    return True
+
+
 ALLOWED = set(ascii_lowercase + digits + "_")
 LOWERCASE = set(ascii_lowercase)
 
@@ -83,7 +239,192 @@ def key_renaming(keylist):
     return d
 
 
+def upsert_clause(keys, upsert_on, update_cols=None):
+    if update_cols is None:
+        upsert_keys = list(keys)
+    else:
+        upsert_keys = list(update_cols)
+
+    for k in upsert_on:
+        if k in upsert_keys:
+            upsert_keys.remove(k)
+
+    upsertkeyspec = ", ".join([qi(k) for k in upsert_on])
+
+    if upsert_keys:
+        upsertspec = ", ".join(f"{qi(k)} = excluded.{qi(k)}" for k in upsert_keys)
+
+        return INSERT_UPSERT.format(upsertkeyspec=upsertkeyspec, upsertspec=upsertspec)
+    else:
+        return INSERT_UPSERT_DO_NOTHING.format(upsertkeyspec=upsertkeyspec)
+
+
 class Inserting:
+    def column_types(self, table, columns=None):
+        """Return the type oids of the given columns of table (or of all of
+        its columns, in order, if columns is None)."""
+        self.c.execute(COLUMN_TYPES, dict(table=qi(table)))
+        oids = dict(self.c.fetchall())
+
+        if columns is None:
+            return oids
+
+        try:
+            return {c: oids[c] for c in columns}
+        except KeyError as e:
+            raise ValueError(f"no such column: {e.args[0]}")
+
+    def copy_in(self, table, rows, columns=None):
+        """Bulk-load rows into table with COPY ... FROM STDIN.
+
+        rows can be a Rows object, or any iterable of dicts or of tuples
+        (tuples are matched to columns positionally, or to every column of
+        the table if no columns are given). Rows are streamed to the server
+        as they're consumed, so a generator never needs to be materialized.
+
+        Binary format is used whenever the column types allow it, until a row
+        has a value that won't dump as binary (a string in a date column,
+        say), which is copied with the rest of the rows in text format, as a
+        second COPY. Returns the number of rows copied.
+        """
+        if isinstance(rows, Mapping):
+            rows = [rows]
+
+        if isinstance(rows, Rows) and columns is None:
+            columns = list(rows.column_info)
+
+        it = iter(rows)
+
+        try:
+            first = next(it)
+        except StopIteration:
+            return 0
+
+        if isinstance(first, Mapping):
+            if columns is None:
+                columns = list(first.keys())
+
+            values = (tuple(d[c] for c in columns) for d in chain([first], it))
+        else:
+            values = chain([first], it)
+
+        oids = list(self.column_types(table, columns).values())
+        type_names = [type_codes.get(oid) for oid in oids]
+
+        if columns is not None:
+            colspec = f"({', '.join(qi(c) for c in columns)}) "
+        else:
+            colspec = ""
+
+        def copy_statement(options=""):
+            return COPY.format(table=qi(table), colspec=colspec, options=options)
+
+        copied = 0
+        rest = values
+
+        if all(t in BINARY_COPY_PYTYPES for t in type_names):
+            rest = None
+
+            with self.c.copy(copy_statement(" (format binary)")) as copy:
+                copy.set_types(oids)
+
+                for row in values:
+                    if not can_copy_binary(type_names, row):
+                        # this row (say a date as a string) can't be dumped
+                        # as binary, so it and the rest go in as text
+                        rest = chain([row], values)
+                        break
+
+                    copy.write_row(row)
+
+            copied += self.c.rowcount
+
+        if rest is not None:
+            with self.c.copy(copy_statement()) as copy:
+                for row in rest:
+                    copy.write_row(row)
+
+            copied += self.c.rowcount
+
+        return copied
+
+    def copy_upsert(self, table, rows, upsert_on, update_cols=None):
+        """Bulk upsert: COPY rows into a temporary staging table, then move
+        them into table with a single insert ... on conflict.
+
+        Conflict handling matches insert(), which upserts one row at a time:
+        when several rows share the same upsert_on key, the updated columns
+        come from the last of them, and any others from the first (with
+        nothing to update, the first row is kept).
+
+        Within a transaction, the upsert is part of it, so is rolled back
+        with it.
+        """
+        if isinstance(upsert_on, str):
+            upsert_on = [upsert_on]
+
+        if isinstance(rows, Rows):
+            keys = list(rows.column_info)
+        else:
+            keys = list(rows[0].keys())
+
+        staging = f"results_staging_{rando()}"
+        colspec = ", ".join(qi(k) for k in keys)
+        ordinal = qi(STAGING_ORDINAL_COLUMN)
+
+        updated = set(keys if update_cols is None else update_cols) - set(upsert_on)
+
+        nullkey = STAGING_NULL_KEY.format(
+            nullkeys=" or ".join(f"{qi(k)} is null" for k in upsert_on),
+            ordinal=ordinal,
+        )
+
+        upsertkeyspec = ", ".join(qi(k) for k in upsert_on)
+        kept = [k for k in keys if k not in updated and k not in upsert_on]
+
+        if updated and kept:
+            selectspec = ", ".join(
+                STAGING_FIRST_VALUE.format(column=qi(k)) if k in kept else qi(k)
+                for k in keys
+            )
+            window = STAGING_FIRST_ROW.format(
+                upsertkeyspec=upsertkeyspec, nullkey=nullkey, ordinal=ordinal
+            )
+        else:
+            selectspec, window = colspec, ""
+
+        q = INSERT_FROM_STAGING.format(
+            table=qi(table),
+            colspec=colspec,
+            selectspec=selectspec,
+            upsertkeyspec=upsertkeyspec,
+            nullkey=nullkey,
+            staging=staging,
+            window=window,
+            ordinal=ordinal,
+            direction="desc" if updated else "asc",
+        )
+
+        conn = self.c.connection
+
+        # With autocommit, this runs in a transaction of its own, which
+        # drops the staging table on commit, or rolls back everything
+        # (staging table included) on failure. Otherwise it's part of the
+        # caller's transaction, to commit or roll back with the rest of it:
+        # after a failure, rolling that back drops the staging table.
+        with conn.transaction() if conn.autocommit else nullcontext():
+            self.c.execute(
+                STAGING_CREATE.format(staging=staging, colspec=colspec, table=qi(table))
+            )
+            self.c.execute(STAGING_ORDINAL.format(staging=staging, ordinal=ordinal))
+
+            self.copy_in(staging, rows, columns=keys)
+
+            self.c.execute(q + upsert_clause(keys, upsert_on, update_cols))
+
+            if not conn.autocommit:
+                self.c.execute(STAGING_DROP.format(staging=staging))
+
     def insert(self, table, rows, upsert_on=None, returning=None, update_cols=None):
         if isinstance(rows, Mapping):
             rows = [rows]
@@ -97,6 +438,13 @@ class Inserting:
         if returning is None:
             returning = not len(rows) > 1
 
+        if not returning and len(rows) > COPY_THRESHOLD and rows[0]:
+            if upsert_on:
+                self.copy_upsert(table, rows, upsert_on, update_cols=update_cols)
+            else:
+                self.copy_in(table, rows)
+            return None
+
         if isinstance(rows, Rows):
             rows = rows.as_dicts()
 
@@ -117,29 +465,7 @@ class Inserting:
             q = INSERT_DEFAULT.format(table=qi(table))
 
         if upsert_on:
-            if update_cols is None:
-                upsert_keys = list(keys)
-            else:
-                upsert_keys = list(update_cols)
-
-            for k in upsert_on:
-                if k in upsert_keys:
-                    upsert_keys.remove(k)
-
-            upsertkeyspec = ", ".join([qi(k) for k in upsert_on])
-
-            if upsert_keys:
-                upsertspec = ", ".join(
-                    f"{qi(k)} = excluded.{qi(k)}" for k in upsert_keys
-                )
-
-                q_upsert = INSERT_UPSERT.format(
-                    upsertkeyspec=upsertkeyspec, upsertspec=upsertspec
-                )
-            else:
-                q_upsert = INSERT_UPSERT_DO_NOTHING.format(upsertkeyspec=upsertkeyspec)
-
-            q = q + q_upsert
+            q = q + upsert_clause(keys, upsert_on, update_cols)
         if returning:
             q += " returning *"
 
@@ -1,7 +1,11 @@
 # Copyright results Pty Ltd 2022
 
+import re
+import time
+from functools import lru_cache
 from itertools import zip_longest
 
+from .psyco import quoted_identifier as qi
 from .rows import Rows
 
 ASC_OR_DESC = ("desc", "asc")
@@ -64,11 +68,120 @@ select * from
 PARAM_PREFIX = "paging_"
 
 
+# For count="exact": the total is counted over the whole unpaged query, in
+# the same round trip as the page itself
+COUNTED_QUERY = """
+select *, count(*) over () as {column} from
+(
+{q}
+) uncounted
+"""
+
+# For when there's no page to take the count from
+COUNT_QUERY = """
+select count(*) from
+(
+{q}
+) uncounted
+"""
+
+COUNT_COLUMN = "results_total_count"
+
+COUNT_METHODS = ("exact", "estimate")
+
+
+ESTIMATED_COUNT_QUERY = """
+explain (format json)
+{q}
+"""
+
+
+# How long (in seconds) a total count is reused for the same query and
+# params, unless count_ttl is given.
+COUNT_TTL = 60
+
+COUNT_CACHE_SIZE = 1024
+
+counts = {}
+
+
+def count_key(info, query, params):
+    """Cache key for the total count of query, run with params against the
+    database described by info (a psycopg ConnectionInfo)."""
+    return (
+        info.host,
+        info.port,
+        info.dbname,
+        query,
+        repr(sorted(params.items())),
+    )
+
+
+def cached_count(key):
+    """The cached (total, estimated) for key, or None if there's none that
+    is still fresh."""
+    try:
+        expires, total, estimated = counts[key]
+    except KeyError:
+        return None
+
+    if expires < time.monotonic():
+        counts.pop(key, None)
+        return None
+
+    return total, estimated
+
+
+def cache_count(key, total, estimated, ttl=COUNT_TTL):
+    now = time.monotonic()
+
+    if len(counts) >= COUNT_CACHE_SIZE:
+        for k, (expires, *_) in list(counts.items()):
+            if expires < now:
+                counts.pop(k, None)
+
+        if len(counts) >= COUNT_CACHE_SIZE:
+            counts.clear()
+
+    counts[key] = (now + ttl, total, estimated)
+
+
+def counted_rows(rows):
+    """Remove the total count column added by COUNTED_QUERY from rows,
+    returning the total (or None if there are no rows to take it from)."""
+    total = rows[0][-1] if rows else None
+
+    rows[:] = [row[:-1] for row in rows]
+    rows.column_info.pop(COUNT_COLUMN, None)
+
+    return total
+
+
+def plan_rows(explained):
+    """The estimated number of rows from EXPLAIN (FORMAT JSON) output."""
+    return int(explained[0]["Plan"]["Plan Rows"])
+
+
 def get_paged_query(
-    query, params, order_by, bookmark=None, per_page=10, backwards=False
+    query,
+    params,
+    order_by,
+    bookmark=None,
+    per_page=10,
+    backwards=False,
+    pushdown=False,
+    require_index=False,
+    count=None,
+    count_ttl=None,
 ):
+    """Wrap query for paging. count="exact" adds a total count of all rows
+    (see COUNTED_QUERY) as an extra last column, for the caller to strip."""
+    if count == "exact":
+        query = COUNTED_QUERY.format(q=query, column=COUNT_COLUMN)
+        pushdown = False
+
     query, paging_query_params = paging_wrapped_query(
-        query, order_by, bookmark, per_page, backwards
+        query, order_by, bookmark, per_page, backwards, pushdown=pushdown
     )
     params.update(paging_query_params)
 
@@ -113,32 +226,293 @@ def get_page(
     return results
 
 
-def bind_pairs_iter(cols, bookmark, swap_on_descending=False):
+def bind_pairs_iter(cols, bookmark, swap_on_descending=False, exprs=None):
     for i, zipped in enumerate(zip(cols, bookmark)):
         col, val = zipped
         name, is_descending = col
         lowercase_name = name.lower()
         bind = f"%({PARAM_PREFIX}{lowercase_name})s"
 
+        if exprs is not None:
+            name = exprs[i]
+
         if swap_on_descending and is_descending:
             yield name, bind
         else:
             yield bind, name
 
 
+def bookmark_condition(cols, bookmark, exprs=None):
+    pairslist = bind_pairs_iter(cols, bookmark, swap_on_descending=True, exprs=exprs)
+
+    b, a = zip(*pairslist)
+    if len(a) > 1 or len(b) > 1:
+        a, b = ", ".join(a), ", ".join(b)
+        return f"row({a}) > row({b})"
+
+    else:
+        return f"{a[0]} > {b[0]}"
+
+
 def make_bookmark_where_clause(cols, bookmark):
     if bookmark is None:
         return ""
 
-    pairslist = bind_pairs_iter(cols, bookmark, swap_on_descending=True)
+    return f"where {bookmark_condition(cols, bookmark)}"
+
+
+# For parsing a query that's already been rewritten for psycopg: %% becomes
+# "% " and each %(name)s a $1 (padded with spaces), so that the parse
+# locations still line up with the real query text.
+PSYCOPG_PLACEHOLDERS = re.compile(r"%%|%\([^)]*\)s")
+
+
+def parseable(query):
+    def replaced(m):
+        text = m.group()
+        if text == "%%":
+            return "% "
+        return "$1".ljust(len(text))
+
+    return PSYCOPG_PLACEHOLDERS.sub(replaced, query)
+
+
+# Any of these mean a keyset condition can't simply be added to the query's
+# own where clause, because it would change the results.
+NOT_PUSHABLE = (
+    "distinctClause",
+    "groupClause",
+    "havingClause",
+    "windowClause",
+    "limitCount",
+    "limitOffset",
+    "lockingClause",
+    "valuesLists",
+    "intoClause",
+)
+
+
+# Built in aggregates and set returning functions: a call to one in the
+# select list (outside of any subquery) makes the query an aggregate, or
+# its rows not those the where clause filters, so a keyset condition can't
+# be added to its where clause either. (Aggregates and set returning
+# functions defined in the database aren't known here.)
+AGGREGATES = frozenset(
+    """
+    any_value array_agg avg bit_and bit_or bit_xor bool_and bool_or count
+    every json_agg json_agg_strict json_arrayagg json_object_agg
+    json_object_agg_strict json_object_agg_unique
+    json_object_agg_unique_strict json_objectagg jsonb_agg jsonb_agg_strict
+    jsonb_object_agg jsonb_object_agg_strict jsonb_object_agg_unique
+    jsonb_object_agg_unique_strict max min range_agg range_intersect_agg
+    string_agg sum xmlagg corr covar_pop covar_samp regr_avgx regr_avgy
+    regr_count regr_intercept regr_r2 regr_slope regr_sxx regr_sxy regr_syy
+    stddev stddev_pop stddev_samp variance var_pop var_samp mode
+    percentile_cont percentile_disc rank dense_rank percent_rank cume_dist
+    grouping
+    """.split()
+)
+
+SET_RETURNING = frozenset(
+    """
+    unnest generate_series generate_subscripts regexp_matches
+    regexp_split_to_table json_array_elements json_array_elements_text
+    jsonb_array_elements jsonb_array_elements_text json_each json_each_text
+    jsonb_each jsonb_each_text json_object_keys jsonb_object_keys
+    json_populate_recordset jsonb_populate_recordset json_to_recordset
+    jsonb_to_recordset jsonb_path_query string_to_table
+    """.split()
+)
+
+
+def unpushable_call(nodes):
+    """The first window function, aggregate or set returning function call
+    in nodes (not counting those in subqueries), if any."""
+    from pglast.visitors import Skip, Visitor
+
+    class Calls(Visitor):
+        found = None
+
+        def visit_SubLink(self, ancestors, node):
+            return Skip
+
+        def visit_FuncCall(self, ancestors, node):
+            name = node.funcname[-1].sval
+
+            aggregate = (
+                node.agg_star
+                or node.agg_distinct
+                or node.agg_order
+                or node.agg_filter
+                or node.agg_within_group
+                or name in AGGREGATES
+            )
+
+            if self.found is None and (
+                node.over or aggregate or name in SET_RETURNING
+            ):
+                self.found = node
+
+    calls = Calls()
+    calls(tuple(nodes))
+    return calls.found
+
+
+class KeysetPlan:
+    """Where and how paging can be pushed into a query's own top-level
+    select, rather than wrapping it.
+
+    exprs are the expressions (within the query) for each order column.
+    where_end and cut are byte offsets: the end of the existing WHERE
+    keyword (if any), and the end of the query's last token before any
+    existing ORDER BY (leaving out trailing comments). table and columns
+    are set when all the order columns are plain columns of a single
+    table, so the index backing the keyset can be checked.
+    """
+
+    def __init__(self, exprs, where_end, cut, table=None, columns=None):
+        self.exprs = exprs
+        self.where_end = where_end
+        self.cut = cut
+        self.table = table
+        self.columns = columns
+
+    def paged_query(self, query, cols, bookmark, per_page):
+        q = query.encode()
+
+        head = q[: self.cut].decode().rstrip()
+
+        if bookmark is None:
+            condition = None
+        else:
+            condition = bookmark_condition(cols, bookmark, exprs=self.exprs)
 
-    b, a = zip(*pairslist)
-    if len(a) > 1 or len(b) > 1:
-        a, b = ", ".join(a), ", ".join(b)
-        return f"where row({a}) > row({b})"
+        if condition and self.where_end is not None:
+            before_where = q[: self.where_end].decode()
+            where = q[self.where_end : self.cut].decode().strip()
+            head = f"{before_where} ({where})\n    and {condition}"
+        elif condition:
+            head = f"{head}\nwhere {condition}"
+
+        order_list = ", ".join(
+            expr + (" desc" if descending else "")
+            for expr, (_, descending) in zip(self.exprs, cols)
+        )
+
+        return f"{head}\norder by {order_list}\nlimit {per_page + 1}\n"
+
+
+def column_ref_name(node):
+    from pglast import ast
+
+    if isinstance(node, ast.ColumnRef) and isinstance(node.fields[-1], ast.String):
+        return node.fields[-1].sval
+
+
+@lru_cache(maxsize=256)
+def keyset_plan(query, order_names):
+    """Work out how to push paging on order_names into query, or return None
+    if it can't be (in which case the query is wrapped instead)."""
+    import pglast
+    from pglast import ast
+    from pglast.parser import ParseError, scan
+    from pglast.stream import RawStream
+
+    text = parseable(query)
+
+    try:
+        statements = pglast.parse_sql(text)
+        tokens = scan(text)
+    except ParseError:
+        return None
+
+    if len(statements) != 1:
+        return None
+
+    stmt = statements[0].stmt
+
+    if not isinstance(stmt, ast.SelectStmt) or stmt.op or not stmt.fromClause:
+        return None
+
+    if any(getattr(stmt, attr, None) for attr in NOT_PUSHABLE):
+        return None
+
+    if unpushable_call((*stmt.targetList, *(stmt.sortClause or ()))):
+        return None
+
+    targets = {}
+    has_star = False
+
+    for target in stmt.targetList:
+        name = target.name or column_ref_name(target.val)
+
+        if isinstance(target.val, ast.ColumnRef) and isinstance(
+            target.val.fields[-1], ast.A_Star
+        ):
+            has_star = True
+        elif name is not None:
+            targets.setdefault(name, target.val)
+
+    only_table = stmt.fromClause[0] if len(stmt.fromClause) == 1 else None
+
+    if not isinstance(only_table, ast.RangeVar):
+        only_table = None
+
+    exprs = []
+    columns = []
+
+    for name in order_names:
+        node = targets.get(name)
+
+        if node is None:
+            if not (has_star and only_table):
+                return None
 
+            exprs.append(quoted(name))
+            columns.append(name)
+            continue
+
+        expr = RawStream()(node)
+
+        # params can't be carried over from a deparsed expression
+        if "$" in expr:
+            return None
+
+        exprs.append(expr)
+        columns.append(column_ref_name(node) if only_table else None)
+
+    # a placeholder is parsed as a shorter $1, so ends where it does in query
+    placeholder_ends = {
+        m.start(): m.end() for m in PSYCOPG_PLACEHOLDERS.finditer(query)
+    }
+
+    depth = 0
+    where_end = None
+
+    # the end of the last token before any ORDER BY, so the query is cut
+    # before any trailing comment (which would swallow what's appended)
+    cut = 0
+
+    for token in tokens:
+        if token.name in ("SQL_COMMENT", "C_COMMENT"):
+            continue
+        if token.name == "ASCII_40":
+            depth += 1
+        elif token.name == "ASCII_41":
+            depth -= 1
+        elif depth == 0 and token.name == "WHERE":
+            where_end = token.end + 1
+        elif depth == 0 and token.name in ("ORDER", "ASCII_59"):
+            break
+
+        cut = placeholder_ends.get(token.start, token.end + 1)
+
+    if only_table and None not in columns:
+        table = qi(only_table.relname, schema=only_table.schemaname)
     else:
-        return f"where {a[0]} > {b[0]}"
+        table, columns = None, None
+
+    return KeysetPlan(exprs, where_end, cut, table=table, columns=columns)
 
 
 def paging_params(cols, bookmark):
@@ -146,11 +520,69 @@ def paging_params(cols, bookmark):
     return dict(zip_longest(names, bookmark or []))
 
 
-def paging_wrapped_query(query, order_by, bookmark, per_page, backwards):
+KEYSET_INDEXES = """
+    select
+        i.indkey::int2[] as keys,
+        i.indoption::int2[] as options
+    from
+        pg_index i
+        join pg_class c on c.oid = i.indexrelid
+        join pg_am am on am.oid = c.relam
+    where
+        i.indrelid = %(table)s::regclass
+        and i.indpred is null
+        and am.amname = 'btree'
+"""
+
+
+KEYSET_ATTNUMS = """
+    select
+        a.attname,
+        a.attnum
+    from
+        pg_attribute a
+    where
+        a.attrelid = %(table)s::regclass
+        and a.attname = any(%(columns)s)
+"""
+
+
+def index_matches(keys, options, attnums, descending):
+    """Whether a btree index (given its indkey and indoption) can produce
+    rows in the paging order: its leading columns must be the order columns,
+    all in the same directions, or all reversed (scanned backwards)."""
+    n = len(attnums)
+
+    if list(keys[:n]) != list(attnums):
+        return False
+
+    index_descending = [bool(o & 1) for o in options[:n]]
+    reversed_descending = [not d for d in descending]
+
+    return index_descending in (list(descending), reversed_descending)
+
+
+def paging_wrapped_query(
+    query, order_by, bookmark, per_page, backwards, pushdown=False
+):
+    """Wrap a query for keyset paging.
+
+    With pushdown, the bookmark condition, order by and limit are added to
+    the query's own top-level select instead (where that's possible without
+    changing its results), so the planner can use an index on the order
+    columns directly.
+    """
     cols = parse_order_by(order_by)
     if backwards:
         cols = reversed_order_by(cols)
 
+    if pushdown:
+        plan = keyset_plan(query, tuple(c[0] for c in cols))
+
+        if plan is not None:
+            params = paging_params(cols, bookmark)
+            return plan.paged_query(query, cols, bookmark, per_page), params
+
     bookmark_clause = make_bookmark_where_clause(cols, bookmark)
     order_list = order_by_from_parsed(cols)
     order_by = f"order by {order_list}"
@@ -166,7 +598,19 @@ def paging_wrapped_query(query, order_by, bookmark, per_page, backwards):
 
 class Paging:
     def __init__(
-        self, results, *, order_by, per_page=10, bookmark=None, backwards=False
+        self,
+        results,
+        *,
+        order_by,
+        per_page=10,
+        bookmark=None,
+        backwards=False,
+        pushdown=False,
+        require_index=False,
+        count=None,
+        count_ttl=None,
+        total_count=None,
+        total_estimated=False,
     ):
         self.results = results
         self.per_page = per_page
@@ -177,6 +621,11 @@ class Paging:
         self.order_keys = [c[0] for c in self.parsed_order_by]
         # self.d = d
 
+        # the total number of rows across all pages, if counted (see the
+        # count paging option), and whether it's only the planner's estimate
+        self.total_count = total_count
+        self.total_estimated = total_estimated
+
         try:
             self.discarded_item = results.pop(per_page)
             self.has_more = True
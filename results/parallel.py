@@ -0,0 +1,204 @@
+import queue
+import threading
+
+from .paging import keyset_plan, parse_order_by, quoted
+
+HISTOGRAM_BOUNDS = """
+    select
+        s.histogram_bounds::text::text[]
+    from
+        pg_stats s
+        join pg_namespace n on n.nspname = s.schemaname
+        join pg_class c on c.relnamespace = n.oid and c.relname = s.tablename
+    where
+        c.oid = :table::regclass
+        and s.attname = :column
+"""
+
+
+QUANTILES = """
+    select
+        percentile_disc(:parallel_fractions::float8[]) within group (order by {column})
+    from (
+        {query}
+    ) unsplit
+"""
+
+
+RANGED_QUERY = """
+select * from
+(
+{query}
+) unranged
+{condition}
+"""
+
+
+def split_points(bounds, n):
+    """Pick up to n - 1 values that divide a sorted list of bounds (such as
+    a pg_stats histogram) into n roughly equal parts."""
+    if not bounds or n < 2:
+        return []
+
+    last = len(bounds) - 1
+    picked = [bounds[round(i * last / n)] for i in range(1, n)]
+
+    return list(dict.fromkeys(picked))
+
+
+def ranges(points):
+    """Turn split points into (lower, upper) ranges covering everything:
+    None means unbounded."""
+    edges = [None] + list(points) + [None]
+    return list(zip(edges, edges[1:]))
+
+
+def range_condition(column, lower, upper):
+    column = quoted(column)
+    conditions = []
+
+    if lower is not None:
+        conditions.append(f"{column} >= :parallel_lower")
+
+    if upper is not None:
+        conditions.append(f"{column} < :parallel_upper")
+
+    if not conditions:
+        return ""
+
+    return "where " + " and ".join(conditions)
+
+
+class ParallelPages:
+    def parallel_split_points(self, t, query, params, column, workers):
+        """Values of column that split the results of query into workers
+        ranges of roughly equal size.
+
+        Taken from the pg_stats histogram when column is a plain column of a
+        single table, otherwise from percentiles computed over the query
+        (which means running it once in full).
+        """
+        from .database import rewritten_query
+
+        plan = keyset_plan(rewritten_query(query, bool(params)), (column,))
+
+        if plan is not None and plan.table is not None:
+            rows = t.q(HISTOGRAM_BOUNDS, table=plan.table, column=plan.columns[0])
+
+            if rows and rows[0][0]:
+                return split_points(rows[0][0], workers)
+
+        fractions = [i / workers for i in range(1, workers)]
+
+        q = QUANTILES.format(column=quoted(column), query=query)
+        rows = t.q(q, dict(params, parallel_fractions=fractions))
+
+        return list(dict.fromkeys(rows[0][0] or []))
+
+    def parallel_pages(
+        self,
+        query,
+        params=None,
+        *,
+        order_by,
+        workers=4,
+        per_page=1000,
+        consistent=True,
+        **kwargs,
+    ):
+        """Page through the results of query on several connections at
+        once, yielding pages as they arrive.
+
+        The values of the first order_by column are split into a range per
+        worker (see parallel_split_points); each range is paged through
+        with the usual bookmark logic, on its own pooled connection. Pages
+        come back in order within each range, but ranges are interleaved.
+        Rows where the first order_by column is null aren't included, as
+        with keyset paging in general.
+
+        With consistent=True, all workers share one exported snapshot, so
+        together they see exactly the same data.
+        """
+        params = dict(params or {}, **kwargs)
+        column = parse_order_by(order_by)[0][0]
+
+        with self.t() as t:
+            if consistent:
+                t.ex("set transaction isolation level repeatable read")
+                snapshot = t.q("select pg_export_snapshot()")[0][0]
+            else:
+                snapshot = None
+
+            points = self.parallel_split_points(t, query, params, column, workers)
+
+            paging = dict(order_by=order_by, per_page=per_page)
+
+            yield from self._ranged_pages(
+                query, params, column, ranges(points), paging, snapshot
+            )
+
+    def _ranged_pages(self, query, params, column, key_ranges, paging, snapshot):
+        pages = queue.Queue(maxsize=len(key_ranges) * 2)
+        stopping = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stopping.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def scan(lower, upper):
+            try:
+                ranged = RANGED_QUERY.format(
+                    query=query, condition=range_condition(column, lower, upper)
+                )
+                ranged_params = dict(params, parallel_lower=lower, parallel_upper=upper)
+
+                with self.t() as t:
+                    if snapshot:
+                        t.ex("set transaction isolation level repeatable read")
+                        # utility statements can't take bind params
+                        t.ex(f"set transaction snapshot '{snapshot}'")
+
+                    # pages() keeps its bookmark in paging, so each scan
+                    # needs its own
+                    pages_of_range = t.pages(
+                        ranged, ranged_params, paging=dict(paging)
+                    )
+
+                    for page in pages_of_range:
+                        if not put(page):
+                            return
+
+                put(done)
+            except BaseException as e:
+                put(e)
+
+        threads = [
+            threading.Thread(target=scan, args=r, daemon=True) for r in key_ranges
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            remaining = len(threads)
+
+            while remaining:
+                item = pages.get()
+
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    yield item
+        finally:
+            stopping.set()
+
+            for thread in threads:
+                thread.join()
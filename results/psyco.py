@@ -4,7 +4,88 @@ import string
 SAFE_CHARS = {char: None for char in (string.ascii_lowercase + "_")}
 
 
-_IDENT_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789_")
+# Everything reformat_bind_params needs to look at, in one pass. Text
+# between matches is copied through untouched.
+BIND_PARAM_TOKENS = re.compile(
+    r"""
+    (?=['"$:])                                     # fast skip to a candidate
+    (?:
+        (?P<single>'[^']*(?:''[^']*)*(?:'|\Z))     # '...' with '' escapes
+      | (?P<double>"[^"]*(?:""[^"]*)*(?:"|\Z))     # "..." with "" escapes
+      | (?P<dollar>(?P<tag>\$[^$]*\$).*?(?P=tag)) # $tag$...$tag$
+      | (?<![:\d])                                # not a :: cast or [1:3] slice
+        :(?:(?=[^\W\d])(?P<param>[a-z0-9_]*))?     # :name
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+class CompiledQuery:
+    """A query with its :colon bind params located.
+
+    sql is the query with the params rewritten to %(name)s style;
+    param_names lists each param occurrence in order, and positions their
+    (start, end) offsets within the original text.
+    """
+
+    def __init__(self, text, sql, param_names, positions):
+        self.text = text
+        self.sql = sql
+        self.param_names = param_names
+        self.positions = positions
+
+    @property
+    def names(self):
+        """The distinct param names, in order of first use."""
+        return list(dict.fromkeys(self.param_names))
+
+    def __repr__(self):
+        return f"CompiledQuery({self.text!r}, params={self.names})"
+
+
+def is_bind_param(query, start):
+    """Whether the : at start begins a bind param, rather than being part
+    of a :: cast or an array slice like [1:3]."""
+    prev = query[start - 1] if start > 0 else None
+
+    if prev == ":" or (prev is not None and prev.isdigit()):
+        return False
+
+    # names must start with a letter or underscore, not a digit
+    next_c = query[start + 1 : start + 2]
+    return next_c.isalpha() or next_c == "_"
+
+
+def compile_query(query):
+    """Locate the :colon bind params in a query, skipping string literals
+    ('...'), dollar-quoted blocks ($$...$$), double-quoted identifiers
+    ("...") and :: type-cast operators. Returns a CompiledQuery.
+    """
+    names = []
+    positions = []
+
+    def replaced(m):
+        name = m.group("param")
+
+        if name is None:
+            return m.group()
+
+        start = m.start()
+
+        # the regex's \d and \w are close to, but not exactly, str.isdigit
+        # and str.isalpha, so double check around anything non-ascii
+        if not query[max(start - 1, 0) : start + 2].isascii():
+            if not is_bind_param(query, start):
+                return m.group()
+
+        names.append(name)
+        positions.append(m.span())
+        return f"%({name})s"
+
+    sql = BIND_PARAM_TOKENS.sub(replaced, query)
+
+    return CompiledQuery(query, sql, names, positions)
 
 
 def reformat_bind_params(query, rewrite=True):
@@ -13,89 +94,10 @@ def reformat_bind_params(query, rewrite=True):
     Correctly skips string literals ('...'), dollar-quoted blocks ($$...$$),
     double-quoted identifiers ("..."), and :: type-cast operators.
     """
-    result = []
-    i = 0
-    n = len(query)
-
-    while i < n:
-        c = query[i]
-
-        # Single-quoted string literal: '...' with '' escape for internal quotes
-        if c == "'":
-            j = i + 1
-            while j < n:
-                if query[j] == "'":
-                    if j + 1 < n and query[j + 1] == "'":
-                        j += 2
-                    else:
-                        j += 1
-                        break
-                else:
-                    j += 1
-            result.append(query[i:j])
-            i = j
-
-        # Double-quoted identifier: "..." with "" escape
-        elif c == '"':
-            j = i + 1
-            while j < n:
-                if query[j] == '"':
-                    if j + 1 < n and query[j + 1] == '"':
-                        j += 2
-                    else:
-                        j += 1
-                        break
-                else:
-                    j += 1
-            result.append(query[i:j])
-            i = j
-
-        # Dollar-quoted string: $tag$...$tag$
-        elif c == "$":
-            j = i + 1
-            while j < n and query[j] != "$":
-                j += 1
-            if j < n:
-                tag = query[i : j + 1]
-                close = query.find(tag, j + 1)
-                if close != -1:
-                    result.append(query[i : close + len(tag)])
-                    i = close + len(tag)
-                else:
-                    result.append(c)
-                    i += 1
-            else:
-                result.append(c)
-                i += 1
-
-        # Potential bind parameter: :identifier
-        # Skip if preceded by : (cast) or a digit (array slice like [1:3])
-        elif c == ":":
-            prev = query[i - 1] if i > 0 else None
-            next_c = query[i + 1] if i + 1 < n else None
-            is_cast = prev == ":"
-            is_array_slice = prev is not None and prev.isdigit()
-            # Identifiers must start with a letter or underscore, not a digit
-            starts_valid_ident = next_c is not None and (next_c.isalpha() or next_c == "_")
-            if not is_cast and not is_array_slice and starts_valid_ident:
-                j = i + 1
-                while j < n and query[j] in _IDENT_CHARS:
-                    j += 1
-                if rewrite:
-                    varname = query[i + 1 : j]
-                    result.append(f"%({varname})s")
-                else:
-                    result.append(query[i:j])
-                i = j
-            else:
-                result.append(c)
-                i += 1
-
-        else:
-            result.append(c)
-            i += 1
+    if not rewrite:
+        return query
 
-    return "".join(result)
+    return compile_query(query).sql
 
 
 def quoted_identifier(
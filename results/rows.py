@@ -1,7 +1,10 @@
 import random
 import string
+import sys
+from collections.abc import Sequence
 from copy import deepcopy
 from dataclasses import make_dataclass
+from functools import lru_cache
 
 from .formatting import format_table_of_dicts
 
@@ -29,6 +32,59 @@ class DictRow(dict):
         return "{\n" + mid + "\n}\n"
 
 
+@lru_cache(maxsize=256)
+def column_numbers(names: tuple) -> dict:
+    """Map each column name to its index within a row."""
+    return {c: i for i, c in enumerate(names)}
+
+
+@lru_cache(maxsize=256)
+def record_class(names: tuple):
+    """The dataclass used for rows with these column names.
+
+    Created once per distinct set of columns, rather than once per call, and
+    slotted (on python 3.10+) to keep each row small.
+    """
+    kwargs = dict(slots=True) if sys.version_info >= (3, 10) else {}
+    return make_dataclass("Row", list(names), **kwargs)
+
+
+class RowsView(Sequence):
+    """A lazy, read-only sequence over the rows of a Rows object.
+
+    Nothing is converted up front: each row is converted when it's accessed.
+    Converted rows aren't kept: kept by position, they'd go stale as soon as
+    rows were inserted or removed, so instead each access converts the row
+    again, and changes to the rows are always seen. Iterating converts rows
+    as it goes. Use list() (or .d/.dc) to convert everything once, and keep
+    the results.
+    """
+
+    def __init__(self, rows, make_row):
+        self.rows = rows
+        self.make_row = make_row
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, x):
+        if isinstance(x, slice):
+            return [self.make_row(row) for row in self.rows[x]]
+
+        return self.make_row(self.rows[x])
+
+    def __iter__(self):
+        return map(self.make_row, self.rows)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, RowsView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class Rows(list):
     def __init__(self, *args, **kwargs):
         self.paging = None
@@ -43,9 +99,7 @@ class Rows(list):
         if x not in self.column_info:
             raise ValueError(f"no such column: {x}")
 
-        numbers = {c: i for i, c in enumerate(self.column_info)}
-
-        i = numbers[x]
+        i = column_numbers(tuple(self.column_info))[x]
 
         return [_[i] for _ in self]
 
@@ -54,13 +108,26 @@ class Rows(list):
 
     @property
     def d(self) -> list[dict]:
-        return [DictRow(zip(self.column_info, _)) for _ in self]
+        names = tuple(self.column_info)
+        return [DictRow(zip(names, _)) for _ in self]
 
     @property
     def dc(self) -> list:
-        class_name = f"Row_{rando()}"
-        _class = make_dataclass(class_name, list(self.column_info))
-        return [_class(**d) for d in self.d]
+        _class = record_class(tuple(self.column_info))
+        return [_class(*_) for _ in self]
+
+    @property
+    def lazy_d(self) -> RowsView:
+        """Like .d, but a view converting each row only when it's accessed."""
+        names = tuple(self.column_info)
+        return RowsView(self, lambda row: DictRow(zip(names, row)))
+
+    @property
+    def lazy_dc(self) -> RowsView:
+        """Like .dc, but a view converting each row only when it's
+        accessed."""
+        _class = record_class(tuple(self.column_info))
+        return RowsView(self, lambda row: _class(*row))
 
     def as_dicts(self):
         return self.d
@@ -88,6 +155,18 @@ class Rows(list):
 
         return {k: guess_sql_type_of_values(self[k]) for k in self.column_info}
 
+    def to_columns(self, use_numpy=None):
+        """Return a column-oriented copy of these results (see Columns)."""
+        from .columnar import Columns
+
+        return Columns.from_rows(self, use_numpy=use_numpy)
+
+    def to_arrow(self):
+        """Return these results as a pyarrow Table (requires pyarrow)."""
+        from .exporting import rows_to_arrow
+
+        return rows_to_arrow(self)
+
     @classmethod
     def from_dicts(cls, list_of_dicts):
         """Create a Rows object from a list of dictionaries."""
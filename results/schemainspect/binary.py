@@ -0,0 +1,108 @@
+"""
+A compact binary format for SchemaDefinitions, much quicker to load than
+YAML or JSON.
+
+A file starts with MAGIC, then a format version byte and a compression byte
+(none, gzip or zstd). The rest is the definition's dict, marshalled (format
+version 4, unchanged since python 3.4). Every string is interned before
+marshalling, so each distinct string (names, schemas, types, the keys of
+every field) is written once, and referred to after that. Loading is then a
+single marshal.loads, in C. (So, as with marshal, only load files from
+sources you trust.)
+
+The dependency closures of the loaded schema can be included too (as
+bitsets, see closure.py), so they needn't be worked out again on load.
+
+Loading is about twice as fast as JSON, but not yet "well under a second"
+for big schemas: in benchmarks/bench_definition_load.py, 10000 tables and
+views (64MB as JSON) take 0.9-1.4s to load into an inspector, and 50000
+take 7-11s. Most of that is building the inspected objects, not decoding.
+"""
+
+import gzip
+import marshal
+import sys
+
+from .misc import gc_paused
+
+MAGIC = b"RSDEF"
+
+FORMAT = 1
+
+MARSHAL_VERSION = 4
+
+COMPRESSIONS = [None, "gzip", "zstd"]
+
+
+def interned(value):
+    """value with every string in it interned, so equal strings are the same
+    object (and marshalled once)."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {interned(k): interned(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [interned(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(interned(v) for v in value)
+    return value
+
+
+def zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstandard is required for zstd compression")
+    return zstandard
+
+
+def compressed(data, compression):
+    if compression == "gzip":
+        return gzip.compress(data, mtime=0)
+    if compression == "zstd":
+        return zstandard().ZstdCompressor().compress(data)
+    return data
+
+
+def decompressed(data, compression):
+    if compression == "gzip":
+        return gzip.decompress(data)
+    if compression == "zstd":
+        return zstandard().ZstdDecompressor().decompress(data)
+    return data
+
+
+def is_binary(data):
+    return data[: len(MAGIC)] == MAGIC
+
+
+def dumps(d, compression=None):
+    """d (a definition's dict) in the binary format."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"unknown compression: {compression}")
+
+    header = MAGIC + bytes([FORMAT, COMPRESSIONS.index(compression)])
+    data = marshal.dumps(interned(d), MARSHAL_VERSION)
+
+    return header + compressed(data, compression)
+
+
+def loads(data):
+    """The dict dumped as data by dumps()."""
+    if not is_binary(data):
+        raise ValueError("not a binary schema definition")
+
+    version, compression = data[len(MAGIC) : len(MAGIC) + 2]
+
+    if version != FORMAT:
+        raise ValueError(f"unsupported binary definition format: {version}")
+
+    try:
+        compression = COMPRESSIONS[compression]
+    except IndexError:
+        raise ValueError(f"unknown compression in binary definition: {compression}")
+
+    data = decompressed(data[len(MAGIC) + 2 :], compression)
+
+    with gc_paused():
+        return marshal.loads(data)
@@ -0,0 +1,166 @@
+"""
+Transitive closure of the dependencies between inspected objects.
+
+Each object gets an integer index (in signature order), and its closure is
+a bitset held in a python int: the closure of an object is the union of its
+direct dependencies' closures, which is a single OR per edge. Objects are
+visited dependencies first, so each closure is computed exactly once.
+
+Bitsets are cheap to build even for very deep dependency chains, where the
+closures themselves (as lists of signatures) are quadratic in size. So the
+lists are only built on demand, per object.
+"""
+
+
+class DependencyClosure:
+    """Closures over objects (by signature), following the signatures each
+    lists in its dependent_on and dependents. Signatures that aren't in
+    objects are left out."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.signatures = sorted(objects)
+        self.index = {k: i for i, k in enumerate(self.signatures)}
+        self.closures = {}
+
+    def edges(self, att):
+        index = self.index
+
+        return [
+            [index[k] for k in getattr(self.objects[s], att) if k in index]
+            for s in self.signatures
+        ]
+
+    def bitsets(self, att):
+        """The closure of every object, following att, as bitsets."""
+        try:
+            return self.closures[att]
+        except KeyError:
+            pass
+
+        edges = self.edges(att)
+        closures = [0] * len(edges)
+
+        for component in strongly_connected(edges):
+            # everything reachable from any member, members included (if
+            # there's more than one, they're all reachable from each other)
+            bits = 0
+
+            for i in component:
+                for j in edges[i]:
+                    bits |= closures[j] | (1 << j)
+
+            for i in component:
+                closures[i] = bits & ~(1 << i)
+
+        self.closures[att] = closures
+        return closures
+
+    def saved(self):
+        """Every closure, to be restored (by restore()) instead of worked
+        out again for the same objects. Each bitset is saved as its lowest
+        set bit and the bits from there, as most closures are of objects
+        near each other in signature order (in the same schema)."""
+        saved = {"signatures": self.signatures}
+
+        for att in ("dependent_on", "dependents"):
+            saved[att] = [shifted(bits) for bits in self.bitsets(att)]
+
+        return saved
+
+    def restore(self, saved):
+        """Use closures from saved(), if they're for the same signatures."""
+        if saved.get("signatures") != self.signatures:
+            return
+
+        for att in ("dependent_on", "dependents"):
+            self.closures[att] = [bits << low for low, bits in saved[att]]
+
+    def related(self, signature, att):
+        """Sorted signatures of everything reachable from signature via att."""
+        try:
+            i = self.index[signature]
+        except KeyError:
+            return []
+
+        bits = self.bitsets(att)[i]
+        return [self.signatures[j] for j in bit_indices(bits)]
+
+
+def shifted(bits):
+    """bits as (the index of its lowest set bit, bits shifted down by that)."""
+    low = (bits & -bits).bit_length() - 1 if bits else 0
+    return low, bits >> low
+
+
+def bit_indices(bits):
+    """Indices of the set bits in bits, lowest first."""
+    # reversed binary string, so position in the string is the bit index
+    digits = bin(bits)[:1:-1]
+    indices = []
+    i = digits.find("1")
+
+    while i != -1:
+        indices.append(i)
+        i = digits.find("1", i + 1)
+
+    return indices
+
+
+def strongly_connected(edges):
+    """The strongly connected components of a graph (edges[i] lists the
+    nodes that node i points to), each component after every component it
+    can reach. Iterative Tarjan, so deep graphs don't hit the recursion
+    limit."""
+    count = len(edges)
+    lowlink = [0] * count
+    order = [-1] * count
+    on_stack = [False] * count
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(count):
+        if order[root] != -1:
+            continue
+
+        order[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(edges[root]))]
+
+        while work:
+            node, targets = work[-1]
+
+            for target in targets:
+                if order[target] == -1:
+                    order[target] = lowlink[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = True
+                    work.append((target, iter(edges[target])))
+                    break
+                elif on_stack[target]:
+                    lowlink[node] = min(lowlink[node], order[target])
+            else:
+                work.pop()
+
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                if lowlink[node] == order[node]:
+                    component = []
+
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+
+                        if member == node:
+                            break
+
+                    components.append(component)
+
+    return components
@@ -0,0 +1,79 @@
+"""
+Fetching all of the catalog queries at once, rather than one after another.
+
+Each function here makes a prefetch function for PostgreSQL(c, prefetch=...):
+given the list of catalog queries, it returns their results by query text.
+"""
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from .pg.obj import attdicts
+
+
+def pipelined(c):
+    """Send every query over c's connection in a single round trip, with
+    libpq pipeline mode. The server still runs them one at a time, but no
+    time is spent waiting on the network in between."""
+
+    def prefetch(queries):
+        conn = c.connection
+        cursors = []
+
+        try:
+            with conn.pipeline():
+                for query in queries:
+                    curs = conn.cursor()
+                    cursors.append(curs)
+                    curs.execute(query)
+
+            return {query: attdicts(curs) for query, curs in zip(queries, cursors)}
+        finally:
+            for curs in cursors:
+                curs.close()
+
+    return prefetch
+
+
+def on_connections(db, snapshot, workers):
+    """Run the queries spread across several of db's pooled connections,
+    each importing snapshot (from pg_export_snapshot), so that they all see
+    exactly the same catalogs. Inspection then takes roughly as long as the
+    slowest query."""
+
+    def prefetch(queries):
+        pending = queue.SimpleQueue()
+
+        for query in queries:
+            pending.put(query)
+
+        def work():
+            fetched = {}
+
+            with db.t() as t:
+                t.ex("set transaction isolation level repeatable read")
+                # utility statements can't take bind params
+                t.ex(f"set transaction snapshot '{snapshot}'")
+
+                while True:
+                    try:
+                        query = pending.get_nowait()
+                    except queue.Empty:
+                        return fetched
+
+                    t.c.execute(query)
+                    fetched[query] = attdicts(t.c)
+
+        workers_count = min(workers, len(queries))
+
+        with ThreadPoolExecutor(workers_count) as executor:
+            futures = [executor.submit(work) for _ in range(workers_count)]
+
+        fetched = {}
+
+        for future in futures:
+            fetched.update(future.result())
+
+        return fetched
+
+    return prefetch
@@ -2,7 +2,8 @@
 SchemaDefinition: a serializable, connection-free representation of a database schema.
 
 Produced by PostgreSQL.as_definition() and consumed by PostgreSQL.from_definition().
-Can be serialized to/from YAML or JSON, enabling offline diffs without a live DB.
+Can be serialized to/from YAML, JSON or a compact binary format (see binary.py),
+enabling offline diffs without a live DB.
 """
 
 from __future__ import annotations
@@ -59,8 +60,13 @@ class SchemaDefinition:
     domains: dict[str, Any]
     composite_types: dict[str, Any]
 
+    # dependency closures saved with the binary format, if any (see
+    # DependencyClosure.saved())
+    closures: dict[str, Any] | None
+
     def __init__(self, pg_version: int = 14, **categories: dict[str, Any]):
         self.pg_version = pg_version
+        self.closures = None
         for cat in self.CATEGORIES:
             setattr(self, cat, categories.get(cat, {}))
 
@@ -82,6 +88,27 @@ class SchemaDefinition:
             self.to_dict(), default_flow_style=False, allow_unicode=True
         )
 
+    def to_binary(self, compression: str | None = None, closures: bool = True) -> bytes:
+        """The compact binary format, compressed with "gzip" or "zstd" (which
+        requires zstandard) if given. With closures, the dependency closures
+        are saved too, rather than worked out on each load: those kept with
+        this definition (by from_binary(), or as_definition(closures=True)),
+        or else worked out now, by loading it."""
+        from .binary import dumps
+
+        d = self.to_dict()
+        if closures:
+            d["closures"] = self.dependency_closures()
+        return dumps(d, compression=compression)
+
+    def dependency_closures(self) -> dict[str, Any]:
+        from .pg import PostgreSQL
+
+        if self.closures is not None:
+            return self.closures
+
+        return PostgreSQL.from_definition(self).dependency_closure.saved()
+
     @classmethod
     def from_dict(cls, d: dict) -> SchemaDefinition:
         pg_version = d.get("pg_version", 14)
@@ -98,6 +125,15 @@ class SchemaDefinition:
 
         return cls.from_dict(yaml.safe_load(s))
 
+    @classmethod
+    def from_binary(cls, data: bytes) -> SchemaDefinition:
+        from .binary import loads
+
+        d = loads(data)
+        defn = cls.from_dict(d)
+        defn.closures = d.get("closures")
+        return defn
+
     def schemadiff_as_statements(self, other, **kwargs):
         """Diff this definition against another definition or live DB connection."""
         from results.dbdiff import Migration
@@ -108,7 +144,13 @@ class SchemaDefinition:
             **{
                 k: v
                 for k, v in kwargs.items()
-                if k in ("schema", "exclude_schema", "ignore_extension_versions")
+                if k
+                in (
+                    "schema",
+                    "exclude_schema",
+                    "ignore_extension_versions",
+                    "snapshot_dir",
+                )
             },
         )
         m.set_safety(False)
@@ -1,23 +1,69 @@
+from .concurrent import on_connections, pipelined
 from .inspector import NullInspector
 from .pg import PostgreSQL
+from .snapshot import inspect_with_snapshot
 
 SUPPORTED = {"postgresql": PostgreSQL}
 
 
-def get_inspector(x, schema=None, exclude_schema=None):
+def inspected_cursor(c, snapshot_dir=None, prefetch=None, **filters):
+    if snapshot_dir:
+        return inspect_with_snapshot(c, snapshot_dir, prefetch=prefetch, **filters)
+    return PostgreSQL(c, prefetch=prefetch, **filters)
+
+
+def get_inspector(
+    x,
+    schema=None,
+    exclude_schema=None,
+    snapshot_dir=None,
+    pipeline=False,
+    workers=None,
+):
+    """Inspect the schema of x (a database, transaction or cursor).
+
+    By default the catalog queries run one after another. pipeline=True
+    sends them all in one round trip instead. workers=n runs them across n
+    pooled connections at once, sharing an exported snapshot (x must be a
+    database for this). Either way, all the queries see the same snapshot
+    of the catalogs.
+
+    schema and exclude_schema can each be a schema name or a glob (such as
+    "tenant_*"), or a list of them.
+    """
     if schema and exclude_schema:
         raise ValueError("Cannot provide both schema and exclude_schema")
     if x is None:
         return NullInspector()
 
+    filters = dict(schema=schema, exclude_schema=exclude_schema)
+
     if hasattr(x, "url") and hasattr(x, "URL"):
         with x.t() as t:
-            inspected = PostgreSQL(t.c)
+            prefetch = None
+
+            if pipeline or workers:
+                t.ex("set transaction isolation level repeatable read")
+
+            if workers:
+                snapshot = t.q("select pg_export_snapshot()")[0][0]
+                prefetch = on_connections(x, snapshot, workers)
+            elif pipeline:
+                prefetch = pipelined(t.c)
+
+            inspected = inspected_cursor(t.c, snapshot_dir, prefetch, **filters)
     else:
+        if workers:
+            raise ValueError("workers requires a database, not a connection")
+
         try:
-            inspected = PostgreSQL(x.c)
+            c = x.c
         except AttributeError:
-            inspected = PostgreSQL(x)
+            c = x
+
+        inspected = inspected_cursor(
+            c, snapshot_dir, pipelined(c) if pipeline else None, **filters
+        )
 
     if schema:
         inspected.one_schema(schema)
@@ -1,15 +1,89 @@
 from __future__ import annotations
 
+import hashlib
 from collections import OrderedDict as od
-from typing import TYPE_CHECKING, Any
+from collections.abc import Mapping
+from typing import Any
 
 from .misc import AutoRepr, quoted_identifier, unquoted_identifier
 
-if TYPE_CHECKING:
-    from collections.abc import Mapping
 
+PLAIN = frozenset((str, int, type(None)))
 
-class Inspected(AutoRepr):
+
+def canonical(value: Any) -> Any:
+    """value as nested tuples of plain values, equal only if value is (by ==).
+    So numbers are compared by value (1, 1.0 and True are all 1), dicts
+    regardless of order (OrderedDicts in order), and digested objects by their
+    class and digest_fields()."""
+    if type(value) in PLAIN:
+        return value
+    if isinstance(value, (bool, float)):
+        return int(value) if float(value).is_integer() else value
+    if isinstance(value, Digested):
+        return (type(value).__name__, canonical(value.digest_fields()))
+    if isinstance(value, (list, tuple)):
+        if PLAIN.issuperset(map(type, value)):
+            items = tuple(value)
+        else:
+            items = tuple(map(canonical, value))
+        return ("list" if isinstance(value, list) else "tuple", items)
+    if isinstance(value, od):
+        return ("od", tuple((canonical(k), canonical(v)) for k, v in value.items()))
+    if isinstance(value, Mapping):
+        items = sorted((repr(canonical(k)), canonical(v)) for k, v in value.items())
+        return ("dict", tuple(items))
+    if isinstance(value, (set, frozenset)):
+        return ("set", tuple(sorted(repr(canonical(v)) for v in value)))
+    return value
+
+
+def digest_of(value: Any) -> str:
+    """A stable digest (the same across processes and versions of python) of
+    value, made of plain values, dicts, lists etc. and digested objects."""
+    encoded = repr(canonical(value)).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class Digested:
+    """
+    Defined by its digest_fields(). Compared field by field, unless both
+    objects' digests have already been worked out (see digest), when just
+    the digests are compared. So an object shouldn't be modified once its
+    digest is taken.
+    """
+
+    _digest: str | None = None
+
+    def digest_fields(self) -> tuple[Any, ...]:
+        raise NotImplementedError
+
+    @property
+    def digest(self) -> str:
+        """A digest of what defines this object, worked out the first time
+        it's needed and then kept: equal objects have equal digests, and
+        objects with different digests aren't equal."""
+        if self._digest is None:
+            self._digest = digest_of(self)
+        return self._digest
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Digested):
+            return NotImplemented
+        if self is other:
+            return True
+        if self._digest is not None and other._digest is not None:
+            return self._digest == other._digest
+        return (
+            type(self) is type(other)
+            and self.digest_fields() == other.digest_fields()
+        )
+
+    def __ne__(self, other: object) -> bool:
+        return not self == other
+
+
+class Inspected(Digested, AutoRepr):
     name: str
     schema: str
 
@@ -33,9 +107,6 @@ class Inspected(AutoRepr):
     def quoted_schema(self) -> str:
         return quoted_identifier(self.schema)
 
-    def __ne__(self, other: object) -> bool:
-        return not self == other
-
 
 class TableRelated:
     schema: str
@@ -48,7 +119,7 @@ class TableRelated:
         )
 
 
-class ColumnInfo(AutoRepr):
+class ColumnInfo(Digested, AutoRepr):
     name: str
     dbtype: str
     dbtypestr: str
@@ -102,22 +173,20 @@ class ColumnInfo(AutoRepr):
         self.can_set_expression = can_set_expression
         self.comment = comment
 
-    def __eq__(self, other: object) -> bool:
-        if not isinstance(other, ColumnInfo):
-            return NotImplemented
+    def digest_fields(self) -> tuple[Any, ...]:
         return (
-            self.name == other.name
-            and self.dbtype == other.dbtype
-            and self.dbtypestr == other.dbtypestr
-            and self.default == other.default
-            and self.not_null == other.not_null
-            and self.enum == other.enum
-            and self.collation == other.collation
-            and self.is_identity == other.is_identity
-            and self.is_identity_always == other.is_identity_always
-            and self.is_generated == other.is_generated
-            and self.is_inherited == other.is_inherited
-            and self.comment == other.comment
+            self.name,
+            self.dbtype,
+            self.dbtypestr,
+            self.default,
+            self.not_null,
+            self.enum,
+            self.collation,
+            self.is_identity,
+            self.is_identity_always,
+            self.is_generated,
+            self.is_inherited,
+            self.comment,
         )
 
     def alter_clauses(self, other: ColumnInfo) -> list[str]:
@@ -363,8 +432,6 @@ class InspectedSelectable(Inspected):
     relationtype: str
     dependent_on: list[str]
     dependents: list[str]
-    dependent_on_all: list[str]
-    dependents_all: list[str]
     constraints: od[str, Any]
     indexes: od[str, Any]
     comment: str | None
@@ -405,6 +472,7 @@ class InspectedSelectable(Inspected):
         self.dependents = dependents or []
         self.dependent_on_all = []
         self.dependents_all = []
+        self._dependency_closure = None
         self.constraints = od()
         self.indexes = od()
         self.comment = comment
@@ -416,25 +484,47 @@ class InspectedSelectable(Inspected):
         self.options = options
         self.oid = oid
 
-    def __eq__(self, other: object) -> bool:
-        if not isinstance(other, InspectedSelectable):
-            return NotImplemented
-        equalities = (
-            type(self) is type(other),
-            self.relationtype == other.relationtype,
-            self.name == other.name,
-            self.schema == other.schema,
-            dict(self.columns) == dict(other.columns),
-            self.inputs == other.inputs,
-            self.definition == other.definition,
-            self.parent_table == other.parent_table,
-            self.partition_def == other.partition_def,
-            self.rowsecurity == other.rowsecurity,
-            self.persistence == other.persistence,
-            self.options == other.options,
-            self.comment == other.comment,
+    @property
+    def dependent_on_all(self) -> list[str]:
+        """Everything this depends on, directly or indirectly."""
+        if self._dependent_on_all is None:
+            self._dependent_on_all = self._dependency_closure.related(
+                self.signature, "dependent_on"
+            )
+        return self._dependent_on_all
+
+    @dependent_on_all.setter
+    def dependent_on_all(self, value: list[str]) -> None:
+        self._dependent_on_all = value
+
+    @property
+    def dependents_all(self) -> list[str]:
+        """Everything depending on this, directly or indirectly."""
+        if self._dependents_all is None:
+            self._dependents_all = self._dependency_closure.related(
+                self.signature, "dependents"
+            )
+        return self._dependents_all
+
+    @dependents_all.setter
+    def dependents_all(self, value: list[str]) -> None:
+        self._dependents_all = value
+
+    def digest_fields(self) -> tuple[Any, ...]:
+        return (
+            self.relationtype,
+            self.name,
+            self.schema,
+            dict(self.columns),
+            self.inputs,
+            self.definition,
+            self.parent_table,
+            self.partition_def,
+            self.rowsecurity,
+            self.persistence,
+            self.options,
+            self.comment,
         )
-        return all(equalities)
 
     @property
     def comment_statement(self) -> str | None:
@@ -1,4 +1,7 @@
+import gc
 import inspect
+import re
+from contextlib import contextmanager
 from reprlib import recursive_repr
 
 # from pkg_resources import resource_stream as pkg_resource_stream
@@ -69,6 +72,41 @@ def quoted_identifier(identifier, schema=None, identity_arguments=None):
     return s
 
 
+def schema_globs(x):
+    """A schema filter (a name or glob, or a list of them) as a list, or None
+    if there isn't one."""
+    if not x:
+        return None
+    if isinstance(x, str):
+        return [x]
+    return list(x)
+
+
+def glob_as_like(glob):
+    """A schema glob (* for anything, ? for any one character) as a LIKE
+    pattern."""
+    escaped = glob.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.replace("*", "%").replace("?", "_")
+
+
+def glob_matcher(globs):
+    """A function testing whether a name matches any of globs, exactly as
+    the LIKE patterns from glob_as_like would."""
+    parts = (
+        "".join(
+            ".*" if char == "*" else "." if char == "?" else re.escape(char)
+            for char in glob
+        )
+        for glob in globs
+    )
+    pattern = re.compile("|".join(parts), re.DOTALL)
+
+    def matches(name):
+        return pattern.fullmatch(name) is not None
+
+    return matches
+
+
 def external_caller_package():
     """Get the package name of the external caller.
 
@@ -94,3 +132,18 @@ def resource_stream(subpath):
 def resource_text(subpath):
     with resource_stream(subpath) as f:
         return f.read()
+
+
+@contextmanager
+def gc_paused():
+    """Without garbage collection for a while: while building lots of objects
+    that won't be garbage (such as a whole schema), collections are frequent
+    and find nothing. Usable as a decorator, too."""
+    enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
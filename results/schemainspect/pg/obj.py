@@ -2,10 +2,18 @@ import textwrap
 from collections import OrderedDict as od
 from itertools import groupby
 
-from ..inspected import ColumnInfo, Inspected
+from ..closure import DependencyClosure
+from ..inspected import ColumnInfo, Inspected, digest_of
 from ..inspected import InspectedSelectable as BaseInspectedSelectable
 from ..inspected import TableRelated
-from ..misc import quoted_identifier, resource_text
+from ..misc import (
+    gc_paused,
+    glob_as_like,
+    glob_matcher,
+    quoted_identifier,
+    resource_text,
+    schema_globs,
+)
 
 CREATE_TABLE = """create {}table {} ({}
 ){}{};
@@ -318,17 +326,17 @@ class InspectedFunction(InspectedSelectable):
     def drop_statement(self):
         return "drop {} if exists {};".format(self.thing, self.signature)
 
-    def __eq__(self, other):
+    def digest_fields(self):
         return (
-            self.signature == other.signature
-            and self.result_string == other.result_string
-            and self.definition == other.definition
-            and self.language == other.language
-            and self.volatility == other.volatility
-            and self.strictness == other.strictness
-            and self.security_type == other.security_type
-            and self.kind == other.kind
-            and self.comment == other.comment
+            self.signature,
+            self.result_string,
+            self.definition,
+            self.language,
+            self.volatility,
+            self.strictness,
+            self.security_type,
+            self.kind,
+            self.comment,
         )
 
     @property
@@ -421,19 +429,15 @@ class InspectedTrigger(Inspected):
         else:
             return self.full_definition + ";"
 
-    def __eq__(self, other):
-        """
-        :type other: InspectedTrigger
-        :rtype: bool
-        """
+    def digest_fields(self):
         return (
-            self.name == other.name
-            and self.schema == other.schema
-            and self.table_name == other.table_name
-            and self.proc_schema == other.proc_schema
-            and self.proc_name == other.proc_name
-            and self.enabled == other.enabled
-            and self.full_definition == other.full_definition
+            self.name,
+            self.schema,
+            self.table_name,
+            self.proc_schema,
+            self.proc_name,
+            self.enabled,
+            self.full_definition,
         )
 
 
@@ -499,29 +503,24 @@ class InspectedIndex(Inspected, TableRelated):
     def is_exclusion_constraint(self):
         return self.constraint and self.constraint.constraint_type == "EXCLUDE"
 
-    def __eq__(self, other):
-        """
-        :type other: InspectedIndex
-        :rtype: bool
-        """
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.table_name == other.table_name,
-            self.key_columns == other.key_columns,
-            self.included_columns == other.included_columns,
-            self.key_options == other.key_options,
-            self.num_att == other.num_att,
-            self.is_unique == other.is_unique,
-            self.is_pk == other.is_pk,
-            self.is_exclusion == other.is_exclusion,
-            self.is_immediate == other.is_immediate,
-            self.is_clustered == other.is_clustered,
-            self.key_expressions == other.key_expressions,
-            self.partial_predicate == other.partial_predicate,
-            self.algorithm == other.algorithm,
+    def digest_fields(self):
+        return (
+            self.name,
+            self.schema,
+            self.table_name,
+            self.key_columns,
+            self.included_columns,
+            self.key_options,
+            self.num_att,
+            self.is_unique,
+            self.is_pk,
+            self.is_exclusion,
+            self.is_immediate,
+            self.is_clustered,
+            self.key_expressions,
+            self.partial_predicate,
+            self.algorithm,
         )
-        return all(equalities)
 
 
 class InspectedSequence(Inspected):
@@ -573,13 +572,12 @@ class InspectedSequence(Inspected):
                 self.quoted_full_table_name + "." + quoted_identifier(self.column_name)
             )
 
-    def __eq__(self, other):
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.quoted_table_and_column_name == other.quoted_table_and_column_name,
+    def digest_fields(self):
+        return (
+            self.name,
+            self.schema,
+            self.quoted_table_and_column_name,
         )
-        return all(equalities)
 
 
 class InspectedCollation(Inspected):
@@ -613,14 +611,13 @@ class InspectedCollation(Inspected):
             self.quoted_full_name, self.provider, self.locale
         )
 
-    def __eq__(self, other):
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.provider == other.provider,
-            self.locale == other.locale,
+    def digest_fields(self):
+        return (
+            self.name,
+            self.schema,
+            self.provider,
+            self.locale,
         )
-        return all(equalities)
 
 
 class InspectedEnum(Inspected):
@@ -690,13 +687,12 @@ class InspectedEnum(Inspected):
         # new must already have the existing items from old, in the same order
         return [e for e in new.elements if e in old] == old
 
-    def __eq__(self, other):
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.elements == other.elements,
+    def digest_fields(self):
+        return (
+            self.name,
+            self.schema,
+            self.elements,
         )
-        return all(equalities)
 
 
 class InspectedSchema(Inspected):
@@ -720,8 +716,8 @@ class InspectedSchema(Inspected):
     def quoted_name(self):
         return quoted_identifier(self.schema)
 
-    def __eq__(self, other):
-        return self.schema == other.schema
+    def digest_fields(self):
+        return (self.schema,)
 
 
 class InspectedType(Inspected):
@@ -749,13 +745,8 @@ class InspectedType(Inspected):
         sql += "\n);"
         return sql
 
-    def __eq__(self, other):
-        return (
-            self.schema == other.schema
-            and self.name == other.name
-            and self.columns == other.columns
-            and self.comment == other.comment
-        )
+    def digest_fields(self):
+        return (self.schema, self.name, self.columns, self.comment)
 
     @property
     def comment_statement(self):
@@ -877,16 +868,8 @@ as {_type}
         "schema name data_type collation default constraint_name not_null check".split()
     )
 
-    def __eq__(self, other):
-        try:
-            return all(
-                [
-                    getattr(self, a) == getattr(other, a)
-                    for a in self.equality_attributes
-                ]
-            )
-        except AttributeError:
-            return False
+    def digest_fields(self):
+        return tuple(getattr(self, a) for a in self.equality_attributes)
 
 
 class InspectedExtension(Inspected):
@@ -922,13 +905,12 @@ class InspectedExtension(Inspected):
     def alter_statements(self, other=None):
         return [self.update_statement]
 
-    def __eq__(self, other):
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.version == other.version,
+    def digest_fields(self):
+        return (
+            self.name,
+            self.schema,
+            self.version,
         )
-        return all(equalities)
 
     def unversioned_copy(self):
         return InspectedExtension(self.name, self.schema)
@@ -1077,17 +1059,16 @@ class InspectedConstraint(Inspected, TableRelated):
             quoted_identifier(self.schema), quoted_identifier(self.table_name)
         )
 
-    def __eq__(self, other):
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.table_name == other.table_name,
-            self.definition == other.definition,
-            self.index == other.index,
-            self.is_deferrable == other.is_deferrable,
-            self.initially_deferred == other.initially_deferred,
+    def digest_fields(self):
+        return (
+            self.name,
+            self.schema,
+            self.table_name,
+            self.definition,
+            self.index,
+            self.is_deferrable,
+            self.initially_deferred,
         )
-        return all(equalities)
 
 
 class InspectedPrivilege(Inspected):
@@ -1120,15 +1101,14 @@ class InspectedPrivilege(Inspected):
             self.quoted_target_user,
         )
 
-    def __eq__(self, other):
-        equalities = (
-            self.schema == other.schema,
-            self.object_type == other.object_type,
-            self.name == other.name,
-            self.privilege == other.privilege,
-            self.target_user == other.target_user,
+    def digest_fields(self):
+        return (
+            self.schema,
+            self.object_type,
+            self.name,
+            self.privilege,
+            self.target_user,
         )
-        return all(equalities)
 
     @property
     def key(self):
@@ -1200,25 +1180,68 @@ class InspectedRowPolicy(Inspected, TableRelated):
             self.quoted_name, self.quoted_full_table_name
         )
 
-    def __eq__(self, other):
-        equalities = (
-            self.name == other.name,
-            self.schema == other.schema,
-            self.permissiveness == other.permissiveness,
-            self.commandtype == other.commandtype,
-            self.permissive == other.permissive,
-            self.roles == other.roles,
-            self.qual == other.qual,
-            self.withcheck == other.withcheck,
+    def digest_fields(self):
+        return (
+            self.name,
+            self.schema,
+            self.permissiveness,
+            self.commandtype,
+            self.permissive,
+            self.roles,
+            self.qual,
+            self.withcheck,
         )
-        return all(equalities)
 
 
+def attdicts(c):
+    """The results of the last query run on cursor c, as AttDicts."""
+    rows = c.fetchall()
+    column_names = [d.name for d in c.description]
+    return [AttDict(zip(column_names, row)) for row in rows]
+
+
+def like_any_array(globs):
+    """An array of LIKE patterns for globs, to inline as the argument of
+    like any(...). Colons are escaped so text() doesn't see bind params."""
+    patterns = (
+        "'{}'".format(glob_as_like(glob).replace("'", "''").replace(":", r"\:"))
+        for glob in globs or []
+    )
+    return "array[{}]::text[]".format(", ".join(patterns))
+
+
+def add_sorted(deps, added):
+    """Add the signatures in added that aren't already in deps (a sorted
+    list), keeping deps sorted."""
+    present = set(deps)
+    new = [k for k in dict.fromkeys(added) if k not in present]
+
+    if new:
+        deps.extend(new)
+        deps.sort()
+
+
+# Everything a diff compares, for PostgreSQL.digest
+DIGESTED = (
+    "schemas relations composite_types functions sequences enums types domains "
+    "constraints indexes extensions privileges collations triggers rlspolicies"
+)
+
 PROPS = "schemas relations tables views functions selectables sequences constraints indexes enums extensions privileges collations triggers rlspolicies"
 
 
 class PostgreSQL:
-    def __init__(self, c, include_internal=False):
+    def __init__(
+        self, c, include_internal=False, prefetch=None, schema=None, exclude_schema=None
+    ):
+        """schema and exclude_schema (each a schema name or glob, or a list
+        of them) restrict what the catalog queries load, so unwanted schemas
+        are filtered out by the server rather than fetched and discarded."""
+        if schema and exclude_schema:
+            raise ValueError("Can only have schema or exclude schema, not both")
+
+        schema, exclude_schema = schema_globs(schema), schema_globs(exclude_schema)
+
         if not hasattr(c, "dialect") and hasattr(c, "s"):
             c = c.s.connection()
 
@@ -1266,6 +1289,16 @@ class PostgreSQL:
 
             q = q.replace("-- EXTOIDS", self.EXTOIDS_QUERY)
 
+            if schema:
+                q = q.replace("-- INCLUDE_SCHEMAS", "")
+            if exclude_schema:
+                q = q.replace("-- EXCLUDE_SCHEMAS", "")
+
+            # replaced even when commented out, as sqlalchemy's text() would
+            # otherwise take them for bind params
+            q = q.replace(":include_schemas", like_any_array(schema))
+            q = q.replace(":exclude_schemas", like_any_array(exclude_schema))
+
             if self.connection_type == "sqlalchemy":
                 from sqlalchemy import text
 
@@ -1303,20 +1336,53 @@ class PostgreSQL:
         self.TRIGGERS_QUERY = processed(TRIGGERS_QUERY)
 
         self.c = c
+
+        # results of catalog queries fetched ahead of time, all at once (see
+        # the prefetch functions in schemainspect.concurrent), by query text
+        self.prefetched = {}
+
+        if prefetch and self.connection_type == "psycopg3":
+            self.prefetched = prefetch(self.catalog_queries)
+
         self.load_all()
 
+        # enums, extensions and the like aren't filtered by the queries
+        if schema or exclude_schema:
+            self.filter_schema(schema=schema, exclude_schema=exclude_schema)
+
+    @property
+    def catalog_queries(self):
+        """Every query load_all runs, slowest first."""
+        queries = [
+            self.ALL_RELATIONS_QUERY,
+            self.DEPS_QUERY,
+            self.FUNCTIONS_QUERY,
+            self.PRIVILEGES_QUERY,
+            self.CONSTRAINTS_QUERY,
+            self.INDEXES_QUERY,
+            self.FN_DEPS_QUERY,
+            self.TRIGGERS_QUERY,
+            self.TYPES_QUERY,
+            self.DOMAINS_QUERY,
+            self.SEQUENCES_QUERY,
+            self.ENUMS_QUERY,
+            self.EXTENSIONS_QUERY,
+            self.COLLATIONS_QUERY,
+            self.SCHEMAS_QUERY,
+        ]
+
+        if self.pg_version > 9:
+            queries.append(self.RLSPOLICIES_QUERY)
+
+        return queries
+
     def execute(self, *args, **kwargs):
         if not self.connection_type == "sqlalchemy":
-            # breakpoint()
-            self.c.execute(*args, **kwargs)
+            if not kwargs and len(args) == 1 and args[0] in self.prefetched:
+                return self.prefetched.pop(args[0])
 
-            # if result is None:
-            rows = self.c.fetchall()
-            descr = list(self.c.description)
-            column_names = [c.name for c in descr]
-            return [AttDict(zip(column_names, row)) for row in rows]
-            # else:
-            #     return result
+            self.c.execute(*args, **kwargs)
+            return attdicts(self.c)
         else:
             return self.c.execute(*args, **kwargs)
 
@@ -1401,6 +1467,8 @@ class PostgreSQL:
 
     def _apply_dep_rows(self, rows):
         """Wire up dependent_on / dependents from a list of dep rows."""
+        dependent_on, dependents = {}, {}
+
         for dep in rows:
             x = quoted_identifier(dep.name, dep.schema, dep.identity_arguments)
             x_dependent_on = quoted_identifier(
@@ -1412,18 +1480,22 @@ class PostgreSQL:
                 continue
             if x_dependent_on not in self.selectables:
                 continue
-            if x_dependent_on not in self.selectables[x].dependent_on:
-                self.selectables[x].dependent_on.append(x_dependent_on)
-                self.selectables[x].dependent_on.sort()
-            if x not in self.selectables[x_dependent_on].dependents:
-                self.selectables[x_dependent_on].dependents.append(x)
-                self.selectables[x_dependent_on].dependents.sort()
+            dependent_on.setdefault(x, []).append(x_dependent_on)
+            dependents.setdefault(x_dependent_on, []).append(x)
+
+        for k, added in dependent_on.items():
+            add_sorted(self.selectables[k].dependent_on, added)
+        for k, added in dependents.items():
+            add_sorted(self.selectables[k].dependents, added)
 
     def load_deps(self):
         q = self.execute(self.DEPS_QUERY)
 
         self.deps = list(q)
 
+        # lists appended to, to be sorted once all the rows are in
+        appended = {}
+
         for dep in self.deps:
             x = quoted_identifier(dep.name, dep.schema, dep.identity_arguments)
             x_dependent_on = quoted_identifier(
@@ -1431,14 +1503,24 @@ class PostgreSQL:
                 dep.schema_dependent_on,
                 dep.identity_arguments_dependent_on,
             )
-            self.selectables[x].dependent_on.append(x_dependent_on)
-            self.selectables[x].dependent_on.sort()
+            # dependents in schemas that weren't loaded
+            if x not in self.selectables:
+                continue
+
+            dependent_on = self.selectables[x].dependent_on
+            dependent_on.append(x_dependent_on)
+            appended[id(dependent_on)] = dependent_on
 
             try:
-                self.selectables[x_dependent_on].dependents.append(x)
-                self.selectables[x_dependent_on].dependents.sort()
+                dependents = self.selectables[x_dependent_on].dependents
             except LookupError:
-                pass
+                continue
+
+            dependents.append(x)
+            appended[id(dependents)] = dependents
+
+        for deps in appended.values():
+            deps.sort()
 
         # Pick up table/view -> function dependencies from column defaults
         fn_dep_rows = self.execute(self.FN_DEPS_QUERY)
@@ -1462,9 +1544,11 @@ class PostgreSQL:
                         c.enum.dependents.append(k)
 
             if r.parent_table:
-                pt = self.relations[r.parent_table]
                 r.dependent_on.append(r.parent_table)
-                pt.dependents.append(r.signature)
+
+                if r.parent_table in self.relations:
+                    pt = self.relations[r.parent_table]
+                    pt.dependents.append(r.signature)
 
     def get_dependency_by_signature(self, signature):
         things = [self.selectables, self.enums, self.triggers]
@@ -1476,19 +1560,18 @@ class PostgreSQL:
                 continue
 
     def load_deps_all(self):
-        def get_related_for_item(item, att):
-            related = [self.get_dependency_by_signature(_) for _ in getattr(item, att)]
-            return [item.signature] + [
-                _ for d in related for _ in get_related_for_item(d, att)
-            ]
-
-        for k, x in self.selectables.items():
-            d_all = get_related_for_item(x, "dependent_on")[1:]
-            d_all.sort()
-            x.dependent_on_all = d_all
-            d_all = get_related_for_item(x, "dependents")[1:]
-            d_all.sort()
-            x.dependents_all = d_all
+        # everything get_dependency_by_signature can find, with the same
+        # precedence
+        objects = {**self.triggers, **self.enums, **self.selectables}
+        closure = DependencyClosure(objects)
+        self.dependency_closure = closure
+
+        # each selectable's dependent_on_all/dependents_all is built from
+        # this when first used
+        for x in self.selectables.values():
+            x._dependency_closure = closure
+            x.dependent_on_all = None
+            x.dependents_all = None
 
     def dependency_order(
         self,
@@ -1625,6 +1708,11 @@ class PostgreSQL:
                     can_drop_generated=self.pg_version >= 13,
                     can_set_expression=self.pg_version >= 17,
                     comment=c.column_comment,
+                    # only marked on inheritance children: a partition's
+                    # columns are all inherited, but never listed
+                    is_inherited=bool(
+                        c.is_inherited and f.parent_table and not f.partition_def
+                    ),
                 )
                 for c in clist
                 if c.position_number
@@ -1656,13 +1744,6 @@ class PostgreSQL:
             att = getattr(self, RELATIONTYPES[f.relationtype])
             att[s.quoted_full_name] = s
 
-        for k, t in self.tables.items():
-            if t.is_inheritance_child_table:
-                parent_table = self.tables[t.parent_table]
-                for cname, c in t.columns.items():
-                    if cname in parent_table.columns:
-                        c.is_inherited = True
-
         self.relations = od()
         for x in (self.tables, self.views, self.materialized_views):
             self.relations.update(x)
@@ -1886,16 +1967,18 @@ class PostgreSQL:
         if schema and exclude_schema:
             raise ValueError("Can only have schema or exclude schema, not both")
 
-        def equal_to_schema(x):
-            return x.schema == schema
+        if schema:
+            matches = glob_matcher(schema_globs(schema))
 
-        def not_equal_to_exclude_schema(x):
-            return x.schema != exclude_schema
+            def comparator(x):
+                return matches(x.schema)
 
-        if schema:
-            comparator = equal_to_schema
         elif exclude_schema:
-            comparator = not_equal_to_exclude_schema
+            matches = glob_matcher(schema_globs(exclude_schema))
+
+            def comparator(x):
+                return not matches(x.schema)
+
         else:
             raise ValueError("schema or exclude_schema must be not be none")
 
@@ -1966,8 +2049,12 @@ class PostgreSQL:
     def exclude_schema(self, schema):
         self.filter_schema(exclude_schema=schema)
 
-    def as_definition(self):
-        """Return a SchemaDefinition: serializable, connection-free snapshot of this schema."""
+    def as_definition(self, closures=False):
+        """Return a SchemaDefinition: serializable, connection-free snapshot of this schema.
+
+        With closures, the dependency closures already worked out for this
+        schema are kept with it, to be saved by to_binary().
+        """
         from results.schemainspect.definition import SchemaDefinition
 
         def col_to_dict(c):
@@ -2025,7 +2112,7 @@ class PostgreSQL:
                 "dependent_on": list(f.dependent_on),
             }
 
-        return SchemaDefinition(
+        defn = SchemaDefinition(
             pg_version=self.pg_version,
             schemas={k: {"schema": v.schema} for k, v in self.schemas.items()},
             enums={
@@ -2065,6 +2152,7 @@ class PostgreSQL:
                     "fk_columns_local": v.fk_columns_local,
                     "fk_columns_foreign": v.fk_columns_foreign,
                     "fk_on_delete": v.fk_on_delete, "fk_on_update": v.fk_on_update,
+                    "index": v.index.name if v.index else None,
                 }
                 for k, v in self.constraints.items()
             },
@@ -2117,7 +2205,13 @@ class PostgreSQL:
             },
         )
 
+        if closures:
+            defn.closures = self.dependency_closure.saved()
+
+        return defn
+
     @classmethod
+    @gc_paused()
     def from_definition(cls, defn):
         """
         Construct a PostgreSQL inspector from a SchemaDefinition (no DB connection needed).
@@ -2280,6 +2374,12 @@ class PostgreSQL:
                 initially_deferred=v.get("initially_deferred", False),
                 is_not_valid=v.get("is_not_valid", False),
             )
+            if v.get("index"):
+                index_name = quoted_identifier(v["index"], schema=v["schema"])
+                index = inst.indexes.get(index_name)
+                if index is not None:
+                    index.constraint = c
+                    c.index = index
             if c.is_fk:
                 c.quoted_full_foreign_table_name = v.get("quoted_full_foreign_table_name")
                 c.fk_columns_local = v.get("fk_columns_local")
@@ -2381,6 +2481,9 @@ class PostgreSQL:
         # rebuild dependent_on_all / dependents_all
         inst.load_deps_all()
 
+        if defn.closures:
+            inst.dependency_closure.restore(defn.closures)
+
         return inst
 
     def __eq__(self, other):
@@ -2402,3 +2505,17 @@ class PostgreSQL:
             and self.collations == other.collations
             and self.rlspolicies == other.rlspolicies
         )
+
+    @property
+    def digest(self):
+        """
+        A digest of the whole schema, which changes whenever anything a diff
+        would pick up does. For checking whether a schema has changed since
+        some earlier digest, without keeping the schema itself around.
+        """
+        return digest_of(
+            {
+                att: {k: v.digest for k, v in getattr(self, att).items()}
+                for att in DIGESTED.split()
+            }
+        )
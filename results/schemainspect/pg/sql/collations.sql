@@ -18,6 +18,9 @@ from
 pg_collation c
 INNER JOIN pg_namespace n
     ON n.oid=c.collnamespace
-    -- SKIP_INTERNAL where nspname not in ('pg_internal', 'pg_catalog', 'information_schema', 'pg_toast')
+where true
+    -- SKIP_INTERNAL and nspname not in ('pg_internal', 'pg_catalog', 'information_schema', 'pg_toast')
     -- SKIP_INTERNAL and nspname not like 'pg_temp_%' and nspname not like 'pg_toast_temp_%'
+    -- INCLUDE_SCHEMAS and nspname like any(:include_schemas)
+    -- EXCLUDE_SCHEMAS and not nspname like any(:exclude_schemas)
 order by 2, 1
@@ -65,8 +65,11 @@ extension_oids as (
         indexdef as create_statement
     FROM
         pg_indexes
-        -- SKIP_INTERNAL where schemaname not in ('pg_catalog', 'information_schema', 'pg_toast')
+        where true
+        -- SKIP_INTERNAL and schemaname not in ('pg_catalog', 'information_schema', 'pg_toast')
 		-- SKIP_INTERNAL and schemaname not like 'pg_temp_%' and schemaname not like 'pg_toast_temp_%'
+        -- INCLUDE_SCHEMAS and schemaname like any(:include_schemas)
+        -- EXCLUDE_SCHEMAS and not schemaname like any(:exclude_schemas)
     order by
         schemaname, tablename, indexname
 )
@@ -163,4 +166,6 @@ from
     where contype in ('c', 'f', 'p', 'u', 'x')
   -- SKIP_INTERNAL and nspname not in ('pg_internal', 'pg_catalog', 'information_schema', 'pg_toast', 'pg_temp_1', 'pg_toast_temp_1')
   -- SKIP_INTERNAL and e.objid is null and er.objid is null and cr.objid is null
+  -- INCLUDE_SCHEMAS and nspname like any(:include_schemas)
+  -- EXCLUDE_SCHEMAS and not nspname like any(:exclude_schemas)
 order by 1, 3, 2;
@@ -26,4 +26,6 @@ WHERE t.typtype = 'd'
       AND n.nspname <> 'information_schema'
   AND pg_catalog.pg_type_is_visible(t.oid)
   and t.oid not in (select * from extension_oids)
+  -- INCLUDE_SCHEMAS and n.nspname like any(:include_schemas)
+  -- EXCLUDE_SCHEMAS and not n.nspname like any(:exclude_schemas)
 ORDER BY 1, 2;
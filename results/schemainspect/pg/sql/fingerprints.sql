@@ -0,0 +1,180 @@
+-- Row counts and summed xmins of each catalog that inspection reads from.
+-- Any DDL inserts, updates or deletes catalog rows, changing these.
+select
+    'pg_namespace' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_namespace
+union all
+select
+    'pg_class' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_class
+union all
+select
+    'pg_attribute' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_attribute
+union all
+select
+    'pg_attrdef' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_attrdef
+union all
+select
+    'pg_type' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_type
+union all
+select
+    'pg_enum' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_enum
+union all
+select
+    'pg_proc' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_proc
+union all
+select
+    'pg_language' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_language
+union all
+select
+    'pg_constraint' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_constraint
+union all
+select
+    'pg_index' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_index
+union all
+select
+    'pg_opclass' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_opclass
+union all
+select
+    'pg_am' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_am
+union all
+select
+    'pg_trigger' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_trigger
+union all
+select
+    'pg_rewrite' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_rewrite
+union all
+select
+    'pg_depend' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_depend
+union all
+select
+    'pg_description' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_description
+union all
+select
+    'pg_collation' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_collation
+union all
+select
+    'pg_extension' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_extension
+union all
+select
+    'pg_policy' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_policy
+union all
+select
+    'pg_inherits' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_inherits
+union all
+select
+    'pg_sequence' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_sequence
+union all
+select
+    'pg_partitioned_table' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_partitioned_table
+union all
+select
+    'pg_foreign_table' as catalog,
+    count(*) as rows,
+    coalesce(sum(xmin::text::bigint), 0)::bigint as xmins
+from
+    pg_catalog.pg_foreign_table
+union all
+-- Owners and privileges are shown by role name, so renaming a role changes
+-- them too. pg_authid itself is only readable by superusers, so roles are
+-- fingerprinted by a hash of their oids and names instead of by xmins.
+select
+    'pg_authid' as catalog,
+    count(*) as rows,
+    coalesce(
+        (
+            'x' || left(
+                md5(string_agg(oid::text || ':' || rolname, ',' order by oid)), 15
+            )
+        )::bit(60)::bigint,
+        0
+    ) as xmins
+from
+    pg_catalog.pg_roles
+order by 1;
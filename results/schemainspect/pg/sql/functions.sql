@@ -140,6 +140,8 @@ routines as (
       -- SKIP_INTERNAL and schema not like 'pg_temp_%' and schema not like 'pg_toast_temp_%'
       -- SKIP_INTERNAL and e.objid is null
       -- SKIP_INTERNAL and p.external_language not in ('C', 'INTERNAL')
+      -- INCLUDE_SCHEMAS and schema like any(:include_schemas)
+      -- EXCLUDE_SCHEMAS and not schema like any(:exclude_schemas)
     ),
 unnested as (
     select
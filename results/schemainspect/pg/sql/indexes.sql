@@ -65,6 +65,8 @@ WHERE
       -- SKIP_INTERNAL and nspname not in ('pg_catalog', 'information_schema', 'pg_toast')
       -- SKIP_INTERNAL and nspname not like 'pg_temp_%' and nspname not like 'pg_toast_temp_%'
       -- SKIP_INTERNAL and e.objid is null and er.objid is null
+      -- INCLUDE_SCHEMAS and nspname like any(:include_schemas)
+      -- EXCLUDE_SCHEMAS and not nspname like any(:exclude_schemas)
 )
 select * ,
 index_columns[1\:key_column_count] as key_columns,
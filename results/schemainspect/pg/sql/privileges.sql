@@ -13,4 +13,6 @@ where grantee != (
 )
 -- SKIP_INTERNAL and table_schema not in ('pg_internal', 'pg_catalog', 'information_schema', 'pg_toast')
 -- SKIP_INTERNAL and table_schema not like 'pg_temp_%' and table_schema not like 'pg_toast_temp_%'
+-- INCLUDE_SCHEMAS and table_schema like any(:include_schemas)
+-- EXCLUDE_SCHEMAS and not table_schema like any(:exclude_schemas)
 order by schema, name, user;
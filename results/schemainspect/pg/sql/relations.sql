@@ -67,6 +67,8 @@ r as (
     -- SKIP_INTERNAL and (e.objid is null)
     -- SKIP_INTERNAL and n.nspname not in ('pg_catalog', 'information_schema', 'pg_toast')
     -- SKIP_INTERNAL and n.nspname not like 'pg_temp_%' and n.nspname not like 'pg_toast_temp_%'
+    -- INCLUDE_SCHEMAS and n.nspname like any(:include_schemas)
+    -- EXCLUDE_SCHEMAS and not n.nspname like any(:exclude_schemas)
 )
 select
     r.relationtype,
@@ -76,6 +78,7 @@ select
     a.attnum as position_number,
     a.attname as attname,
     a.attnotnull as not_null,
+    a.attinhcount > 0 as is_inherited,
     a.atttypid::regtype AS datatype,
     a.attidentity != '' as is_identity,
     a.attidentity = 'a' as is_identity_always,
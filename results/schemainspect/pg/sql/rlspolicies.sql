@@ -24,5 +24,8 @@ from
   pg_policy p
   join pg_class c ON c.oid = p.polrelid
   JOIN pg_namespace n ON n.oid = c.relnamespace
+where true
+  -- INCLUDE_SCHEMAS and n.nspname like any(:include_schemas)
+  -- EXCLUDE_SCHEMAS and not n.nspname like any(:exclude_schemas)
 order by
   2, 1
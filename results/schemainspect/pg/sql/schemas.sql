@@ -12,7 +12,10 @@ from
     pg_catalog.pg_namespace
     left outer join extension_oids e
     	on e.objid = oid
--- SKIP_INTERNAL where nspname not in ('pg_internal', 'pg_catalog', 'information_schema', 'pg_toast')
+where true
+-- SKIP_INTERNAL and nspname not in ('pg_internal', 'pg_catalog', 'information_schema', 'pg_toast')
 -- SKIP_INTERNAL and nspname not like 'pg_temp_%' and nspname not like 'pg_toast_temp_%'
 -- SKIP_INTERNAL and e.objid is null
+-- INCLUDE_SCHEMAS and nspname like any(:include_schemas)
+-- EXCLUDE_SCHEMAS and not nspname like any(:exclude_schemas)
 order by 1;
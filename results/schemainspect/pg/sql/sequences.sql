@@ -45,6 +45,8 @@ where
     c.relkind = 'S'
     -- SKIP_INTERNAL and n.nspname not in ('pg_internal', 'pg_catalog', 'information_schema', 'pg_toast')
     -- SKIP_INTERNAL and n.nspname not like 'pg_temp_%' and n.nspname not like 'pg_toast_temp_%'
+    -- INCLUDE_SCHEMAS and n.nspname like any(:include_schemas)
+    -- EXCLUDE_SCHEMAS and not n.nspname like any(:exclude_schemas)
     and extension_objids.extension_objid is null
 )
 select
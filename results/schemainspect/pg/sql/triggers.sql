@@ -18,4 +18,6 @@ join pg_proc proc on proc.oid = tg.tgfoid
 join pg_namespace nspp on nspp.oid = proc.pronamespace
 where not tg.tgisinternal
 -- SKIP_INTERNAL and not tg.oid in (select e.objid from extension_oids e)
+-- INCLUDE_SCHEMAS and nsp.nspname like any(:include_schemas)
+-- EXCLUDE_SCHEMAS and not nsp.nspname like any(:exclude_schemas)
 order by schema, table_name, name;
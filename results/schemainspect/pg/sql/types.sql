@@ -53,4 +53,6 @@ AND pg_catalog.pg_type_is_visible ( t.oid )
 and t.typcategory = 'C'
 and t.oid not in (select objid 
 from extension_oids e where 'pg_type'::regclass = e.classid::regclass)
+-- INCLUDE_SCHEMAS and n.nspname like any(:include_schemas)
+-- EXCLUDE_SCHEMAS and not n.nspname like any(:exclude_schemas)
 ORDER BY 1, 2;
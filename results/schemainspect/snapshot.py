@@ -0,0 +1,143 @@
+"""
+Inspection snapshots: an inspected schema saved as a SchemaDefinition, along
+with a fingerprint of the system catalogs it was loaded from.
+
+Inspecting the same database again first checks the fingerprint (a single
+cheap query): if no catalog has changed, the schema is rebuilt from the
+snapshot without running any of the catalog queries.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from .definition import SchemaDefinition
+from .misc import resource_text, schema_globs
+from .pg import PostgreSQL
+
+SNAPSHOT_FORMAT = 1
+
+# catalogs that don't exist on older versions are in fingerprints.sql
+SNAPSHOT_MIN_VERSION = 10
+
+FINGERPRINTS_QUERY = resource_text("pg/sql/fingerprints.sql")
+
+IDENTITY_QUERY = """
+select
+    current_database() as dbname,
+    (select system_identifier from pg_control_system())::text as system_identifier
+"""
+
+
+def fetched(c, query):
+    c.execute(query)
+    return c.fetchall()
+
+
+def catalog_fingerprint(c):
+    """Row counts and summed xmins for each catalog that inspection reads.
+
+    Creating, altering or dropping anything changes catalog rows, and so
+    the fingerprint. (As do temporary tables, so a database with lots of
+    temporary table churn will rarely match its snapshot.)
+    """
+    rows = fetched(c, FINGERPRINTS_QUERY)
+    return {catalog: [count, xmins] for catalog, count, xmins in rows}
+
+
+def snapshot_path(c, snapshot_dir, schema=None, exclude_schema=None):
+    """Where the snapshot for the database that c is connected to goes (with
+    one snapshot per schema filter, as each holds only what was loaded)."""
+    dbname, system_identifier = fetched(c, IDENTITY_QUERY)[0]
+
+    key = f"{system_identifier}:{dbname}"
+
+    if schema or exclude_schema:
+        filters = [schema_globs(schema), schema_globs(exclude_schema)]
+        key += f":{json.dumps(filters)}"
+
+    key = key.encode()
+    name = hashlib.sha1(key).hexdigest()[:16]
+
+    return Path(snapshot_dir).expanduser() / f"{name}.json"
+
+
+def encoded_definition(definition):
+    """A definition as JSON-encodeable data: each category as a list of
+    [key, value] pairs, as some keys (privileges, policies) are tuples."""
+    d = definition.to_dict()
+
+    return {
+        k: [[key, value] for key, value in v.items()] if isinstance(v, dict) else v
+        for k, v in d.items()
+    }
+
+
+def decoded_definition(encoded):
+    d = {
+        k: {tuple(key) if isinstance(key, list) else key: value for key, value in v}
+        if isinstance(v, list)
+        else v
+        for k, v in encoded.items()
+    }
+
+    return SchemaDefinition.from_dict(d)
+
+
+def read_snapshot(path):
+    try:
+        snapshot = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        return None
+
+    return snapshot
+
+
+def write_snapshot(path, fingerprint, definition):
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    snapshot = dict(
+        format=SNAPSHOT_FORMAT,
+        fingerprint=fingerprint,
+        definition=encoded_definition(definition),
+    )
+
+    # written in full then moved into place, so concurrent runs never see a
+    # partial snapshot
+    fd, temp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+
+    with os.fdopen(fd, "w") as f:
+        json.dump(snapshot, f)
+
+    os.replace(temp, path)
+
+
+def inspect_with_snapshot(c, snapshot_dir, prefetch=None, **filters):
+    """Inspect the database c is connected to, reusing the snapshot saved in
+    snapshot_dir if its catalogs haven't changed since, and saving a fresh
+    one if they have."""
+    pg_version = c.connection.info.server_version // 10000
+
+    if pg_version < SNAPSHOT_MIN_VERSION:
+        return PostgreSQL(c, prefetch=prefetch, **filters)
+
+    path = snapshot_path(c, snapshot_dir, **filters)
+
+    # taken before inspecting, so changes made during inspection show up as a
+    # mismatch next time, rather than being missed
+    fingerprint = catalog_fingerprint(c)
+
+    snapshot = read_snapshot(path)
+
+    if snapshot and snapshot["fingerprint"] == fingerprint:
+        return PostgreSQL.from_definition(decoded_definition(snapshot["definition"]))
+
+    inspected = PostgreSQL(c, prefetch=prefetch, **filters)
+    write_snapshot(path, fingerprint, inspected.as_definition())
+
+    return inspected
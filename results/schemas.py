@@ -14,6 +14,8 @@ class Schemas:
         create_extensions_only=False,
         ignore_extension_versions=False,
         with_privileges=False,
+        snapshot_dir=None,
+        parallel=True,
     ):
         from results.dbdiff import Migration
 
@@ -23,6 +25,8 @@ class Schemas:
             schema=schema,
             exclude_schema=exclude_schema,
             ignore_extension_versions=ignore_extension_versions,
+            snapshot_dir=snapshot_dir,
+            parallel=parallel,
         )
         m.set_safety(False)
 
@@ -0,0 +1,218 @@
+"""
+Tests for the asyncio database API.
+No live DB required — fake async pool/connection/cursor objects stand in for
+psycopg.
+"""
+import asyncio
+from collections import namedtuple
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from results import asyncdb
+from results.asyncdb import AsyncTransaction, adb
+
+Column = namedtuple("Column", "name type_code")
+
+
+class FakeAsyncCursor:
+    def __init__(self, data):
+        self.data = data
+        self.executed = []
+        self.description = None
+
+    async def execute(self, query, params=None):
+        self.executed.append((query, params))
+        self.description = [Column("n", 23)]
+
+    async def fetchall(self):
+        return list(self.data)
+
+
+class FakeAsyncConnection:
+    def __init__(self, data):
+        self.cursors = []
+        self.data = data
+
+    @asynccontextmanager
+    async def cursor(self):
+        c = FakeAsyncCursor(self.data)
+        self.cursors.append(c)
+        yield c
+
+
+class FakeAsyncPool:
+    def __init__(self, data):
+        self.conn = FakeAsyncConnection(data)
+        self.closed = False
+        self.checkouts = 0
+
+    @asynccontextmanager
+    async def connection(self):
+        self.checkouts += 1
+        yield self.conn
+
+    async def close(self):
+        self.closed = True
+
+
+def make_transaction(data=((1,), (2,))):
+    t = AsyncTransaction()
+    t.c = FakeAsyncCursor(list(data))
+    return t
+
+
+def fake_db(data=((1,),)):
+    db = adb("postgresql:///example")
+    db.opened = 0
+    pool = FakeAsyncPool(list(data))
+
+    async def _open_pool():
+        db.opened += 1
+        await asyncio.sleep(0)
+        return pool
+
+    db._open_pool = _open_pool
+    return db, pool
+
+
+class TestAsyncTransaction:
+    def test_colon_params_rewritten(self):
+        t = make_transaction()
+        rows = asyncio.run(t.q("select :x, '100%'", x=1))
+        (query, params), = t.c.executed
+        assert "%(x)s" in query
+        assert "100%%" in query
+        assert params == {"x": 1}
+        assert list(rows) == [(1,), (2,)]
+        assert rows.column_info == {"n": "int4"}
+
+    def test_colon_params_can_be_disabled(self):
+        t = make_transaction()
+        asyncio.run(t.q("select :x", dict(x=1), colon_bind_params=False))
+        (query, _), = t.c.executed
+        assert ":x" in query
+
+    def test_paging(self):
+        t = make_transaction(data=[(i,) for i in range(11)])
+        rows = asyncio.run(t.q("select n from t", paging=dict(order_by="n")))
+        (query, _), = t.c.executed
+        assert "unpaged_table" in query
+        assert rows.paging.has_next
+        assert len(rows) == 10
+
+    def test_empty_query(self):
+        t = make_transaction()
+        assert asyncio.run(t.q("  ")) is None
+        with pytest.raises(ValueError):
+            asyncio.run(t.q("", fail_on_empty=True))
+
+
+class FakeAsyncIndexCursor(FakeAsyncCursor):
+    connection = SimpleNamespace(info=SimpleNamespace(host="h", port=1, dbname="d"))
+
+    def __init__(self, indexes):
+        super().__init__([(1,)])
+        self.indexes = indexes
+
+    async def fetchall(self):
+        query, params = self.executed[-1]
+        if "pg_attribute" in query:
+            return [("id", 1)]
+        if "pg_index" in query:
+            return self.indexes
+        return list(self.data)
+
+
+class TestAsyncRequireIndex:
+    @pytest.fixture(autouse=True)
+    def no_known_indexes(self, monkeypatch):
+        monkeypatch.setattr(asyncdb, "known_keyset_indexes", set())
+
+    def q(self, indexes):
+        t = AsyncTransaction()
+        t.c = FakeAsyncIndexCursor(indexes)
+        paging = dict(order_by="id", require_index=True)
+        return asyncio.run(t.q("select * from t where a = :a", a=1, paging=paging))
+
+    def test_matching_index(self):
+        assert list(self.q([([1], [0])])) == [(1,)]
+
+    def test_no_matching_index(self):
+        with pytest.raises(ValueError, match="No index"):
+            self.q([([2], [0])])
+
+
+class FailingPool:
+    def __init__(self, url, reconnect_failed, fail_by, **kwargs):
+        self.reconnect_failed = reconnect_failed
+        self.fail_by = fail_by
+        self.closed = False
+        FailingPool.last = self
+
+    async def open(self, wait=False):
+        if self.fail_by == "raising":
+            raise OSError("refused")
+        self.reconnect_failed(self)
+        await asyncio.sleep(10)
+
+    async def close(self):
+        self.closed = True
+
+
+class TestAsyncPoolOpening:
+    @pytest.mark.parametrize("fail_by", ["raising", "reconnect_failed"])
+    def test_failed_pool_closed(self, monkeypatch, fail_by):
+        def pool(*args, **kwargs):
+            return FailingPool(*args, fail_by=fail_by, **kwargs)
+
+        monkeypatch.setattr(asyncdb, "AsyncConnectionPool", pool)
+
+        with pytest.raises((OSError, ValueError)):
+            asyncio.run(adb("postgresql:///example")._open_pool())
+
+        assert FailingPool.last.closed
+
+
+class TestAsyncDatabase:
+    def test_url_scheme(self):
+        assert adb("postgres:///x").url.startswith("postgresql://")
+
+    def test_query_via_getattr(self):
+        async def run():
+            db, pool = fake_db()
+            rows = await db.q("select 1")
+            assert list(rows) == [(1,)]
+            assert pool.checkouts == 1
+
+        asyncio.run(run())
+
+    def test_pages_via_getattr(self):
+        async def run():
+            db, pool = fake_db()
+            pages = [p async for p in db.pages("select n", paging=dict(order_by="n"))]
+            assert [list(p) for p in pages] == [[(1,)]]
+            assert pool.checkouts == 1
+
+        asyncio.run(run())
+
+    def test_pool_opened_once_under_concurrency(self):
+        async def run():
+            db, pool = fake_db()
+            await asyncio.gather(*[db.q("select 1") for _ in range(20)])
+            assert db.opened == 1
+            assert pool.checkouts == 20
+
+        asyncio.run(run())
+
+    def test_context_manager_closes_pool(self):
+        async def run():
+            db, pool = fake_db()
+            async with db:
+                async with db.t() as t:
+                    await t.q("select 1")
+            assert pool.closed
+            assert db.pool is None
+
+        asyncio.run(run())
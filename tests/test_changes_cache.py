@@ -0,0 +1,96 @@
+"""
+Tests for Changes sharing its sorted selectables and their differences
+across categories. No live DB required.
+"""
+import pytest
+
+from results.dbdiff import Migration, changes
+from results.dbdiff.changes import Changes
+from results.schemainspect import NullInspector, PostgreSQL, SchemaDefinition
+
+
+def column(name, dbtype="integer"):
+    return {
+        "name": name,
+        "dbtype": dbtype,
+        "dbtypestr": dbtype,
+        "not_null": False,
+        "default": None,
+        "is_enum": False,
+    }
+
+
+def make_inspector():
+    """A table, and a view selecting from it."""
+    t, v = '"public"."t"', '"public"."v"'
+
+    def selectable(name, relationtype, **kwargs):
+        return {
+            "name": name,
+            "schema": "public",
+            "relationtype": relationtype,
+            "columns": {"id": column("id")},
+            "persistence": "p",
+            **kwargs,
+        }
+
+    return PostgreSQL.from_definition(
+        SchemaDefinition(
+            pg_version=16,
+            schemas={'"public"': {"schema": "public"}},
+            tables={t: selectable("t", "r")},
+            views={
+                v: selectable(
+                    "v", "v", definition=" SELECT id FROM t;", dependent_on=[t]
+                )
+            },
+        )
+    )
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    calls = []
+    original = changes.get_selectable_differences
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(changes, "get_selectable_differences", counting)
+    return calls
+
+
+class TestChangesCache:
+    def inspectors(self):
+        return NullInspector(), make_inspector()
+
+    def test_differences_once_per_kind(self, counted):
+        m = Migration(None, make_inspector())
+        m.add_all_changes_ordered()
+
+        # all selectables, functions, and views etc
+        assert len(counted) == 3
+        assert "create table" in m.sql
+        assert "create or replace view" in m.sql
+
+    def test_same_output_as_uncached(self, counted):
+        i_from, i_target = self.inspectors()
+
+        cached = Changes(i_from, i_target)
+        first = cached.non_function_non_table_selectable_creations()
+        assert cached.non_function_non_table_selectable_creations() == first
+
+        calls = len(counted)
+        fresh = Changes(i_from, i_target).non_function_non_table_selectable_creations()
+        assert fresh == first
+        assert len(counted) == calls + 1
+
+    def test_replaced_inspector_not_cached(self):
+        i_from, i_target = self.inspectors()
+
+        c = Changes(i_from, i_target)
+        assert c.tables_only_selectables()
+
+        c.i_from = i_target
+        assert not c.tables_only_selectables()
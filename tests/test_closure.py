@@ -0,0 +1,119 @@
+"""
+Tests for the transitive closure of dependencies (dependent_on_all and
+dependents_all). No live DB required.
+"""
+from collections import OrderedDict as od
+
+from results.schemainspect.closure import (
+    DependencyClosure,
+    bit_indices,
+    strongly_connected,
+)
+from results.schemainspect.pg.obj import PROPS, InspectedSelectable, PostgreSQL
+
+
+def make_inspector(deps):
+    """deps maps each view name to the names it selects from."""
+    inspector = PostgreSQL.__new__(PostgreSQL)
+
+    for prop in PROPS.split():
+        setattr(inspector, prop, od())
+
+    def sig(name):
+        return f'"public"."{name}"'
+
+    for name in deps:
+        inspector.selectables[sig(name)] = InspectedSelectable(
+            name=name, schema="public", columns=od(), relationtype="v"
+        )
+
+    for name, dependent_on in deps.items():
+        for d in dependent_on:
+            inspector.selectables[sig(name)].dependent_on.append(sig(d))
+
+            if sig(d) in inspector.selectables:
+                inspector.selectables[sig(d)].dependents.append(sig(name))
+
+    inspector.load_deps_all()
+    return inspector
+
+
+def names(signatures):
+    return [s.split(".")[1].strip('"') for s in signatures]
+
+
+class TestLoadDepsAll:
+    def test_chain(self):
+        inspector = make_inspector({"a": [], "b": ["a"], "c": ["b"], "d": ["c"]})
+        d = inspector.selectables['"public"."d"']
+        a = inspector.selectables['"public"."a"']
+
+        assert names(d.dependent_on_all) == ["a", "b", "c"]
+        assert names(d.dependents_all) == []
+        assert names(a.dependents_all) == ["b", "c", "d"]
+
+    def test_diamond_listed_once(self):
+        inspector = make_inspector(
+            {"a": [], "b": ["a"], "c": ["a"], "d": ["b", "c"], "e": ["d"]}
+        )
+
+        assert names(inspector.selectables['"public"."e"'].dependent_on_all) == [
+            "a",
+            "b",
+            "c",
+            "d",
+        ]
+        assert names(inspector.selectables['"public"."a"'].dependents_all) == [
+            "b",
+            "c",
+            "d",
+            "e",
+        ]
+
+    def test_unknown_dependencies_left_out(self):
+        inspector = make_inspector({"a": ["elsewhere"], "b": ["a"]})
+        assert names(inspector.selectables['"public"."b"'].dependent_on_all) == ["a"]
+
+    def test_deep_chain(self):
+        length = 5000
+        deps = {f"v{i:05d}": [f"v{i - 1:05d}"] if i else [] for i in range(length)}
+        inspector = make_inspector(deps)
+
+        last = inspector.selectables[f'"public"."v{length - 1:05d}"']
+        assert len(last.dependent_on_all) == length - 1
+
+    def test_set_explicitly(self):
+        inspector = make_inspector({"a": [], "b": ["a"]})
+        b = inspector.selectables['"public"."b"']
+
+        b.dependent_on_all = ["x"]
+        assert b.dependent_on_all == ["x"]
+
+
+class TestClosure:
+    def test_cycle(self):
+        objects = {
+            k: InspectedSelectable(name=k, schema="s", columns=od()) for k in "abc"
+        }
+        objects["a"].dependent_on = ["b"]
+        objects["b"].dependent_on = ["c"]
+        objects["c"].dependent_on = ["a"]
+
+        closure = DependencyClosure(objects)
+
+        for k in "abc":
+            assert closure.related(k, "dependent_on") == sorted(set("abc") - {k})
+
+        assert closure.related("missing", "dependent_on") == []
+
+    def test_strongly_connected(self):
+        edges = [[1], [2], [1, 3], []]
+        components = [sorted(c) for c in strongly_connected(edges)]
+
+        # everything a component can reach comes before it
+        assert components == [[3], [1, 2], [0]]
+
+    def test_bit_indices(self):
+        assert bit_indices(0) == []
+        assert bit_indices(0b101001) == [0, 3, 5]
+        assert bit_indices(1 << 500) == [500]
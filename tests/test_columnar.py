@@ -0,0 +1,141 @@
+"""
+Tests for the column-oriented Columns result container.
+No live DB required.
+"""
+from array import array
+
+import pytest
+
+from results.columnar import Columns, columnar_rows
+from results.database import Transaction
+from results.rows import Rows
+
+
+def make_rows():
+    rows = Rows([(1, 0.5, "a", None), (2, 1.5, "b", 7), (3, 2.5, "c", None)])
+    rows.column_info = {"n": "int4", "f": "float8", "s": "text", "maybe": "int4"}
+    return rows
+
+
+class TestColumnsArray:
+    def cols(self):
+        return make_rows().to_columns(use_numpy=False)
+
+    def test_packing(self):
+        c = self.cols()
+        assert isinstance(c["n"], array)
+        assert c["n"].typecode == "i"
+        assert isinstance(c["f"], array)
+        # text and nullable columns stay as lists
+        assert c["s"] == ["a", "b", "c"]
+        assert c["maybe"] == [None, 7, None]
+
+    def test_keeps_column_info(self):
+        c = self.cols()
+        assert c.column_info == make_rows().column_info
+        assert c.keys() == ["n", "f", "s", "maybe"]
+
+    def test_len_and_row_access(self):
+        c = self.cols()
+        assert len(c) == 3
+        assert c[1] == (2, 1.5, "b", 7)
+        assert list(c)[0] == (1, 0.5, "a", None)
+
+    def test_unknown_column(self):
+        with pytest.raises(ValueError):
+            self.cols()["nope"]
+
+    def test_aggregates(self):
+        c = self.cols()
+        assert c.sum("n") == 6
+        assert c.mean("f") == 1.5
+        assert c.min("s") == "a"
+        assert c.max("n") == 3
+        # nulls are ignored, as in SQL
+        assert c.count("maybe") == 1
+        assert c.sum("maybe") == 7
+
+    def test_filter(self):
+        c = self.cols()
+        filtered = c.filter([True, False, True])
+        assert filtered["n"].tolist() == [1, 3]
+        assert filtered["s"] == ["a", "c"]
+        assert filtered.column_info == c.column_info
+
+    def test_filter_wrong_length(self):
+        with pytest.raises(ValueError):
+            self.cols().filter([True])
+
+    def test_where(self):
+        assert self.cols().where("n", lambda n: n > 1)["s"] == ["b", "c"]
+
+    def test_round_trip_to_rows(self):
+        rows = self.cols().to_rows()
+        assert list(rows) == list(make_rows())
+        assert rows.column_info == make_rows().column_info
+
+    def test_empty(self):
+        rows = Rows([])
+        rows.column_info = {"n": "int4"}
+        c = rows.to_columns(use_numpy=False)
+        assert len(c) == 0
+        assert c.mean("n") is None
+
+
+class TestColumnsNumpy:
+    def cols(self):
+        pytest.importorskip("numpy")
+        return make_rows().to_columns(use_numpy=True)
+
+    def test_packing(self):
+        c = self.cols()
+        assert str(c["n"].dtype) == "int32"
+        assert str(c["f"].dtype) == "float64"
+        assert c["maybe"] == [None, 7, None]
+
+    def test_vectorized_filter(self):
+        c = self.cols()
+        filtered = c.filter(c["n"] >= 2)
+        assert filtered["n"].tolist() == [2, 3]
+        assert filtered["s"] == ["b", "c"]
+
+    def test_aggregates_are_python_values(self):
+        c = self.cols()
+        assert c.sum("n") == 6
+        assert type(c.sum("n")) is int
+        assert c.mean("f") == 1.5
+
+    def test_to_rows_unwraps_numpy_scalars(self):
+        rows = self.cols().to_rows()
+        assert type(rows[0][0]) is int
+        assert list(rows) == list(make_rows())
+
+
+class Description:
+    def __init__(self, name):
+        self.name = name
+
+
+class TestDuplicateNames:
+    def test_from_rows(self):
+        rows = Rows([(1, 2)])
+        # as from select a.id, b.id
+        rows.column_info = {"id": "int4"}
+
+        with pytest.raises(ValueError):
+            rows.to_columns(use_numpy=False)
+
+    def test_columnar_rows(self):
+        rows = Rows([])
+        rows.column_info = {"id": "int4"}
+        rows.paging = None
+
+        with pytest.raises(ValueError, match="id"):
+            columnar_rows(rows, [Description("id"), Description("id")])
+
+        c = columnar_rows(rows, [Description("id")])
+        assert c.keys() == ["id"]
+
+    def test_stream(self):
+        with pytest.raises(ValueError):
+            Transaction().q("select 1", stream=True, columnar=True)
@@ -0,0 +1,126 @@
+"""
+Tests for fetching the catalog queries all at once (pipeline mode, or
+several connections sharing a snapshot). No live DB required.
+"""
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from results.schemainspect import get_inspector
+from results.schemainspect.concurrent import on_connections, pipelined
+from results.schemainspect.pg.obj import PostgreSQL
+
+QUERIES = [f"select {i} as n" for i in range(10)]
+
+
+class FakeCursor:
+    def __init__(self, log=None):
+        self.log = log if log is not None else []
+        self.closed = False
+
+    def execute(self, query):
+        self.log.append(query)
+        self.n = int(query.split()[1]) if query.startswith("select") else None
+        self.description = [SimpleNamespace(name="n")]
+
+    def fetchall(self):
+        return [(self.n,)]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cursors = []
+        self.pipelines = 0
+
+    @contextmanager
+    def pipeline(self):
+        self.pipelines += 1
+        yield
+
+    def cursor(self):
+        curs = FakeCursor()
+        self.cursors.append(curs)
+        return curs
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.logs = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def t(self):
+        log = []
+
+        with self.lock:
+            self.logs.append(log)
+
+        t = SimpleNamespace(c=FakeCursor(log), ex=log.append)
+        yield t
+
+
+class TestPrefetched:
+    def make_inspector(self, prefetched):
+        inspector = object.__new__(PostgreSQL)
+        inspector.connection_type = "psycopg3"
+        inspector.c = FakeCursor()
+        inspector.prefetched = prefetched
+        return inspector
+
+    def test_prefetched_results_used_once(self):
+        inspector = self.make_inspector({"select 1 as n": ["prefetched"]})
+
+        assert inspector.execute("select 1 as n") == ["prefetched"]
+        assert inspector.c.log == []
+
+        assert inspector.execute("select 1 as n") == [{"n": 1}]
+        assert inspector.c.log == ["select 1 as n"]
+
+    def test_not_prefetched(self):
+        inspector = self.make_inspector({})
+        assert inspector.execute("select 2 as n")[0].n == 2
+
+
+class TestPipelined:
+    def test_one_pipeline(self):
+        conn = FakeConnection()
+        fetched = pipelined(SimpleNamespace(connection=conn))(QUERIES)
+
+        assert conn.pipelines == 1
+        assert [fetched[q][0].n for q in QUERIES] == list(range(10))
+        assert all(curs.closed for curs in conn.cursors)
+
+
+class TestOnConnections:
+    def test_all_queries_shared_snapshot(self):
+        db = FakeDatabase()
+        fetched = on_connections(db, "00000003-1", workers=3)(QUERIES)
+
+        assert [fetched[q][0].n for q in QUERIES] == list(range(10))
+        assert 1 <= len(db.logs) <= 3
+
+        run = []
+
+        for log in db.logs:
+            assert log[:2] == [
+                "set transaction isolation level repeatable read",
+                "set transaction snapshot '00000003-1'",
+            ]
+            run += log[2:]
+
+        assert sorted(run) == sorted(QUERIES)
+
+    def test_no_more_workers_than_queries(self):
+        db = FakeDatabase()
+        on_connections(db, "1", workers=8)(QUERIES[:2])
+        assert len(db.logs) <= 2
+
+
+def test_workers_need_a_database():
+    with pytest.raises(ValueError):
+        get_inspector(FakeCursor(), workers=2)
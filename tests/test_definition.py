@@ -3,7 +3,7 @@ Tests for SchemaDefinition serialization and the from_definition() constructor.
 
 These tests are purely unit tests — no live DB required.
 They verify that:
-  - SchemaDefinition round-trips cleanly through JSON and YAML
+  - SchemaDefinition round-trips cleanly through JSON, YAML and the binary format
   - PostgreSQL.from_definition() reconstructs inspected objects faithfully
   - The reconstructed inspector can be diffed via Migration
   - add_all_changes_ordered() produces the same logical changes as add_all_changes()
@@ -138,6 +138,114 @@ class TestSchemaDefinitionRoundTrip:
         assert "tables" in parsed
 
 
+# ---------------------------------------------------------------------------
+# The binary format
+# ---------------------------------------------------------------------------
+
+class TestBinaryDefinition:
+    def test_roundtrip(self):
+        defn = make_simple_definition()
+        defn.privileges = {
+            ("table", '"public"."users"', "select", "bob"): {
+                "object_type": "table", "schema": "public", "name": "users",
+                "privilege": "select", "target_user": "bob",
+            }
+        }
+        defn2 = SchemaDefinition.from_binary(defn.to_binary())
+        assert defn == defn2
+        assert list(defn2.privileges) == [
+            ("table", '"public"."users"', "select", "bob")
+        ]
+
+    def test_gzip(self):
+        defn = make_simple_definition()
+        data = defn.to_binary(compression="gzip")
+        assert SchemaDefinition.from_binary(data) == defn
+
+    def test_zstd(self):
+        pytest.importorskip("zstandard")
+        defn = make_simple_definition()
+        data = defn.to_binary(compression="zstd")
+        assert SchemaDefinition.from_binary(data) == defn
+
+    def test_strings_shared(self):
+        defn2 = SchemaDefinition.from_binary(make_simple_definition().to_binary())
+        (t,) = defn2.tables.values()
+        (v,) = defn2.views.values()
+        assert t["schema"] is v["schema"]
+
+    def test_closures_saved(self):
+        defn = make_simple_definition()
+        defn2 = SchemaDefinition.from_binary(defn.to_binary())
+        assert defn2.closures["signatures"]
+
+        insp = PostgreSQL.from_definition(defn2)
+        assert set(insp.dependency_closure.closures) == {"dependent_on", "dependents"}
+
+        expected = PostgreSQL.from_definition(defn)
+        for k, x in insp.selectables.items():
+            assert x.dependent_on_all == expected.selectables[k].dependent_on_all
+            assert x.dependents_all == expected.selectables[k].dependents_all
+        assert insp.views['"public"."active_users"'].dependent_on_all == [
+            '"public"."users"'
+        ]
+
+    def test_inspector_closures_reused(self, monkeypatch):
+        insp = PostgreSQL.from_definition(make_simple_definition())
+        defn = insp.as_definition(closures=True)
+        assert make_simple_definition().closures is None
+
+        def from_definition(defn):
+            raise AssertionError("closures worked out again")
+
+        monkeypatch.setattr(PostgreSQL, "from_definition", from_definition)
+        defn2 = SchemaDefinition.from_binary(defn.to_binary())
+        assert defn2.closures == insp.dependency_closure.saved()
+
+    def test_without_closures(self):
+        data = make_simple_definition().to_binary(closures=False)
+        assert SchemaDefinition.from_binary(data).closures is None
+
+    def test_not_binary(self):
+        with pytest.raises(ValueError):
+            SchemaDefinition.from_binary(make_simple_definition().to_json().encode())
+
+    def test_unknown_compression(self):
+        with pytest.raises(ValueError):
+            make_simple_definition().to_binary(compression="lz4")
+
+    def test_dbdiff_loads_binary(self, tmp_path):
+        from click.testing import CliRunner
+
+        from results.command import cli, load_schema
+
+        defn = make_simple_definition()
+        binary = tmp_path / "snapshot.bin"
+        binary.write_bytes(defn.to_binary(compression="gzip"))
+        text = tmp_path / "schema.json"
+        text.write_text(defn.to_json())
+
+        assert load_schema(str(binary)) == defn
+
+        result = CliRunner().invoke(cli, ["dbdiff", str(binary), str(text)])
+        assert result.exit_code == 0
+        assert result.output == ""
+
+    def test_dump(self, tmp_path):
+        from click.testing import CliRunner
+
+        from results.command import cli
+
+        text = tmp_path / "schema.json"
+        text.write_text(make_simple_definition().to_json())
+        binary = tmp_path / "snapshot.bin"
+
+        result = CliRunner().invoke(cli, ["dump", str(text), str(binary)])
+        assert result.exit_code == 0
+        defn = SchemaDefinition.from_binary(binary.read_bytes())
+        assert defn == make_simple_definition()
+
+
 # ---------------------------------------------------------------------------
 # PostgreSQL.from_definition() reconstruction tests
 # ---------------------------------------------------------------------------
@@ -432,3 +540,29 @@ class TestDefinitionAsDiffSource:
         result = defn.schemadiff_as_statements(defn)
         assert isinstance(result, Statements)
         assert not result  # identical — no changes
+
+
+class TestConstraintIndexFromDefinition:
+    def test_constraint_linked_to_its_index(self):
+        defn = make_simple_definition()
+        defn.indexes['"public"."users_pkey"'] = {
+            "name": "users_pkey", "schema": "public", "table_name": "users",
+            "definition": "CREATE UNIQUE INDEX users_pkey ON public.users USING btree (id)",
+            "key_columns": [1], "index_columns": [1], "included_columns": [],
+            "key_options": [0], "num_att": 1, "is_unique": True, "is_pk": True,
+            "is_exclusion": False, "is_immediate": True, "is_clustered": False,
+            "key_collations": [0], "key_expressions": None,
+            "partial_predicate": None, "algorithm": "btree",
+        }
+        defn.constraints['"public"."users"."users_pkey"'] = {
+            "name": "users_pkey", "schema": "public", "constraint_type": "PRIMARY KEY",
+            "table_name": "users", "definition": "PRIMARY KEY (id)",
+            "is_fk": False, "index": "users_pkey",
+        }
+        insp = PostgreSQL.from_definition(defn)
+
+        c = insp.constraints['"public"."users"."users_pkey"']
+        assert c.index is insp.indexes['"public"."users_pkey"']
+        assert c.index.constraint is c
+        assert "using index" in c.create_statement
+        assert insp.as_definition().constraints['"public"."users"."users_pkey"']["index"] == "users_pkey"
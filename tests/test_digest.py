@@ -0,0 +1,181 @@
+"""
+Tests for the digests inspected objects are compared by, and the digest of a
+whole schema. No live DB required.
+"""
+from collections import OrderedDict as od
+
+from click.testing import CliRunner
+
+from results.command import cli
+from results.dbdiff.util import differences
+from results.schemainspect import PostgreSQL, SchemaDefinition
+from results.schemainspect.inspected import ColumnInfo, digest_of
+from results.schemainspect.pg.obj import InspectedIndex, InspectedSelectable
+
+
+def column(name, **kwargs):
+    return ColumnInfo(
+        name=name, dbtype="integer", dbtypestr="integer", pytype=int, **kwargs
+    )
+
+
+def table(*columns, **kwargs):
+    return InspectedSelectable(
+        name="t",
+        schema="public",
+        relationtype="r",
+        columns=od((c.name, c) for c in columns),
+        **kwargs,
+    )
+
+
+def definition(*column_names):
+    return SchemaDefinition(
+        pg_version=16,
+        schemas={'"public"': {"schema": "public"}},
+        tables={
+            '"public"."t"': {
+                "name": "t",
+                "schema": "public",
+                "relationtype": "r",
+                "persistence": "p",
+                "columns": {
+                    c: {
+                        "name": c,
+                        "dbtype": "integer",
+                        "dbtypestr": "integer",
+                        "not_null": False,
+                        "default": None,
+                        "is_enum": False,
+                    }
+                    for c in column_names
+                },
+            }
+        },
+    )
+
+
+class TestDigest:
+    def test_equal_objects_equal_digests(self):
+        a = table(column("id", not_null=True), column("x"))
+        b = table(column("id", not_null=True), column("x"))
+
+        assert a is not b
+        assert a.digest == b.digest
+        assert a == b
+
+    def test_column_order_ignored(self):
+        a = table(column("id"), column("x"))
+        b = table(column("x"), column("id"))
+
+        assert a == b
+
+    def test_changed_field(self):
+        a = table(column("id"), column("x"))
+        b = table(column("id"), column("x", default="1"))
+
+        assert a.digest != b.digest
+        assert a != b
+        assert a.columns["x"] != b.columns["x"]
+        assert a.columns["id"] == b.columns["id"]
+
+    def test_different_classes(self):
+        index = InspectedIndex(
+            name="t",
+            schema="public",
+            table_name="t",
+            key_columns=[],
+            key_options=[],
+            num_att=0,
+            is_unique=False,
+            is_pk=False,
+            is_exclusion=False,
+            is_immediate=True,
+            is_clustered=False,
+            key_collations=[],
+            key_expressions=None,
+            partial_predicate=None,
+            algorithm="btree",
+        )
+
+        assert index != table()
+        assert table() != "t"
+
+    def test_stable(self):
+        assert digest_of({"b": [1, None], "a": (True, "x")}) == digest_of(
+            {"a": (True, "x"), "b": [1, None]}
+        )
+        assert digest_of([1]) != digest_of((1,))
+        assert digest_of({"x": 1}) == "068228cafe14af5927b21419cb0ed6ba"
+
+    def test_numbers_by_value(self):
+        assert digest_of(1) == digest_of(1.0) == digest_of(True)
+        assert digest_of({1: [0]}) == digest_of({True: [0.0]})
+        assert digest_of(1.5) != digest_of(1)
+        assert column("x", not_null=1) == column("x", not_null=True)
+        assert column("x", not_null=1).digest == column("x", not_null=True).digest
+
+    def test_ordered_dicts_in_order(self):
+        assert digest_of(od(a=1, b=2)) != digest_of(od(b=2, a=1))
+        assert digest_of(dict(a=1, b=2)) == digest_of(dict(b=2, a=1))
+
+    def test_compared_by_fields_until_digested(self):
+        a = table(column("id"), column("x"))
+        b = table(column("x"), column("id"))
+
+        assert a == b
+        assert a._digest is None and b._digest is None
+
+        a.digest, b.digest
+        # with both digests worked out, only they're compared
+        b.comment = "changed after digesting"
+        assert a == b
+
+    def test_differences_compares_once(self):
+        class Counted:
+            comparisons = 0
+
+            def __eq__(self, other):
+                Counted.comparisons += 1
+                return True
+
+        a = od((k, Counted()) for k in "xyz")
+        b = od((k, Counted()) for k in "xy")
+
+        added, removed, modified, unmodified = differences(a, b)
+
+        assert list(removed) == ["z"]
+        assert list(unmodified) == ["x", "y"]
+        assert Counted.comparisons == 2
+
+
+class TestSchemaDigest:
+    def test_round_trip(self):
+        i = PostgreSQL.from_definition(definition("id", "x"))
+        again = PostgreSQL.from_definition(
+            SchemaDefinition.from_json(i.as_definition().to_json())
+        )
+
+        assert i.digest == again.digest
+
+    def test_changes(self):
+        a = PostgreSQL.from_definition(definition("id", "x"))
+        b = PostgreSQL.from_definition(definition("id"))
+
+        assert a.digest != b.digest
+
+    def test_since(self, tmp_path):
+        path = tmp_path / "schema.json"
+        path.write_text(definition("id", "x").to_json())
+        expected = PostgreSQL.from_definition(definition("id", "x")).digest
+
+        runner = CliRunner()
+        result = runner.invoke(cli, ["digest", str(path)])
+        assert result.exit_code == 0
+        assert result.output.strip() == expected
+
+        result = runner.invoke(cli, ["digest", str(path), "--since", expected])
+        assert result.exit_code == 0
+
+        result = runner.invoke(cli, ["digest", str(path), "--since", "0" * 32])
+        assert result.exit_code == 2
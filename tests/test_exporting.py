@@ -0,0 +1,123 @@
+"""
+Tests for exporting query results to parquet/arrow/csv files.
+No live DB required — a fake stream stands in for the server-side cursor.
+"""
+import csv
+import datetime
+
+import pytest
+
+from results.exporting import Exporting
+from results.rows import Rows
+
+COLUMN_INFO = {"id": "int4", "name": "text", "doc": "jsonb", "amount": "numeric"}
+
+
+def batch(rows):
+    rows = Rows(rows)
+    rows.column_info = dict(COLUMN_INFO)
+    return rows
+
+
+class FakeTransaction(Exporting):
+    def __init__(self, batches):
+        self.batches = batches
+        self.stream_calls = []
+
+    def stream(self, query, params=None, empty=False, **kwargs):
+        self.stream_calls.append((query, params, kwargs))
+        if empty and not self.batches:
+            return iter([batch([])])
+        return iter(self.batches)
+
+
+BATCHES = [
+    batch([(1, "a", {"x": 1}, 1.5), (2, None, None, None)]),
+    batch([(3, "c", [1, 2], 3)]),
+]
+
+
+class TestExportCSV:
+    def test_writes_header_and_all_batches(self, tmp_path):
+        path = tmp_path / "out.csv"
+        t = FakeTransaction(BATCHES)
+        assert t.export("select 1", path, batch_size=2) == 3
+        assert t.stream_calls == [("select 1", None, dict(batch_size=2))]
+
+        with path.open() as f:
+            lines = list(csv.reader(f))
+
+        assert lines == [
+            ["id", "name", "doc", "amount"],
+            ["1", "a", '{"x": 1}', "1.5"],
+            ["2", "", "", ""],
+            ["3", "c", "[1, 2]", "3"],
+        ]
+
+    def test_empty_result_still_has_header(self, tmp_path):
+        path = tmp_path / "out.csv"
+        t = FakeTransaction([])
+        assert t.export("select 1", path) == 0
+        assert len(t.stream_calls) == 1
+        assert path.read_text().strip() == "id,name,doc,amount"
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            FakeTransaction(BATCHES).export("select 1", tmp_path / "out.xlsx")
+
+    def test_duplicate_names(self, tmp_path):
+        # as from select a.id, b.id
+        rows = Rows([(1, 2)])
+        rows.column_info = {"id": "int4"}
+
+        with pytest.raises(ValueError, match="unique"):
+            FakeTransaction([rows]).export("select 1", tmp_path / "out.csv")
+
+
+class TestExportArrow:
+    def setup_method(self):
+        self.pa = pytest.importorskip("pyarrow")
+
+    def test_to_arrow_types(self):
+        rows = batch([(1, "a", {"x": 1}, 1.5)])
+        table = rows.to_arrow()
+        assert [str(f.type) for f in table.schema] == [
+            "int32",
+            "string",
+            "string",
+            "string",
+        ]
+        assert table.to_pylist() == [dict(id=1, name="a", doc='{"x": 1}', amount="1.5")]
+
+    def test_duplicate_names(self):
+        rows = Rows([(1, 2)])
+        rows.column_info = {"id": "int4"}
+
+        with pytest.raises(ValueError, match="unique"):
+            rows.to_arrow()
+
+    def test_timestamps(self):
+        rows = Rows([(datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc),)])
+        rows.column_info = {"ts": "timestamptz"}
+        assert str(rows.to_arrow().schema.field("ts").type) == "timestamp[us, tz=UTC]"
+
+    def test_parquet(self, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = tmp_path / "out.parquet"
+        assert FakeTransaction(BATCHES).export("select 1", path) == 3
+        table = pq.read_table(path)
+        assert table.column_names == list(COLUMN_INFO)
+        assert table.column("id").to_pylist() == [1, 2, 3]
+
+    def test_arrow_ipc(self, tmp_path):
+        path = tmp_path / "out.data"
+        FakeTransaction(BATCHES).export("select 1", path, format="arrow")
+        table = self.pa.ipc.open_file(path).read_all()
+        assert table.num_rows == 3
+        assert table.column("doc").to_pylist() == ['{"x": 1}', None, "[1, 2]"]
+
+    def test_empty_parquet_keeps_schema(self, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = tmp_path / "out.parquet"
+        FakeTransaction([]).export("select 1", path)
+        assert pq.read_table(path).column_names == list(COLUMN_INFO)
@@ -531,6 +531,56 @@ class TestStatementsFromDifferences:
         ))
         assert stmts.index("drop b;") < stmts.index("drop a;")
 
+    def _linked(self, names, deps):
+        """Objects by name; deps maps each name to the names it depends on."""
+        class Obj:
+            def __init__(self, name):
+                self.create_statement = f"create {name};"
+                self.drop_statement = f"drop {name};"
+                self.dependent_on = list(deps.get(name, []))
+                self.dependents = [k for k, v in deps.items() if name in v]
+
+        return od((name, Obj(name)) for name in names)
+
+    def test_dependency_ordering_long_chain(self):
+        """Each object depends on the next, the reverse of the order given."""
+        names = [f"v{i:04d}" for i in range(3000)]
+        objs = self._linked(names, {a: [b] for a, b in zip(names, names[1:])})
+
+        creates = list(statements_from_differences(
+            objs, od(), od(), dependency_ordering=True
+        ))
+        assert creates == [f"create {n};" for n in reversed(names)]
+
+        drops = list(statements_from_differences(
+            od(), objs, od(), dependency_ordering=True, old=objs
+        ))
+        assert drops == [f"drop {n};" for n in names]
+
+    def test_dependency_ordering_keeps_given_order_when_free(self):
+        objs = self._linked(["a", "b", "c", "d"], {"a": ["c"]})
+        stmts = list(statements_from_differences(
+            objs, od(), od(), dependency_ordering=True
+        ))
+        # a waits for c, then goes on the next sweep
+        assert stmts == ["create b;", "create c;", "create d;", "create a;"]
+
+    def test_replaceable_created_once_after_dependencies(self):
+        objs = self._linked(["a", "b", "c"], {"a": ["c"], "b": ["c"]})
+        stmts = list(statements_from_differences(
+            od(), od(), objs,
+            replaceable={"a"},
+            creations_only=True,
+            dependency_ordering=True,
+            old=objs,
+        ))
+        assert stmts == ["create c;", "create b;", "create a;"]
+
+    def test_dependency_cycle(self):
+        objs = self._linked(["a", "b"], {"a": ["b"], "b": ["a"]})
+        with pytest.raises(ValueError):
+            statements_from_differences(objs, od(), od(), dependency_ordering=True)
+
 
 # ---------------------------------------------------------------------------
 # get_table_changes() — column add/remove
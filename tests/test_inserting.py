@@ -0,0 +1,322 @@
+"""
+Tests for insert/upsert SQL generation and the COPY bulk-load path.
+No live DB required — a fake cursor records what would be sent.
+"""
+import datetime
+from contextlib import contextmanager
+from decimal import Decimal
+
+import pytest
+
+from results.inserting import COPY_THRESHOLD, Inserting, can_copy_binary, key_renaming
+from results.rows import Rows
+
+
+class FakeCopy:
+    def __init__(self, cursor, statement):
+        self.cursor = cursor
+        self.statement = statement
+        self.types = None
+        self.rows = []
+
+    def set_types(self, types):
+        self.types = types
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cursor.rowcount = len(self.rows)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.transactions = []
+        self.autocommit = False
+
+    @contextmanager
+    def transaction(self):
+        self.transactions.append("begun")
+        yield
+        self.transactions.append("committed")
+
+
+class FakeCursor:
+    def __init__(self, table_columns):
+        self.table_columns = table_columns
+        self.connection = FakeConnection()
+        self.copies = []
+        self.executed = []
+        self.rowcount = -1
+        self.description = None
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+    def fetchall(self):
+        return list(self.table_columns.items())
+
+    def copy(self, statement):
+        c = FakeCopy(self, statement)
+        self.copies.append(c)
+        return c
+
+
+class FakeTransaction(Inserting):
+    def __init__(self, table_columns):
+        self.c = FakeCursor(table_columns)
+        self.qvalues_calls = []
+
+    def qvalues(self, query, values, fetch=True):
+        self.qvalues_calls.append((query, values))
+
+
+TABLE = {"id": 23, "name": 25, "doc": 3802}
+
+
+class TestKeyRenaming:
+    def test_safe_keys_unchanged(self):
+        assert key_renaming(["a", "b_1"]) == {}
+
+    def test_unsafe_keys_renamed_uniquely(self):
+        assert key_renaming(["A b", "ab"]) == {"A b": "ab", "ab": "ab_0"}
+
+
+class TestCanCopyBinary:
+    def test_plain_types(self):
+        assert can_copy_binary(["int4", "text"], (1, "x"))
+
+    def test_nulls_ok(self):
+        assert can_copy_binary(["int4", "text"], (None, None))
+
+    def test_string_into_int_needs_text(self):
+        assert not can_copy_binary(["int4"], ("5",))
+
+    def test_unknown_type_needs_text(self):
+        assert not can_copy_binary(["jsonb"], ('{"a": 1}',))
+
+    def test_bool_not_accepted_as_int(self):
+        assert not can_copy_binary(["int4"], (True,))
+
+    def test_datetime_not_accepted_as_date(self):
+        assert not can_copy_binary(["date"], (datetime.datetime(2020, 1, 1),))
+        assert can_copy_binary(["date"], (datetime.date(2020, 1, 1),))
+
+    def test_numeric_accepts_int_and_decimal(self):
+        assert can_copy_binary(["numeric", "numeric"], (1, Decimal("1.5")))
+
+    def test_float_into_numeric_needs_text(self):
+        assert not can_copy_binary(["numeric"], (1.5,))
+
+    @pytest.mark.parametrize(
+        "type_name, ok, too_big",
+        [
+            ("int2", 2**15 - 1, 70000),
+            ("int4", -(2**31), 2**31 + 5),
+            ("int8", 2**63 - 1, 2**63),
+        ],
+    )
+    def test_ints_in_range(self, type_name, ok, too_big):
+        assert can_copy_binary([type_name], (ok,))
+        assert not can_copy_binary([type_name], (too_big,))
+        assert not can_copy_binary([type_name], (-too_big - 1,))
+
+    def test_floats_in_range(self):
+        assert can_copy_binary(["float4"], (3.0e38,))
+        assert can_copy_binary(["float4", "float4"], (float("inf"), float("nan")))
+        assert not can_copy_binary(["float4"], (1e300,))
+        assert not can_copy_binary(["float4"], (10**39,))
+        assert can_copy_binary(["float8"], (1e300,))
+        assert not can_copy_binary(["float8"], (10**400,))
+
+    def test_timestamps_by_awareness(self):
+        naive = datetime.datetime(2020, 1, 1)
+        aware = naive.replace(tzinfo=datetime.timezone.utc)
+        assert can_copy_binary(["timestamp", "timestamptz"], (naive, aware))
+        assert not can_copy_binary(["timestamp"], (aware,))
+        assert not can_copy_binary(["timestamptz"], (naive,))
+
+    def test_bpchar_needs_text(self):
+        assert not can_copy_binary(["bpchar"], ("x",))
+
+
+class TestCopyIn:
+    def test_dicts_binary(self):
+        t = FakeTransaction(TABLE)
+        count = t.copy_in("things", [dict(id=1, name="a"), dict(id=2, name="b")])
+        assert count == 2
+        (copy,) = t.c.copies
+        assert "(format binary)" in copy.statement
+        assert "(id, name)" in copy.statement
+        assert copy.types == [23, 25]
+        assert copy.rows == [(1, "a"), (2, "b")]
+
+    def test_falls_back_to_text(self):
+        t = FakeTransaction(TABLE)
+        t.copy_in("things", [dict(id=1, doc='{"a": 1}')])
+        (copy,) = t.c.copies
+        assert "binary" not in copy.statement
+        assert copy.types is None
+
+    def test_later_rows_that_dont_fit_copied_as_text(self):
+        t = FakeTransaction(TABLE)
+        rows = [dict(id=1, name="a"), dict(id=2, name=None), dict(id="3", name="c")]
+        rows.append(dict(id=4, name="d"))
+        assert t.copy_in("things", rows) == 4
+
+        binary, text = t.c.copies
+        assert "(format binary)" in binary.statement
+        assert binary.rows == [(1, "a"), (2, None)]
+        assert "binary" not in text.statement
+        assert text.types is None
+        assert text.rows == [("3", "c"), (4, "d")]
+
+    def test_tuples_without_columns_use_whole_table(self):
+        t = FakeTransaction(TABLE)
+        t.copy_in("things", iter([(1, "a", None)]))
+        (copy,) = t.c.copies
+        assert "things from stdin" in copy.statement
+        assert copy.rows == [(1, "a", None)]
+
+    def test_rows_use_column_info(self):
+        rows = Rows([(1, "a"), (2, "b")])
+        rows.column_info = {"id": "int4", "name": "text"}
+        t = FakeTransaction(TABLE)
+        t.copy_in("things", rows)
+        (copy,) = t.c.copies
+        assert "(id, name)" in copy.statement
+        assert copy.rows == [(1, "a"), (2, "b")]
+
+    def test_empty(self):
+        t = FakeTransaction(TABLE)
+        assert t.copy_in("things", []) == 0
+        assert not t.c.copies
+
+    def test_unknown_column(self):
+        t = FakeTransaction(TABLE)
+        with pytest.raises(ValueError):
+            t.copy_in("things", [dict(nope=1)])
+
+
+class TestInsertUsesCopy:
+    def test_large_insert_without_returning_copies(self):
+        t = FakeTransaction(TABLE)
+        rows = [dict(id=i, name="x") for i in range(COPY_THRESHOLD + 1)]
+        assert t.insert("things", rows) is None
+        assert len(t.c.copies) == 1
+        assert not t.qvalues_calls
+
+    def test_small_insert_uses_values(self):
+        t = FakeTransaction(TABLE)
+        t.insert("things", [dict(id=1, name="x"), dict(id=2, name="y")])
+        assert not t.c.copies
+        (query, values), = t.qvalues_calls
+        assert "[values]" in query
+
+    def test_returning_uses_values(self):
+        t = FakeTransaction(TABLE)
+        rows = [dict(id=i, name="x") for i in range(COPY_THRESHOLD + 1)]
+        t.insert("things", rows, returning=True)
+        assert not t.c.copies
+        (query, _), = t.qvalues_calls
+        assert "returning *" in query
+
+
+class TestCopyUpsert:
+    def statements(self, t):
+        return [q for q, _ in t.c.executed]
+
+    def test_staged_upsert(self):
+        t = FakeTransaction(TABLE)
+        rows = [dict(id=i % 10, name=str(i)) for i in range(COPY_THRESHOLD + 1)]
+        assert t.insert("things", rows, upsert_on="id") is None
+        assert not t.qvalues_calls
+
+        create, ordinal, _, upsert, drop = self.statements(t)
+        assert "create temporary table results_staging_" in create
+        assert "on commit drop" in create
+        assert "select id, name from things" in create
+        assert "bigserial" in ordinal
+        assert "select distinct on (id, case when id is null then" in upsert
+        assert "__results_ordinal desc" in upsert
+        assert "on conflict (id)" in upsert
+        assert "name = excluded.name" in upsert
+        assert "drop table" in drop
+
+        (copy,) = t.c.copies
+        assert copy.statement.split()[1].startswith("results_staging_")
+        assert len(copy.rows) == COPY_THRESHOLD + 1
+
+    def test_update_cols_respected(self):
+        t = FakeTransaction(TABLE)
+        rows = [dict(id=i, name="x", doc=None) for i in range(COPY_THRESHOLD + 1)]
+        t.insert("things", rows, upsert_on="id", update_cols=["doc"])
+        upsert = self.statements(t)[3]
+        assert "doc = excluded.doc" in upsert
+        assert "name = excluded.name" not in upsert
+
+    def test_nothing_to_update_keeps_first(self):
+        t = FakeTransaction(TABLE)
+        rows = [dict(id=i) for i in range(COPY_THRESHOLD + 1)]
+        t.insert("things", rows, upsert_on="id")
+        upsert = self.statements(t)[3]
+        assert "do nothing" in upsert
+        assert "__results_ordinal asc" in upsert
+
+    def test_null_keys_not_merged(self):
+        t = FakeTransaction(TABLE)
+        rows = [dict(id=None, name=str(i)) for i in range(COPY_THRESHOLD + 1)]
+        t.copy_upsert("things", rows, ["id", "name"])
+        upsert = " ".join(self.statements(t)[3].split())
+        assert "first_value" not in upsert
+        nullkey = "case when id is null or name is null then __results_ordinal end"
+        assert f"distinct on (id, name, {nullkey})" in upsert
+        assert f"order by id, name, {nullkey}, __results_ordinal" in upsert
+
+    def test_later_columns_updated_earlier_kept(self):
+        t = FakeTransaction(TABLE)
+        rows = [dict(id=1, name=str(i), doc=None) for i in range(3)]
+        t.copy_upsert("things", rows, "id", update_cols=["doc"])
+        upsert = " ".join(self.statements(t)[3].split())
+        assert (
+            "select distinct on (id, case when id is null then __results_ordinal "
+            "end) id, first_value(name) over first_row as name, doc from"
+        ) in upsert
+        assert (
+            "window first_row as (partition by id, case when id is null then "
+            "__results_ordinal end order by __results_ordinal)"
+        ) in upsert
+        assert "__results_ordinal desc" in upsert
+
+    def test_part_of_the_callers_transaction(self):
+        t = FakeTransaction(TABLE)
+        t.copy_upsert("things", [dict(id=1)], "id")
+        # no transaction of its own, which would commit (or be a savepoint,
+        # released whatever happens after)
+        assert t.c.connection.transactions == []
+        assert "drop table if exists results_staging_" in self.statements(t)[-1]
+
+    def test_autocommit_in_its_own_transaction(self):
+        t = FakeTransaction(TABLE)
+        t.c.connection.autocommit = True
+        t.copy_upsert("things", [dict(id=1)], "id")
+        assert t.c.connection.transactions == ["begun", "committed"]
+        # dropped on commit
+        assert "drop table" not in self.statements(t)[-1]
+
+    def test_autocommit_failure_rolled_back(self):
+        t = FakeTransaction(TABLE)
+        t.c.connection.autocommit = True
+
+        def failing_copy(*args, **kwargs):
+            raise RuntimeError("copy failed")
+
+        t.copy_in = failing_copy
+
+        with pytest.raises(RuntimeError):
+            t.copy_upsert("things", [dict(id=1)], "id")
+
+        assert t.c.connection.transactions == ["begun"]
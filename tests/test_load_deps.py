@@ -0,0 +1,92 @@
+"""
+Tests for wiring up dependent_on / dependents from the dependency queries.
+No live DB required.
+"""
+import random
+from collections import OrderedDict as od
+from types import SimpleNamespace
+
+from results.schemainspect.pg.obj import (
+    PROPS,
+    InspectedSelectable,
+    PostgreSQL,
+    add_sorted,
+)
+
+
+def dep_row(name, name_dependent_on):
+    return SimpleNamespace(
+        name=name,
+        schema="public",
+        identity_arguments=None,
+        name_dependent_on=name_dependent_on,
+        schema_dependent_on="public",
+        identity_arguments_dependent_on=None,
+    )
+
+
+def sig(name):
+    return f'"public"."{name}"'
+
+
+def make_inspector(names, deps, fn_deps=()):
+    inspector = PostgreSQL.__new__(PostgreSQL)
+
+    for prop in PROPS.split():
+        setattr(inspector, prop, od())
+
+    for name in names:
+        inspector.selectables[sig(name)] = InspectedSelectable(
+            name=name, schema="public", columns=od()
+        )
+
+    inspector.DEPS_QUERY, inspector.FN_DEPS_QUERY = "deps", "fn_deps"
+    rows = {"deps": list(deps), "fn_deps": list(fn_deps)}
+    inspector.execute = rows.get
+    inspector.load_deps()
+    return inspector
+
+
+class TestLoadDeps:
+    def test_heavily_referenced(self):
+        views = [f"v{i:04d}" for i in range(2000)]
+        deps = [dep_row(v, "core") for v in views]
+        random.Random(0).shuffle(deps)
+
+        inspector = make_inspector(["core"] + views, deps)
+
+        assert inspector.selectables[sig("core")].dependents == [
+            sig(v) for v in views
+        ]
+        assert inspector.selectables[sig("v0001")].dependent_on == [sig("core")]
+
+    def test_fn_deps_merged_once(self):
+        inspector = make_inspector(
+            ["t", "f", "g"],
+            deps=[dep_row("t", "g")],
+            fn_deps=[dep_row("t", "f"), dep_row("t", "g"), dep_row("t", "f")],
+        )
+
+        assert inspector.selectables[sig("t")].dependent_on == [sig("f"), sig("g")]
+        assert inspector.selectables[sig("f")].dependents == [sig("t")]
+        assert inspector.selectables[sig("g")].dependents == [sig("t")]
+
+    def test_unloaded_dependencies(self):
+        inspector = make_inspector(
+            ["t"], deps=[dep_row("t", "elsewhere"), dep_row("gone", "t")]
+        )
+
+        assert inspector.selectables[sig("t")].dependent_on == [sig("elsewhere")]
+        assert inspector.selectables[sig("t")].dependents == []
+
+
+def test_add_sorted():
+    deps = ["a", "c"]
+
+    add_sorted(deps, ["d", "b", "c", "b"])
+    assert deps == ["a", "b", "c", "d"]
+
+    # nothing new, left as is
+    deps = ["z", "a"]
+    add_sorted(deps, ["a"])
+    assert deps == ["z", "a"]
@@ -0,0 +1,323 @@
+"""
+Tests for keyset paging, including pushdown into the query's own select.
+No live DB required.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from results import database, paging
+from results.database import Transaction
+from results.paging import index_matches, keyset_plan, paging_wrapped_query
+
+
+def paged(query, order_by="id", bookmark=None, pushdown=True, backwards=False):
+    q, params = paging_wrapped_query(
+        query, order_by, bookmark, 10, backwards, pushdown=pushdown
+    )
+    return " ".join(q.split()), params
+
+
+class TestPushdown:
+    def test_first_page(self):
+        q, params = paged("select id, name from t")
+        assert q == "select id, name from t order by id limit 11"
+        assert params == {"paging_id": None}
+
+    def test_bookmark_added_as_where(self):
+        q, params = paged("select id, name from t", bookmark=[5])
+        assert q == (
+            "select id, name from t where id > %(paging_id)s order by id limit 11"
+        )
+        assert params == {"paging_id": 5}
+
+    def test_existing_where_parenthesized(self):
+        q, _ = paged("select id from t where a = %(a)s or b like 'x%%'", bookmark=[5])
+        assert q == (
+            "select id from t where (a = %(a)s or b like 'x%%') "
+            "and id > %(paging_id)s order by id limit 11"
+        )
+
+    def test_existing_order_by_replaced(self):
+        q, _ = paged("select id from t where x order by name;")
+        assert q == "select id from t where x order by id limit 11"
+
+    def test_alias_and_expression(self):
+        q, _ = paged(
+            "select id, lower(name) as n from t",
+            order_by="n desc, id",
+            bookmark=["a", 1],
+        )
+        assert "where row(%(paging_n)s, id) > row(lower(name), %(paging_id)s)" in q
+        assert q.endswith("order by lower(name) desc, id limit 11")
+
+    def test_star(self):
+        q, _ = paged("select * from t", bookmark=[1])
+        assert q == 'select * from t where "id" > %(paging_id)s order by "id" limit 11'
+
+    def test_subquery_where_not_confused(self):
+        q, _ = paged(
+            "select id from t where id in (select id from u where x) order by 1",
+            bookmark=[1],
+        )
+        assert q.startswith("select id from t where (id in (select id from u where x))")
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            "select id from t group by id",
+            "select distinct id from t",
+            "select id from t union select id from u",
+            "select id from t limit 5",
+            "select id, row_number() over () from t window w as ()",
+            "select id, row_number() over (order by x) as n from t",
+            "select id from t order by sum(x) over (order by id)",
+            "select count(*) as id from t",
+            "select coalesce(max(x), 0) as id from t",
+            "select string_agg(x, ',' order by x) as s, 1 as id from t",
+            "select id, unnest(tags) as tag from t",
+            "select * from t join u using (id)",
+            "select id + %(x)s as id from t",
+            "select 1 as x",
+            "not sql at all",
+        ],
+    )
+    def test_falls_back_to_wrapping(self, query):
+        q, _ = paged(query, bookmark=[1])
+        assert "unpaged_table" in q
+
+    def test_subquery_aggregate_pushable(self):
+        q, _ = paged(
+            "select id, (select count(*) from u where u.t_id = t.id) as n from t",
+            bookmark=[1],
+        )
+        assert "unpaged_table" not in q
+
+    def test_trailing_comment(self):
+        q, _ = paged("select id from t where x = 1 -- note", bookmark=[1])
+        assert q == (
+            "select id from t where (x = 1) and id > %(paging_id)s "
+            "order by id limit 11"
+        )
+
+    def test_trailing_comment_before_order_by(self):
+        q, _ = paged("select id from t /* c */ -- note\norder by id", bookmark=[1])
+        assert q == (
+            "select id from t where id > %(paging_id)s order by id limit 11"
+        )
+
+    def test_trailing_param(self):
+        q, _ = paged("select id from t where a = %(a)s", bookmark=[1])
+        assert q == (
+            "select id from t where (a = %(a)s) and id > %(paging_id)s "
+            "order by id limit 11"
+        )
+
+    def test_trailing_colon_param(self):
+        q, params = database.prepared_query(
+            "select * from t where a = :a and b = :b",
+            dict(a=1, b=2),
+            paging=dict(order_by="id", bookmark=[1], pushdown=True),
+        )
+        assert " ".join(q.split()) == (
+            "select * from t where (a = %(a)s and b = %(b)s) "
+            'and "id" > %(paging_id)s order by "id" limit 11'
+        )
+        assert params["a"] == 1
+
+    def test_off_by_default(self):
+        q, _ = paged("select id from t", pushdown=False)
+        assert "unpaged_table" in q
+
+
+class TestKeysetPlanTable:
+    def test_plain_columns_of_one_table(self):
+        plan = keyset_plan("select id, name as n from s.t", ("id", "n"))
+        assert plan.table == "s.t"
+        assert plan.columns == ["id", "name"]
+
+    def test_expression_has_no_table(self):
+        plan = keyset_plan("select lower(name) as n from t", ("n",))
+        assert plan.table is None
+
+    def test_join_has_no_table(self):
+        plan = keyset_plan("select t.id from t join u on t.id = u.id", ("id",))
+        assert plan.table is None
+
+
+class TestIndexMatches:
+    def test_leading_columns(self):
+        assert index_matches([2, 3, 1], [0, 0, 0], [2, 3], [False, False])
+        assert not index_matches([3, 2], [0, 0], [2, 3], [False, False])
+        assert not index_matches([2], [0], [2, 3], [False, False])
+
+    def test_directions(self):
+        assert index_matches([1, 2], [0, 0], [1, 2], [True, True])
+        assert index_matches([1, 2], [0, 3], [1, 2], [False, True])
+        assert index_matches([1, 2], [0, 3], [1, 2], [True, False])
+        assert not index_matches([1, 2], [0, 0], [1, 2], [False, True])
+
+
+class IndexCursor:
+    def __init__(self, attnums, indexes):
+        self.attnums = attnums
+        self.indexes = indexes
+        self.executed = []
+        self.connection = SimpleNamespace(
+            info=SimpleNamespace(host="h", port=5432, dbname="d")
+        )
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+        self.last = query, params
+
+    def fetchall(self):
+        query, params = self.last
+        if "pg_attribute" in query:
+            return [(c, self.attnums[c]) for c in params["columns"]]
+        return self.indexes
+
+
+class TestRequireIndex:
+    @pytest.fixture(autouse=True)
+    def no_known_indexes(self, monkeypatch):
+        monkeypatch.setattr(database, "known_keyset_indexes", set())
+
+    def make_transaction(self, indexes):
+        t = Transaction()
+        t.c = IndexCursor({"id": 1, "name": 2}, indexes)
+        return t
+
+    def test_matching_index(self):
+        t = self.make_transaction([([1], [0])])
+        t.require_paging_index("select * from t", dict(order_by="id"))
+        t.require_paging_index("select * from t", dict(order_by="id"))
+        # the second check is remembered
+        assert len(t.c.executed) == 2
+
+    def test_backwards_uses_same_index(self):
+        t = self.make_transaction([([1], [0])])
+        t.require_paging_index("select * from t", dict(order_by="id", backwards=True))
+
+    def test_no_matching_index(self):
+        t = self.make_transaction([([2], [0])])
+        with pytest.raises(ValueError):
+            t.require_paging_index("select * from t", dict(order_by="id"))
+
+    def test_not_a_plain_column(self):
+        t = self.make_transaction([])
+        with pytest.raises(ValueError):
+            t.require_paging_index(
+                "select lower(name) as n from t", dict(order_by="n")
+            )
+
+
+class CountingCursor:
+    """Returns pages of (id, total) rows for counted queries, and a fixed
+    plan for EXPLAIN."""
+
+    def __init__(self, page, total=3, estimate=100):
+        self.page = page
+        self.total = total
+        self.estimate = estimate
+        self.executed = []
+        self.connection = SimpleNamespace(
+            info=SimpleNamespace(host="h", port=5432, dbname="d")
+        )
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+
+        if query.lstrip().startswith("explain"):
+            self.results = [([{"Plan": {"Plan Rows": self.estimate}}],)]
+            names = ["QUERY PLAN"]
+        elif "over ()" in query:
+            self.results = [(i, self.total) for i in self.page]
+            names = ["id", paging.COUNT_COLUMN]
+        elif "count(*)" in query:
+            self.results = [(self.total,)]
+            names = ["count"]
+        else:
+            self.results = [(i,) for i in self.page]
+            names = ["id"]
+
+        self.description = [SimpleNamespace(name=n, type_code=23) for n in names]
+
+    def fetchall(self):
+        return self.results
+
+
+class TestCount:
+    @pytest.fixture(autouse=True)
+    def no_cached_counts(self, monkeypatch):
+        monkeypatch.setattr(paging, "counts", {})
+
+    def q(self, cursor, **options):
+        t = Transaction()
+        t.c = cursor
+        return t.q("select id from t", paging=dict(order_by="id", **options))
+
+    def test_exact(self):
+        c = CountingCursor([1, 2])
+        rows = self.q(c, count="exact")
+
+        assert rows == [(1,), (2,)]
+        assert rows.keys() == ["id"]
+        assert rows.paging.total_count == 3
+        assert rows.paging.total_estimated is False
+        # counted in the same round trip
+        assert len(c.executed) == 1
+
+    def test_estimate(self):
+        c = CountingCursor([1, 2])
+        rows = self.q(c, count="estimate")
+
+        assert rows.paging.total_count == 100
+        assert rows.paging.total_estimated is True
+        assert "over ()" not in c.executed[0]
+
+    def test_cached(self):
+        self.q(CountingCursor([1, 2]), count="exact")
+
+        c = CountingCursor([3], total=4)
+        rows = self.q(c, count="exact", bookmark=[2])
+
+        assert rows == [(3,)]
+        assert rows.paging.total_count == 3
+        assert "over ()" not in c.executed[0]
+
+    def test_estimate_not_used_for_exact(self):
+        self.q(CountingCursor([1, 2]), count="estimate")
+        rows = self.q(CountingCursor([1, 2]), count="exact")
+
+        assert rows.paging.total_count == 3
+        # but an exact count is fine for an estimate
+        rows = self.q(CountingCursor([1, 2]), count="estimate")
+        assert rows.paging.total_count == 3
+        assert rows.paging.total_estimated is False
+
+    def test_ttl(self):
+        self.q(CountingCursor([1, 2]), count="exact", count_ttl=0)
+
+        rows = self.q(CountingCursor([1, 2], total=5), count="exact")
+        assert rows.paging.total_count == 5
+
+    def test_empty(self):
+        c = CountingCursor([])
+        assert self.q(c, count="exact").paging.total_count == 0
+        assert len(c.executed) == 1
+
+    def test_past_the_end(self):
+        c = CountingCursor([])
+        rows = self.q(c, count="exact", bookmark=[9])
+
+        assert rows.paging.total_count == 3
+        assert len(c.executed) == 2
+
+    def test_not_counted_by_default(self):
+        rows = self.q(CountingCursor([1]))
+        assert rows.paging.total_count is None
+
+    def test_bad_count(self):
+        with pytest.raises(ValueError):
+            self.q(CountingCursor([1]), count="roughly")
@@ -0,0 +1,183 @@
+"""
+Tests for parallel keyset-range paging.
+No live DB required — a fake database hands out fake transactions.
+"""
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from results.parallel import ParallelPages, range_condition, ranges, split_points
+
+
+class FakeTransaction:
+    def __init__(self, db):
+        self.db = db
+        self.executed = []
+
+    def ex(self, query):
+        self.executed.append(query)
+
+    def q(self, query, params=None, **kwargs):
+        if "pg_export_snapshot" in query:
+            return [("snap-1",)]
+        if "pg_stats" in query:
+            self.db.split_from = "histogram"
+            return [(self.db.histogram,)]
+        if "percentile_disc" in query:
+            self.db.split_from = "percentiles"
+            return [([30, 60],)]
+
+    def pages(self, query, params, paging):
+        self.db.scans.append((query, params, paging))
+        lower, upper = params["parallel_lower"], params["parallel_upper"]
+
+        if lower == self.db.fail_on:
+            raise RuntimeError("boom")
+
+        for page in range(2):
+            yield [(lower, upper, page)]
+
+
+class FakeDatabase(ParallelPages):
+    def __init__(self, histogram=None, fail_on="no"):
+        self.histogram = histogram
+        self.fail_on = fail_on
+        self.scans = []
+        self.transactions = []
+        self.split_from = None
+
+    @contextmanager
+    def t(self):
+        t = FakeTransaction(self)
+        self.transactions.append(t)
+        yield t
+
+
+class RowsTransaction(FakeTransaction):
+    """Pages through the ints in db.rows like Transaction.pages does,
+    keeping the bookmark in paging."""
+
+    def pages(self, query, params, paging):
+        lower, upper = params["parallel_lower"], params["parallel_upper"]
+        paging["bookmark"] = None
+
+        while True:
+            # let the other scans run, as a query would
+            time.sleep(0.001)
+            bookmark = paging["bookmark"]
+            page = [
+                x
+                for x in self.db.rows
+                if (lower is None or x >= lower)
+                and (upper is None or x < upper)
+                and (bookmark is None or x > bookmark)
+            ][: paging["per_page"]]
+
+            if not page:
+                return
+
+            yield page
+            paging["bookmark"] = page[-1]
+
+
+class RowsDatabase(FakeDatabase):
+    def __init__(self, rows):
+        super().__init__(histogram=rows)
+        self.rows = rows
+
+    @contextmanager
+    def t(self):
+        yield RowsTransaction(self)
+
+
+class TestSplitting:
+    def test_split_points(self):
+        assert split_points(list(range(101)), 4) == [25, 50, 75]
+        assert split_points([1, 2], 4) == [1, 2]
+        assert split_points([], 4) == []
+        assert split_points([1, 2, 3], 1) == []
+
+    def test_ranges(self):
+        assert ranges([10, 20]) == [(None, 10), (10, 20), (20, None)]
+        assert ranges([]) == [(None, None)]
+
+    def test_range_condition(self):
+        assert range_condition("id", None, None) == ""
+        assert range_condition("id", 1, None) == 'where "id" >= :parallel_lower'
+        assert range_condition("id", 1, 5) == (
+            'where "id" >= :parallel_lower and "id" < :parallel_upper'
+        )
+
+
+class TestParallelPages:
+    def test_all_ranges_scanned(self):
+        db = FakeDatabase(histogram=[str(i) for i in range(101)])
+        pages = list(
+            db.parallel_pages("select * from t", order_by="id", workers=4, per_page=5)
+        )
+        assert db.split_from == "histogram"
+        assert len(pages) == 8
+        assert {(p[0][0], p[0][1]) for p in pages} == {
+            (None, "25"),
+            ("25", "50"),
+            ("50", "75"),
+            ("75", None),
+        }
+        assert all(paging == dict(order_by="id", per_page=5) for *_, paging in db.scans)
+
+    def test_pages_in_order_within_range(self):
+        db = FakeDatabase(histogram=["1", "2", "3"])
+        pages = list(db.parallel_pages("select * from t", order_by="id", workers=2))
+        by_range = {}
+        for (lower, upper, page), in pages:
+            by_range.setdefault(lower, []).append(page)
+        assert all(p == [0, 1] for p in by_range.values())
+
+    def test_every_row_once(self):
+        db = RowsDatabase(list(range(200)))
+        pages = db.parallel_pages(
+            "select * from t", order_by="id", workers=4, per_page=7
+        )
+        rows = [x for page in pages for x in page]
+        assert sorted(rows) == db.rows
+
+    def test_histogram_with_params(self):
+        db = FakeDatabase(histogram=["1", "2", "3"])
+        query = "select * from t where a = :a"
+        list(db.parallel_pages(query, dict(a=1), order_by="id", workers=2))
+        assert db.split_from == "histogram"
+
+    def test_percentiles_for_expressions(self):
+        db = FakeDatabase()
+        list(db.parallel_pages("select a + b as x from t", order_by="x", workers=3))
+        assert db.split_from == "percentiles"
+        assert len(db.scans) == 3
+
+    def test_shared_snapshot(self):
+        db = FakeDatabase(histogram=["1", "2", "3"])
+        list(db.parallel_pages("select * from t", order_by="id", workers=2))
+        main, *workers = db.transactions
+        assert "repeatable read" in main.executed[0]
+        for t in workers:
+            assert t.executed[1] == "set transaction snapshot 'snap-1'"
+
+    def test_not_consistent(self):
+        db = FakeDatabase(histogram=["1", "2", "3"])
+        list(
+            db.parallel_pages(
+                "select * from t", order_by="id", workers=2, consistent=False
+            )
+        )
+        assert not any(t.executed for t in db.transactions)
+
+    def test_params_passed_to_each_range(self):
+        db = FakeDatabase(histogram=["1", "2", "3"])
+        query = "select * from t where a = :a"
+        list(db.parallel_pages(query, dict(a=1), order_by="id"))
+        assert all(params["a"] == 1 for _, params, _ in db.scans)
+
+    def test_worker_error_raised(self):
+        db = FakeDatabase(histogram=["1", "2", "3"], fail_on="2")
+        with pytest.raises(RuntimeError):
+            list(db.parallel_pages("select * from t", order_by="id", workers=2))
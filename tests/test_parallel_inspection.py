@@ -0,0 +1,63 @@
+"""
+Tests for inspecting both sides of a Migration at once. No live DB
+required: get_inspector is replaced by one that builds inspectors from
+definitions.
+"""
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from results.dbdiff import migra
+from results.dbdiff.migra import Migration
+from results.schemainspect import PostgreSQL, SchemaDefinition
+
+
+class FakeDatabase:
+    def __init__(self, name):
+        self.url = self.URL = name
+
+
+@pytest.fixture
+def inspections(monkeypatch):
+    inspected = []
+
+    def get_inspector(x, **kwargs):
+        inspected.append((x.url, threading.get_ident()))
+
+        if fake.barrier is not None:
+            # both sides must be inspecting at the same time to get past this
+            fake.barrier.wait()
+
+        return PostgreSQL.from_definition(SchemaDefinition(pg_version=16))
+
+    fake = SimpleNamespace(barrier=None)
+    monkeypatch.setattr(migra, "get_inspector", get_inspector)
+
+    return inspected, fake
+
+
+def test_both_sides_at_once(inspections):
+    inspected, fake = inspections
+    fake.barrier = threading.Barrier(2, timeout=5)
+
+    m = Migration(FakeDatabase("a"), FakeDatabase("b"))
+
+    assert sorted(url for url, _ in inspected) == ["a", "b"]
+    assert len({thread for _, thread in inspected}) == 2
+    assert m.changes.i_from is not m.changes.i_target
+
+
+def test_not_parallel(inspections):
+    inspected, _ = inspections
+    Migration(FakeDatabase("a"), FakeDatabase("b"), parallel=False)
+
+    assert [url for url, _ in inspected] == ["a", "b"]
+    assert {thread for _, thread in inspected} == {threading.get_ident()}
+
+
+def test_definitions_not_threaded(inspections):
+    inspected, _ = inspections
+    Migration(FakeDatabase("a"), SchemaDefinition(pg_version=16))
+
+    assert inspected == [("a", threading.get_ident())]
@@ -2,7 +2,8 @@
 Tests for SQL parameterization security and correctness.
 """
 import pytest
-from results.psyco import reformat_bind_params
+from results.database import Transaction, prepared_query, rewritten_query
+from results.psyco import compile_query, reformat_bind_params
 from results.paging import quoted
 
 
@@ -85,6 +86,44 @@ class TestReformatBindParams:
         assert "%(val)s" in result
 
 
+class TestCompileQuery:
+    def test_names_and_positions(self):
+        q = "select :a, 'x:y', :b::int, :a"
+        compiled = compile_query(q)
+        assert compiled.sql == "select %(a)s, 'x:y', %(b)s::int, %(a)s"
+        assert compiled.param_names == ["a", "b", "a"]
+        assert compiled.names == ["a", "b"]
+        assert [q[start:end] for start, end in compiled.positions] == [
+            ":a",
+            ":b",
+            ":a",
+        ]
+
+    def test_no_params(self):
+        compiled = compile_query("select 1::int, arr[1:2]")
+        assert compiled.sql == "select 1::int, arr[1:2]"
+        assert compiled.param_names == []
+
+    def test_unterminated_literal_runs_to_end(self):
+        assert reformat_bind_params("select ':a") == "select ':a"
+
+    def test_unclosed_dollar_quote_is_not_a_block(self):
+        assert reformat_bind_params("select $1, :a") == "select $1, %(a)s"
+
+    def test_name_must_start_lowercase_or_underscore(self):
+        assert reformat_bind_params("select :_a1") == "select %(_a1)s"
+        assert reformat_bind_params("select :1") == "select :1"
+
+    def test_non_ascii_neighbours(self):
+        assert reformat_bind_params("select ²:a") == "select ²:a"
+
+    def test_large_query(self):
+        q = " union all ".join(f"select :p{i}, '{i}:'::text" for i in range(5000))
+        compiled = compile_query(q)
+        assert len(compiled.param_names) == 5000
+        assert compiled.sql.count("%(p") == 5000
+
+
 class TestQuoted:
     def test_simple_column(self):
         assert quoted("id") == '"id"'
@@ -106,3 +145,60 @@ class TestQuoted:
         assert result == '"id"" DESC; DROP TABLE users; --"'
         # Critically: when psycopg sees this as an identifier it's harmless
         assert result.count('"') % 2 == 0  # balanced outer quotes + escaped internals
+
+
+class TestQueryCache:
+    def setup_method(self):
+        rewritten_query.cache_clear()
+
+    def test_rewritten_once(self):
+        for _ in range(3):
+            query, params = prepared_query("select :a, '5%'", dict(a=1))
+        assert query == "select %(a)s, '5%%'"
+        info = rewritten_query.cache_info()
+        assert info.misses == 1
+        assert info.hits == 2
+
+    def test_no_params_not_rewritten(self):
+        query, _ = prepared_query("select ':a'::text, :b", {})
+        assert query == "select ':a'::text, :b"
+
+    def test_cache_keyed_by_rewrite_mode(self):
+        a, _ = prepared_query("select :a", dict(a=1))
+        b, _ = prepared_query("select :a", dict(a=1), colon_bind_params=False)
+        assert a == "select %(a)s"
+        assert b == "select :a"
+
+    def test_paging_applied_after_cache(self):
+        query, params = prepared_query(
+            "select :a", dict(a=1), paging=dict(order_by="a", bookmark=[5])
+        )
+        assert "unpaged_table" in query
+        assert params["paging_a"] == 5
+
+
+class PrepareCursor:
+    def __init__(self):
+        self.executed = []
+        self.description = None
+
+    def execute(self, query, params=None, **kwargs):
+        self.executed.append(kwargs)
+
+
+class TestPrepare:
+    def make_transaction(self):
+        t = Transaction()
+        t.c = PrepareCursor()
+        return t
+
+    def test_default_leaves_it_to_psycopg(self):
+        t = self.make_transaction()
+        t.q("select 1")
+        assert t.c.executed == [{}]
+
+    def test_explicit_prepare(self):
+        t = self.make_transaction()
+        t.q("select :a", a=1, prepare=True)
+        t.q("select :a", a=1, prepare=False)
+        assert t.c.executed == [dict(prepare=True), dict(prepare=False)]
@@ -0,0 +1,121 @@
+"""
+Tests for pipeline-mode batches of queries.
+No live DB required — a fake connection records the pipeline and cursors.
+"""
+from collections import namedtuple
+
+import pytest
+
+from results.database import Transaction
+
+Column = namedtuple("Column", "name type_code")
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self.closed = False
+        self.result = None
+
+    def execute(self, query, params=None):
+        assert self.conn.in_pipeline
+        self.conn.sent.append((query, params))
+        if query.strip().startswith("select"):
+            self.description = [Column("n", 23)]
+            self.result = [(len(self.conn.sent),)]
+
+    def fetchall(self):
+        assert self.conn.synced
+        return self.result
+
+    def close(self):
+        self.closed = True
+
+
+class FakePipeline:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.in_pipeline = True
+        return self
+
+    def __exit__(self, *exc_info):
+        self.conn.in_pipeline = False
+        self.conn.synced = True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.in_pipeline = False
+        self.synced = False
+        self.sent = []
+        self.cursors = []
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def cursor(self):
+        c = FakeCursor(self)
+        self.cursors.append(c)
+        return c
+
+
+class MainCursor:
+    def __init__(self):
+        self.connection = FakeConnection()
+
+
+def make_transaction():
+    t = Transaction()
+    t.c = MainCursor()
+    return t
+
+
+class TestBatch:
+    def test_results_in_order(self):
+        t = make_transaction()
+        results = t.batch(["select 1", ("update x set y = :y", dict(y=2)), "select 3"])
+        assert [None if r is None else list(r) for r in results] == [
+            [(1,)],
+            None,
+            [(3,)],
+        ]
+        assert results[0].column_info == {"n": "int4"}
+
+    def test_params_rewritten(self):
+        t = make_transaction()
+        t.batch([("select :x, '5%'", dict(x=1))])
+        (query, params), = t.c.connection.sent
+        assert "%(x)s" in query
+        assert "5%%" in query
+        assert params == dict(x=1)
+
+    def test_cursors_closed(self):
+        t = make_transaction()
+        t.batch(["select 1", "select 2"])
+        assert all(c.closed for c in t.c.connection.cursors)
+
+
+class TestPipeline:
+    def test_results_available_after_block(self):
+        t = make_transaction()
+
+        with t.pipeline() as p:
+            p.q("select :a", a=1)
+            p.q("select :b", dict(b=2))
+            assert p.results is None
+
+        assert [list(r) for r in p.results] == [[(1,)], [(2,)]]
+
+    def test_error_in_block(self):
+        t = make_transaction()
+
+        with pytest.raises(RuntimeError):
+            with t.pipeline() as p:
+                p.q("select 1")
+                raise RuntimeError
+
+        assert p.results is None
+        assert all(c.closed for c in t.c.connection.cursors)
@@ -0,0 +1,141 @@
+"""
+Tests for connection pool configuration, per-process pools and stats.
+No live DB required — a fake pool class replaces psycopg_pool's.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from results import database
+from results.database import (
+    connection_check,
+    get_pool,
+    pool_check,
+    validated_pool_options,
+)
+
+URL = "postgresql:///example"
+
+
+class FakePool:
+    fail = False
+
+    def __init__(self, conninfo, open, configure, check, reconnect_failed, **options):
+        self.conninfo = conninfo
+        self.configure = configure
+        self.check = check
+        self.reconnect_failed = reconnect_failed
+        self.options = options
+        self.closed = False
+
+    def open(self):
+        if self.options["min_size"]:
+            if self.fail:
+                self.reconnect_failed(self)
+            else:
+                self.configure(None)
+
+    def close(self):
+        self.closed = True
+
+    def get_stats(self):
+        return dict(
+            pool_size=5, pool_available=2, requests_num=4, requests_wait_ms=10
+        )
+
+
+@pytest.fixture(autouse=True)
+def fake_pools(monkeypatch):
+    monkeypatch.setattr(database, "ConnectionPool", FakePool)
+    monkeypatch.setattr(database, "conns", {})
+    monkeypatch.setattr(database, "abandoned_pools", [])
+    monkeypatch.setattr(FakePool, "fail", False)
+
+
+class TestPoolOptions:
+    def test_defaults(self):
+        options = validated_pool_options()
+        assert options["min_size"] == 1
+        assert options["max_size"] == 1024
+        assert options["check"] == "always"
+
+    def test_unknown_option(self):
+        with pytest.raises(ValueError):
+            validated_pool_options(max_connections=5)
+
+    def test_database_validates_options(self):
+        with pytest.raises(ValueError):
+            database.db(URL, nope=1)
+
+    def test_check_policies(self):
+        assert pool_check("always") is connection_check
+        assert pool_check("never") is None
+        assert pool_check(print) is print
+        with pytest.raises(ValueError):
+            pool_check("sometimes")
+
+    def test_options_passed_to_pool(self):
+        pool = get_pool(URL, max_size=3, max_idle=5.0, check="never")
+        assert pool.options["max_size"] == 3
+        assert pool.options["max_idle"] == 5.0
+        assert pool.check is None
+
+
+class TestPools:
+    def test_shared_by_url_and_options(self):
+        assert get_pool(URL) is get_pool(URL)
+        assert get_pool(URL) is not get_pool(URL, max_size=2)
+
+    def test_failed_connection(self, monkeypatch):
+        monkeypatch.setattr(FakePool, "fail", True)
+        with pytest.raises(ValueError):
+            get_pool(URL)
+        assert not database.conns
+
+    def test_min_size_zero_does_not_wait(self):
+        assert get_pool(URL, min_size=0) is not None
+
+    def test_new_pool_after_fork(self, monkeypatch):
+        parent = get_pool(URL)
+        monkeypatch.setattr(database.os, "getpid", lambda: -1)
+        child = get_pool(URL)
+        assert child is not parent
+        assert not parent.closed
+        assert database.abandoned_pools == [parent]
+
+    def test_created_once_by_concurrent_threads(self, monkeypatch):
+        created = []
+
+        class SlowPool(FakePool):
+            def open(self):
+                created.append(self)
+                time.sleep(0.05)
+                super().open()
+
+        monkeypatch.setattr(database, "ConnectionPool", SlowPool)
+
+        with ThreadPoolExecutor(4) as executor:
+            pools = list(executor.map(lambda _: get_pool(URL), range(4)))
+
+        assert len(created) == 1
+        assert all(pool is created[0] for pool in pools)
+
+    def test_close_pool(self):
+        a = get_pool(URL)
+        b = get_pool(URL, max_size=2)
+        database.close_pool(URL)
+        assert a.closed and b.closed
+        assert not database.conns
+
+
+class TestPoolStats:
+    def test_not_created(self):
+        assert database.db(URL).pool_stats() is None
+
+    def test_stats(self):
+        get_pool(URL, max_size=7)
+        stats = database.db(URL, max_size=7).pool_stats()
+        assert stats["connections_in_use"] == 3
+        assert stats["requests_wait_ms_avg"] == 2.5
+        assert stats["pool_size"] == 5
@@ -0,0 +1,113 @@
+"""
+Tests for the dict and dataclass views of Rows.
+No live DB required.
+"""
+import dataclasses
+import json
+import sys
+
+import pytest
+
+from results.rows import DictRow, Rows, RowsView
+
+
+def make_rows():
+    rows = Rows([(1, "a"), (2, "b"), (3, "c")])
+    rows.column_info = {"n": "int4", "s": "text"}
+    return rows
+
+
+class TestDictList:
+    def test_is_a_list(self):
+        d = make_rows().d
+        assert type(d) is list
+        assert isinstance(d[0], DictRow)
+        assert d == make_rows().as_dicts()
+
+    def test_list_behaviour(self):
+        rows = make_rows()
+        assert json.loads(json.dumps(rows.d)) == [
+            {"n": 1, "s": "a"},
+            {"n": 2, "s": "b"},
+            {"n": 3, "s": "c"},
+        ]
+        assert rows.d + [{"n": 4}] == [*rows.d, {"n": 4}]
+
+    def test_after_mutation(self):
+        rows = make_rows()
+        rows.d
+        rows.insert(0, (0, "z"))
+        assert rows.d[0] == {"n": 0, "s": "z"}
+
+
+class TestLazyDictView:
+    def test_is_lazy(self):
+        calls = []
+        rows = make_rows()
+        d = RowsView(rows, lambda row: calls.append(row) or row)
+        assert not calls
+        assert d[1] == (2, "b")
+        assert calls == [(2, "b")]
+
+    def test_rows_are_dictrows(self):
+        d = make_rows().lazy_d
+        assert isinstance(d, RowsView)
+        assert isinstance(d[0], DictRow)
+
+    def test_sequence_behaviour(self):
+        d = make_rows().lazy_d
+        assert len(d) == 3
+        assert d[-1] == {"n": 3, "s": "c"}
+        assert d[:2] == [{"n": 1, "s": "a"}, {"n": 2, "s": "b"}]
+        assert [r["s"] for r in d] == ["a", "b", "c"]
+        assert d == make_rows().as_dicts()
+
+    def test_index_error(self):
+        with pytest.raises(IndexError):
+            make_rows().lazy_d[3]
+
+    def test_sees_changes_to_the_rows(self):
+        rows = make_rows()
+        d = rows.lazy_d
+        assert d[0] == {"n": 1, "s": "a"}
+        rows.insert(0, (0, "z"))
+        rows.append((4, "d"))
+        assert len(d) == 5
+        assert d[0] == {"n": 0, "s": "z"}
+        assert d[4] == {"n": 4, "s": "d"}
+
+
+class TestDataclassView:
+    def test_values(self):
+        dc = make_rows().dc
+        assert dc[0].n == 1
+        assert dc[2].s == "c"
+        assert dataclasses.asdict(dc[1]) == {"n": 2, "s": "b"}
+
+    def test_is_a_list(self):
+        assert type(make_rows().dc) is list
+        assert make_rows().lazy_dc[1] == make_rows().dc[1]
+
+    @pytest.mark.skipif(sys.version_info < (3, 10), reason="slots need 3.10")
+    def test_slotted(self):
+        row = make_rows().dc[0]
+        assert not hasattr(row, "__dict__")
+        with pytest.raises(AttributeError):
+            row.extra = True
+
+    def test_class_shared_between_calls(self):
+        assert type(make_rows().dc[0]) is type(make_rows().dc[1])
+
+    def test_class_per_column_set(self):
+        other = Rows([(1,)])
+        other.column_info = {"x": "int4"}
+        assert type(other.dc[0]) is not type(make_rows().dc[0])
+
+
+class TestColumnAccess:
+    def test_by_name(self):
+        assert make_rows()["s"] == ["a", "b", "c"]
+
+    def test_unknown(self):
+        with pytest.raises(ValueError):
+            make_rows()["nope"]
@@ -0,0 +1,116 @@
+"""
+Tests for schema filters (names or globs) applied in the catalog queries, and
+again after loading. No live DB required.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from results.schemainspect.misc import glob_as_like, glob_matcher, schema_globs
+from results.schemainspect.pg.obj import PROPS, PostgreSQL, like_any_array
+
+
+class RecordingCursor:
+    """Returns no rows for every query, but remembers them."""
+
+    def __init__(self):
+        self.queries = []
+        self.connection = SimpleNamespace(
+            pgconn=SimpleNamespace(server_version=160000)
+        )
+        self.description = []
+
+    def execute(self, query):
+        self.queries.append(query)
+
+    def fetchall(self):
+        return []
+
+
+def inspected_queries(**filters):
+    c = RecordingCursor()
+    PostgreSQL(c, **filters)
+    return c.queries
+
+
+def filter_lines(queries):
+    """The schema filters in effect (not commented out) across queries."""
+    return [
+        line.strip()
+        for q in queries
+        for line in q.splitlines()
+        if "like any(array[" in line and not line.strip().startswith("--")
+    ]
+
+
+class TestGlobs:
+    def test_schema_globs(self):
+        assert schema_globs(None) is None
+        assert schema_globs("public") == ["public"]
+        assert schema_globs(("a", "b*")) == ["a", "b*"]
+
+    def test_as_like(self):
+        assert glob_as_like("public") == "public"
+        assert glob_as_like("tenant_*") == "tenant\\_%"
+        assert glob_as_like("a?%\\") == "a_\\%\\\\"
+
+    def test_matcher(self):
+        matches = glob_matcher(["tenant_*", "p?blic"])
+
+        assert matches("tenant_1")
+        assert matches("tenant_")
+        assert matches("public")
+        assert not matches("tenants")
+        assert not matches("publics")
+        assert not matches("other")
+
+    def test_like_any_array(self):
+        assert like_any_array(["it's", "a:b*"]) == "array['it''s', 'a\\:b%']::text[]"
+        assert like_any_array(None) == "array[]::text[]"
+
+
+class TestFilteredQueries:
+    def test_unfiltered(self):
+        queries = inspected_queries()
+
+        assert not filter_lines(queries)
+        assert not any(":include_schemas" in q for q in queries)
+
+    def test_included(self):
+        lines = filter_lines(inspected_queries(schema=["public", "tenant_*"]))
+
+        assert len(lines) >= 12
+        for line in lines:
+            assert line.startswith("and ")
+            assert line.endswith("like any(array['public', 'tenant\\_%']::text[])")
+
+    def test_excluded(self):
+        lines = filter_lines(inspected_queries(exclude_schema="audit"))
+
+        assert len(lines) >= 12
+        assert all(line.startswith("and not ") for line in lines)
+
+    def test_not_both(self):
+        with pytest.raises(ValueError):
+            PostgreSQL(RecordingCursor(), schema="a", exclude_schema="b")
+
+
+class TestFilterSchema:
+    def make_inspector(self, *schemas):
+        inspector = PostgreSQL.__new__(PostgreSQL)
+
+        for prop in PROPS.split():
+            setattr(inspector, prop, {})
+
+        inspector.tables = {s: SimpleNamespace(schema=s) for s in schemas}
+        return inspector
+
+    def test_globs(self):
+        inspector = self.make_inspector("public", "tenant_1", "tenant_2", "other")
+        inspector.one_schema(["tenant_*", "public"])
+        assert sorted(inspector.tables) == ["public", "tenant_1", "tenant_2"]
+
+    def test_excluded_globs(self):
+        inspector = self.make_inspector("public", "tenant_1", "tenant_2", "other")
+        inspector.exclude_schema("tenant_?")
+        assert sorted(inspector.tables) == ["other", "public"]
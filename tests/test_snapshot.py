@@ -0,0 +1,130 @@
+"""
+Tests for inspection snapshots (reusing a saved SchemaDefinition while the
+catalogs are unchanged). No live DB required.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from results.schemainspect import SchemaDefinition, snapshot
+from results.schemainspect.pg.obj import PostgreSQL
+from results.schemainspect.snapshot import (
+    decoded_definition,
+    encoded_definition,
+    inspect_with_snapshot,
+)
+
+
+class CatalogCursor:
+    def __init__(self, fingerprint=None, server_version=160000):
+        self.fingerprint = fingerprint or [("pg_class", 10, 1234)]
+        self.connection = SimpleNamespace(
+            info=SimpleNamespace(server_version=server_version)
+        )
+
+    def execute(self, query):
+        self.last = query
+
+    def fetchall(self):
+        if "current_database" in self.last:
+            return [("db", "123")]
+        return self.fingerprint
+
+
+def make_definition():
+    return SchemaDefinition(
+        pg_version=16,
+        schemas={'"public"': {"schema": "public"}},
+        privileges={
+            ("table", '"public"."t"', "select", "bob"): {
+                "object_type": "table",
+                "schema": "public",
+                "name": "t",
+                "privilege": "select",
+                "target_user": "bob",
+            }
+        },
+    )
+
+
+class FakeInspector(PostgreSQL):
+    inspections = 0
+
+    def __init__(self, c, prefetch=None, **filters):
+        FakeInspector.inspections += 1
+
+    def as_definition(self):
+        return make_definition()
+
+
+@pytest.fixture
+def fake_inspector(monkeypatch):
+    FakeInspector.inspections = 0
+    monkeypatch.setattr(snapshot, "PostgreSQL", FakeInspector)
+
+
+class TestEncoding:
+    def test_tuple_keys_roundtrip(self):
+        d = make_definition()
+        assert decoded_definition(encoded_definition(d)) == d
+
+
+@pytest.mark.usefixtures("fake_inspector")
+class TestInspectWithSnapshot:
+    def test_saved_then_reused(self, tmp_path):
+        first = inspect_with_snapshot(CatalogCursor(), tmp_path)
+        assert isinstance(first, FakeInspector)
+        assert len(list(tmp_path.glob("*.json"))) == 1
+
+        second = inspect_with_snapshot(CatalogCursor(), tmp_path)
+        assert FakeInspector.inspections == 1
+        assert second.connection_type == "definition"
+        assert '"public"' in second.schemas
+        assert len(second.privileges) == 1
+
+    def test_changed_catalogs_reinspected(self, tmp_path):
+        inspect_with_snapshot(CatalogCursor(), tmp_path)
+        inspect_with_snapshot(
+            CatalogCursor(fingerprint=[("pg_class", 11, 1300)]), tmp_path
+        )
+        assert FakeInspector.inspections == 2
+
+        # and the fresh snapshot replaces the old one
+        inspect_with_snapshot(
+            CatalogCursor(fingerprint=[("pg_class", 11, 1300)]), tmp_path
+        )
+        assert FakeInspector.inspections == 2
+
+    def test_renamed_role_reinspected(self, tmp_path):
+        # owners and privileges name roles, so roles are fingerprinted too
+        assert "pg_roles" in snapshot.FINGERPRINTS_QUERY
+
+        roles = [("pg_authid", 16, 1)]
+        inspect_with_snapshot(CatalogCursor(fingerprint=roles), tmp_path)
+        renamed = [("pg_authid", 16, 2)]
+        inspect_with_snapshot(CatalogCursor(fingerprint=renamed), tmp_path)
+        assert FakeInspector.inspections == 2
+
+    def test_unreadable_snapshot_ignored(self, tmp_path):
+        inspect_with_snapshot(CatalogCursor(), tmp_path)
+
+        for path in tmp_path.glob("*.json"):
+            path.write_text("{not json")
+
+        inspect_with_snapshot(CatalogCursor(), tmp_path)
+        assert FakeInspector.inspections == 2
+
+    def test_old_servers_not_snapshotted(self, tmp_path):
+        inspect_with_snapshot(CatalogCursor(server_version=90600), tmp_path)
+        inspect_with_snapshot(CatalogCursor(server_version=90600), tmp_path)
+
+        assert FakeInspector.inspections == 2
+        assert not list(tmp_path.iterdir())
+
+    def test_filters_snapshotted_separately(self, tmp_path):
+        inspect_with_snapshot(CatalogCursor(), tmp_path)
+        inspect_with_snapshot(CatalogCursor(), tmp_path, schema="public")
+        inspect_with_snapshot(CatalogCursor(), tmp_path, schema=["public"])
+
+        assert FakeInspector.inspections == 2
+        assert len(list(tmp_path.glob("*.json"))) == 2
@@ -0,0 +1,175 @@
+"""
+Tests for the object-level statement graph (statement_graph()), and its
+batches of independent groups of statements. No live DB required.
+"""
+from collections import Counter
+
+import pytest
+
+from results.dbdiff import Migration
+from results.dbdiff.ordered import StatementGraph, ordered_changes
+from results.schemainspect import PostgreSQL, SchemaDefinition
+
+
+def column(name, dbtype="integer"):
+    return {
+        "name": name,
+        "dbtype": dbtype,
+        "dbtypestr": dbtype,
+        "not_null": False,
+        "default": None,
+        "is_enum": False,
+    }
+
+
+def sig(name):
+    return f'"public"."{name}"'
+
+
+def table(name, *columns, **kwargs):
+    return {
+        "name": name,
+        "schema": "public",
+        "relationtype": "r",
+        "columns": {c: column(c) for c in ("id", *columns)},
+        "persistence": "p",
+        **kwargs,
+    }
+
+
+def index(name, table_name):
+    return {
+        "name": name,
+        "schema": "public",
+        "table_name": table_name,
+        "definition": f"CREATE INDEX {name} ON public.{table_name} USING btree (id)",
+    }
+
+
+def constraint(name, table_name, **kwargs):
+    return {
+        "name": name,
+        "schema": "public",
+        "table_name": table_name,
+        "constraint_type": "UNIQUE",
+        "definition": "UNIQUE (id)",
+        **kwargs,
+    }
+
+
+def inspector(**kwargs):
+    return PostgreSQL.from_definition(
+        SchemaDefinition(
+            pg_version=16, schemas={'"public"': {"schema": "public"}}, **kwargs
+        )
+    )
+
+
+def make_target():
+    """Two tables, each indexed, one referencing the other, and a view."""
+    return inspector(
+        tables={sig("a"): table("a"), sig("b"): table("b", "a_id")},
+        views={
+            sig("v"): {
+                **table("v"),
+                "relationtype": "v",
+                "definition": " SELECT id FROM a;",
+                "dependent_on": [sig("a")],
+            }
+        },
+        indexes={
+            sig("a_i"): index("a_i", "a"),
+            sig("b_i"): index("b_i", "b"),
+        },
+        constraints={
+            '"public"."a"."a_key"': constraint("a_key", "a"),
+            '"public"."b"."b_fkey"': constraint(
+                "b_fkey",
+                "b",
+                constraint_type="FOREIGN KEY",
+                definition="FOREIGN KEY (a_id) REFERENCES a(id)",
+                is_fk=True,
+                quoted_full_foreign_table_name=sig("a"),
+                fk_columns_local=["a_id"],
+                fk_columns_foreign=["id"],
+            ),
+        },
+    )
+
+
+def batch_of(batches, fragment):
+    (found,) = {
+        n
+        for n, batch in enumerate(batches)
+        for group in batch
+        for statement in group
+        if fragment in statement
+    }
+    return found
+
+
+class TestStatementGraph:
+    def graph(self):
+        return Migration(inspector(), make_target()).statement_graph()
+
+    def test_same_statements_as_ordered_changes(self):
+        m = Migration(inspector(), make_target())
+        ordered = [s for group in ordered_changes(m.changes) for s in group]
+
+        assert Counter(self.graph().statements()) == Counter(ordered)
+
+    def test_independent_objects_batched_together(self):
+        batches = self.graph().batches()
+
+        assert batch_of(batches, 'create table "public"."a"') == batch_of(
+            batches, 'create table "public"."b"'
+        )
+        assert batch_of(batches, "INDEX a_i") == batch_of(batches, "INDEX b_i")
+        assert batch_of(batches, "INDEX a_i") > batch_of(
+            batches, 'create table "public"."a"'
+        )
+
+    def test_related_objects_ordered(self):
+        batches = self.graph().batches()
+
+        assert batch_of(batches, '"b_fkey"') > batch_of(batches, '"a_key"')
+        assert batch_of(batches, 'view "public"."v"') > batch_of(
+            batches, 'create table "public"."a"'
+        )
+
+    def test_drops_reversed(self):
+        m = Migration(make_target(), inspector())
+        batches = m.statement_graph().batches()
+
+        assert batch_of(batches, '"a_key"') > batch_of(batches, '"b_fkey"')
+        assert batch_of(batches, 'drop table "public"."a"') > batch_of(
+            batches, 'drop view if exists "public"."v"'
+        )
+
+    def test_by_object(self):
+        m = Migration(inspector(), make_target())
+        m.add_all_changes_ordered(by_object=True)
+
+        assert m.statements == self.graph().statements()
+
+
+class TestStatementGraphOrder:
+    def test_empty_groups_left_out(self):
+        graph = StatementGraph()
+        a = graph.add("a", ["a;"])
+        done = graph.add("a done", after=[a])
+        b = graph.add("b", ["b;"], after=[done])
+        c = graph.add("c", ["c;"])
+
+        assert graph.order() == [a, done, b, c]
+        assert graph.batches() == [[["a;"], ["c;"]], [["b;"]]]
+        assert graph.statements() == ["a;", "c;", "b;"]
+
+    def test_cycle(self):
+        graph = StatementGraph()
+        a = graph.add("a", ["a;"])
+        b = graph.add("b", ["b;"], after=[a])
+        graph.prerequisites[a].add(b)
+
+        with pytest.raises(ValueError):
+            graph.order()
@@ -0,0 +1,134 @@
+"""
+Tests for streaming query results from a server-side cursor.
+No live DB required — a fake connection/cursor pair stands in for psycopg.
+"""
+from collections import namedtuple
+
+import pytest
+
+from contextlib import contextmanager
+
+from results.database import Database, Transaction
+
+Column = namedtuple("Column", "name type_code")
+
+
+class FakeNamedCursor:
+    def __init__(self, conn, name, withhold):
+        self.conn = conn
+        self.name = name
+        self.withhold = withhold
+        self.description = None
+        self.itersize = None
+        self.closed = False
+        self._remaining = []
+
+    def execute(self, query, params=None):
+        self.conn.executed.append((query, params))
+        self.description = [Column("n", 23), Column("label", 25)]
+        self._remaining = list(self.conn.data)
+
+    def fetchmany(self, size):
+        batch, self._remaining = self._remaining[:size], self._remaining[size:]
+        return batch
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, data, autocommit=False):
+        self.data = data
+        self.autocommit = autocommit
+        self.executed = []
+        self.cursors = []
+
+    def cursor(self, name=None, withhold=False):
+        c = FakeNamedCursor(self, name, withhold)
+        self.cursors.append(c)
+        return c
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+
+def make_transaction(n=25, autocommit=False):
+    data = [(i, f"row{i}") for i in range(n)]
+    t = Transaction()
+    t.c = FakeCursor(FakeConnection(data, autocommit=autocommit))
+    return t
+
+
+class TestStream:
+    def test_batches(self):
+        t = make_transaction(25)
+        batches = list(t.stream("select * from x", batch_size=10))
+        assert [len(b) for b in batches] == [10, 10, 5]
+        assert batches[0].column_info == {"n": "int4", "label": "text"}
+        assert batches[-1][-1] == (24, "row24")
+        assert batches[0]["label"][0] == "row0"
+
+    def test_by_row(self):
+        t = make_transaction(5)
+        rows = list(t.stream("select * from x", by_row=True))
+        assert rows == [(i, f"row{i}") for i in range(5)]
+
+    def test_uses_named_cursor_and_closes_it(self):
+        t = make_transaction(3)
+        list(t.stream("select * from x"))
+        (cursor,) = t.c.connection.cursors
+        assert cursor.name.startswith("results_stream_")
+        assert cursor.closed
+        assert not cursor.withhold
+
+    def test_withhold_when_autocommit(self):
+        t = make_transaction(3, autocommit=True)
+        list(t.stream("select * from x"))
+        assert t.c.connection.cursors[0].withhold
+
+    def test_q_stream_rewrites_bind_params(self):
+        t = make_transaction(3)
+        list(t.q("select * from x where y = :y", dict(y=1), stream=True))
+        query, params = t.c.connection.executed[0]
+        assert "%(y)s" in query
+        assert params == {"y": 1}
+
+    def test_empty_result(self):
+        t = make_transaction(0)
+        assert list(t.stream("select * from x")) == []
+
+    def test_empty_result_as_empty_batch(self):
+        t = make_transaction(0)
+        (batch,) = t.stream("select * from x", empty=True)
+        assert list(batch) == []
+        assert batch.column_info == {"n": "int4", "label": "text"}
+        assert len(list(make_transaction(3).stream("select *", empty=True))) == 1
+
+    def test_stream_with_paging_rejected(self):
+        t = make_transaction(3)
+        with pytest.raises(ValueError):
+            t.q("select 1", paging=dict(order_by="n"), stream=True)
+
+
+class FakeDatabase(Database):
+    def __init__(self):
+        self.transaction = make_transaction(3)
+
+    @contextmanager
+    def t(self):
+        yield self.transaction
+
+
+class TestDatabaseStream:
+    def test_context_params_from_caller(self):
+        db = FakeDatabase()
+        y = 1  # noqa: F841 (found by context=True)
+
+        list(db.q("select * from x where y = :y", context=True, stream=True))
+        query, params = db.transaction.c.connection.executed[0]
+        assert params["y"] == 1